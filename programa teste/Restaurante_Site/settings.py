@@ -4,6 +4,7 @@ Django settings for Restaurante_Site project.
 
 from pathlib import Path
 import os # Importação correta do módulo 'os'
+import copy
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,27 +37,44 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Unidade da rede pelo host ou pelo prefixo /u/<nome>/ (antes de tudo que usa o caminho)
+    'cardapio.middleware.UnidadeMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Métricas de consultas/tempos por rota (veja /metricas/)
+    'cardapio.middleware.MetricasMiddleware',
+    # Perfil sob demanda de uma requisição (?_perfil=1, somente equipe; veja /perfis/)
+    'cardapio.middleware.PerfilMiddleware',
 ]
 
 ROOT_URLCONF = 'Restaurante_Site.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # O DjangoTemplates do Django, medindo o tempo de renderização de cada
+        # requisição para as métricas (veja cardapio/metricas.py)
+        'BACKEND': 'cardapio.metricas.DjangoTemplatesMedidos',
         'DIRS': [],
-        'APP_DIRS': True,
+        # Sem APP_DIRS: os loaders abaixo já procuram nas pastas 'templates' dos apps
+        'APP_DIRS': False,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Loader com cache: cada template é lido do disco e compilado uma
+            # vez por processo (reinicie o servidor após editar templates)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -71,9 +89,154 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Histórico frio: pedidos antigos movidos pelo comando arquivar_pedidos.
+    # Criar as tabelas com: python manage.py migrate --database=arquivo
+    'arquivo': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'arquivo.sqlite3',
+    },
+}
+
+# Pedidos arquivados no banco 'arquivo'; pedidos e estoque de cada unidade no
+# banco da unidade; leituras marcadas na réplica (se houver); o resto no 'default'
+DATABASE_ROUTERS = [
+    'cardapio.roteadores.RoteadorArquivo',
+    'cardapio.roteadores.RoteadorUnidades',
+    'cardapio.roteadores.RoteadorReplica',
+]
+
+# Perfis do banco, escolhidos pela variável de ambiente CARDAPIO_PERFIL_BANCO.
+# 'producao' prepara o SQLite para vários garçons ao mesmo tempo:
+# - WAL: leituras não esperam pela escrita (e vice-versa);
+# - busy_timeout: quem encontra o banco ocupado espera até 5 s em vez de
+#   falhar na hora com "database is locked";
+# - synchronous=NORMAL: seguro com WAL e bem mais rápido que FULL;
+# - transaction_mode IMMEDIATE: toda transação (atomic) já começa reservando
+#   a escrita, então nunca precisa "subir" de leitura para escrita no meio
+#   (o que falha na hora, sem respeitar o busy_timeout);
+# - CONN_MAX_AGE: reaproveita a conexão entre requisições (os PRAGMAs do
+#   init_command rodam só quando a conexão é aberta).
+CARDAPIO_PERFIS_BANCO = {
+    'desenvolvimento': {},
+    'producao': {
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA busy_timeout=5000;'
+                'PRAGMA synchronous=NORMAL;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+}
+CARDAPIO_PERFIL_BANCO = os.environ.get('CARDAPIO_PERFIL_BANCO', 'desenvolvimento')
+DATABASES['default'].update(CARDAPIO_PERFIS_BANCO[CARDAPIO_PERFIL_BANCO])
+
+# Réplica de leitura (opcional): cópia do 'default' num arquivo separado,
+# atualizada pelo comando replicar_banco. Ligada com a variável de ambiente
+# CARDAPIO_REPLICA (caminho do arquivo). Recebe as leituras do cardápio, da
+# API, das listas do Admin e dos relatórios enquanto o atraso for menor que
+# CARDAPIO_REPLICA_ATRASO_MAXIMO segundos; pedidos e transações ficam no 'default'.
+if os.environ.get('CARDAPIO_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['CARDAPIO_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+CARDAPIO_REPLICA_ATRASO_MAXIMO = 60
+
+# Unidades da rede (restaurantes): cada uma com os seus pedidos e o seu estoque
+# num banco próprio ('unidade_<nome>'), escolhida pelo host da requisição ou
+# pelo prefixo /u/<nome>/ (veja cardapio/unidades.py). O 'default' é a matriz:
+# guarda o cardápio mestre (categorias e pratos), copiado para as unidades.
+# Ligadas com a variável de ambiente CARDAPIO_UNIDADES (nomes separados por
+# vírgula); os hosts de cada unidade podem ser preenchidos aqui, ex.:
+# CARDAPIO_UNIDADES['centro']['hosts'] = ['centro.restaurante.com.br']
+# Cada banco novo é criado com:
+#   python manage.py migrate --database=unidade_<nome>
+#   python manage.py replicar_catalogo --unidade <nome>
+CARDAPIO_UNIDADES = {
+    nome: {'hosts': [], 'banco': BASE_DIR / f'unidade_{nome}.sqlite3'}
+    for nome in filter(None, os.environ.get('CARDAPIO_UNIDADES', '').split(','))
+}
+for _nome, _unidade in CARDAPIO_UNIDADES.items():
+    DATABASES[f'unidade_{_nome}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _unidade['banco'],
+        **copy.deepcopy(CARDAPIO_PERFIS_BANCO[CARDAPIO_PERFIL_BANCO]),
+    }
+
+# Threads usadas nos relatórios e cópias que passam por todas as unidades
+CARDAPIO_UNIDADES_THREADS = 8
+
+# Alterações do cardápio feitas no Admin da matriz: True copia para as unidades
+# logo após o commit, na própria requisição (unidade fora do ar: só um erro no
+# log 'cardapio.rede'); False deixa a cópia para um replicar_catalogo periódico
+# (ex.: cron a cada 5 minutos), sem o Admin esperar pelas unidades
+CARDAPIO_REPLICACAO_IMEDIATA = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Com vários processos (gunicorn etc.) use um backend compartilhado (Redis,
+# Memcached ou FileBasedCache) para que a troca de versão do cardápio valha
+# para todos os processos.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Alias do cache usado pelo cardápio e tempo de vida das entradas (segundos)
+CARDAPIO_CACHE = 'default'
+CARDAPIO_CACHE_TIMEOUT = 60 * 60
+
+
+# Métricas por rota: liga/desliga a medição (desligada, o MetricasMiddleware
+# não instala nada nas conexões), amostras guardadas por nome de URL e
+# intervalo (segundos) do resumo enviado ao logger 'cardapio.metricas' (None desliga o log)
+CARDAPIO_METRICAS_ATIVAS = True
+CARDAPIO_METRICAS_TAMANHO = 1000
+CARDAPIO_METRICAS_LOG_INTERVALO = None
+
+# Perfis sob demanda (PerfilMiddleware): pasta dos arquivos, retenção (perfis
+# guardados e bytes no total; os mais antigos são apagados) e intervalo
+# (segundos) da amostragem de pilhas. Um perfil por vez no processo; com 1 ms,
+# a thread de amostragem disputa o GIL com a requisição e a deixa mais lenta
+# (aumente o intervalo se o tempo medido importar mais que o detalhe das pilhas)
+CARDAPIO_PERFIS_PASTA = BASE_DIR / 'perfis'
+CARDAPIO_PERFIS_MAXIMO = 50
+CARDAPIO_PERFIS_TAMANHO_MAXIMO = 100 * 1024 * 1024
+CARDAPIO_PERFIS_INTERVALO = 0.001
+
+
+# Pedidos: 'sincrono' executa as tarefas de acompanhamento (envio à cozinha,
+# recibos) na própria requisição; 'fila' só enfileira e deixa o trabalho para
+# o comando processar_fila
+CARDAPIO_MODO_PEDIDO = os.environ.get('CARDAPIO_MODO_PEDIDO', 'sincrono')
+
+# Baixa do estoque nos pedidos: 'livro' (confere depois de lançar), 'bloqueio'
+# (select_for_update) ou 'otimista' (INSERT condicionado ao estoque atual).
+# Compare com: manage.py benchmark_concorrencia --estrategia livro --estrategia otimista
+CARDAPIO_ESTRATEGIA_PEDIDO = os.environ.get('CARDAPIO_ESTRATEGIA_PEDIDO', 'livro')
+
+# Painel de pedidos ao vivo (/painel/eventos/): quantos eventos recentes cada
+# processo guarda para a reconexão (Last-Event-ID). Os eventos ficam na memória
+# do processo que gravou o pedido: sirva o site com UM processo (gunicorn -w 1
+# --threads N, ou um worker ASGI). Com mais processos, ou com o processar_fila
+# do modo 'fila', parte das mudanças só aparece ao recarregar o painel.
+CARDAPIO_PAINEL_EVENTOS = 1000
+
+# Validade (segundos) das chaves de idempotência dos pedidos
+CARDAPIO_IDEMPOTENCIA_TTL = 24 * 60 * 60
+
+# Máximo de pedidos por sincronização dos tablets (/api/sincronizar/)
+CARDAPIO_SINCRONIZACAO_MAXIMO = 200
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -115,6 +278,32 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Destino do collectstatic (arquivos servidos em produção)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Nomes com o hash do conteúdo (style.3f2a9c.css): o navegador pode guardar
+# o CSS por muito tempo e recebe o arquivo novo assim que ele muda.
+# O collectstatic também grava as versões .gz e .br (com o pacote 'brotli')
+# de cada arquivo de texto, servidas pelo ServidorEstaticos* de wsgi.py/asgi.py.
+# Ligado por CARDAPIO_ESTATICOS_COMPRIMIDOS (padrão: só com DEBUG = False).
+# Com DEBUG = False o {% static %} procura o nome no manifesto do collectstatic
+# e daria erro 500 sem ele; por isso fica desligado em desenvolvimento e testes.
+# No deploy, rode o collectstatic com a mesma configuração do servidor:
+#   CARDAPIO_ESTATICOS_COMPRIMIDOS=1 python manage.py collectstatic
+CARDAPIO_ESTATICOS_COMPRIMIDOS = os.environ.get('CARDAPIO_ESTATICOS_COMPRIMIDOS', '0' if DEBUG else '1') == '1'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'cardapio.estaticos.ArmazenamentoComprimido' if CARDAPIO_ESTATICOS_COMPRIMIDOS
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
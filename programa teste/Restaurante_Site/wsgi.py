@@ -13,4 +13,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Restaurante_Site.settings')
 
-application = get_wsgi_application()
+# Importado depois do DJANGO_SETTINGS_MODULE: o módulo usa os settings
+from cardapio.estaticos import ServidorEstaticosWSGI  # noqa: E402
+
+# Serve os arquivos do STATIC_ROOT (gerados pelo collectstatic, já com as
+# versões .gz/.br) direto da aplicação, com cache longo para os nomes com hash
+application = ServidorEstaticosWSGI(get_wsgi_application())
@@ -1,7 +1,58 @@
 # cardapio/admin.py (CÓDIGO CORRIGIDO E COMPLETO)
 
-from django.contrib import admin
-from .models import Categoria, Prato, Pedido, ItemPedido
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.db.models import Sum
+from .models import (
+    Categoria, Prato, Pedido, ItemPedido, FilaPedido, MovimentoEstoque, VendaPrato, VendaCategoria,
+    PedidoArquivado, ItemPedidoArquivado,
+)
+from .arquivo import arquivo_pronto
+from .estoque import lancar_movimento
+from .fila import reenfileirar
+from .busca import buscar_pratos
+from .replica import usar_replica, marcar_gravacao, gravou_em
+from . import unidades
+
+
+# Gravações pelo Admin ficam marcadas na sessão (replica.marcar_gravacao):
+# depois de salvar, o usuário volta para a lista e precisa ver o que gravou
+class MarcaGravacaoMixin:
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        resposta = super().changeform_view(request, object_id, form_url, extra_context)
+        if request.method == 'POST':
+            marcar_gravacao(request)
+        return resposta
+
+    def delete_view(self, request, object_id, extra_context=None):
+        resposta = super().delete_view(request, object_id, extra_context)
+        if request.method == 'POST':
+            marcar_gravacao(request)
+        return resposta
+
+    def changelist_view(self, request, extra_context=None):
+        # POST na lista: ações (apagar selecionados etc.) e list_editable
+        resposta = super().changelist_view(request, extra_context)
+        if request.method == 'POST':
+            marcar_gravacao(request)
+        return resposta
+
+
+# Listagens (GET) lidas da réplica, se ela estiver em dia; gravações e
+# telas de edição continuam no principal. Depois de uma gravação do próprio
+# usuário, só a réplica copiada depois dela serve. Vem antes das outras
+# classes base, para renderizar só depois que elas completaram o contexto
+class LeituraReplicaMixin(MarcaGravacaoMixin):
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with usar_replica(desde=gravou_em(request)):
+            resposta = super().changelist_view(request, extra_context)
+            # A lista só é consultada ao renderizar: renderiza ainda na réplica
+            if hasattr(resposta, 'render'):
+                resposta.render()
+        return resposta
 
 # 1. Configuração para visualizar os itens do pedido dentro do Pedido (Inlines)
 class ItemPedidoInline(admin.TabularInline):
@@ -15,29 +66,246 @@ class ItemPedidoInline(admin.TabularInline):
     readonly_fields = ['preco_unitario']
 
 
+# Filtro da lista de pedidos por faixa de valor (usa o campo 'total' gravado)
+class FaixaTotalFilter(admin.SimpleListFilter):
+    title = 'total (R$)'
+    parameter_name = 'faixa_total'
+
+    # (valor do parâmetro, rótulo, mínimo, máximo)
+    FAIXAS = [
+        ('ate50', 'Até R$ 50', None, 50),
+        ('50a100', 'R$ 50 a R$ 100', 50, 100),
+        ('100a200', 'R$ 100 a R$ 200', 100, 200),
+        ('acima200', 'Acima de R$ 200', 200, None),
+    ]
+
+    def lookups(self, request, model_admin):
+        return [(valor, rotulo) for valor, rotulo, _, _ in self.FAIXAS]
+
+    def queryset(self, request, queryset):
+        for valor, _, minimo, maximo in self.FAIXAS:
+            if self.value() == valor:
+                if minimo is not None:
+                    queryset = queryset.filter(total__gte=minimo)
+                if maximo is not None:
+                    queryset = queryset.filter(total__lt=maximo)
+        return queryset
+
+
 # 2. Configuração do Pedido (Header)
 @admin.register(Pedido)
-class PedidoAdmin(admin.ModelAdmin):
+class PedidoAdmin(LeituraReplicaMixin, admin.ModelAdmin):
     # Campos exibidos na lista principal do Pedido
-    list_display = ['id', 'nome_cliente', 'data_pedido', 'total_pedido', 'pago']
+    list_display = ['id', 'nome_cliente', 'data_pedido', 'total', 'pago']
     # Campos que podem ser usados para buscar pedidos
-    search_fields = ['nome_cliente', 'id']
+    # (começo do nome e número exato: as duas buscas usam índice)
+    search_fields = ['^nome_cliente', '=id']
     # Campos que permitem filtrar a lista
-    list_filter = ['data_pedido', 'pago']
+    list_filter = ['data_pedido', 'pago', FaixaTotalFilter]
     # Adiciona os Itens Pedido (Inline) para aparecerem abaixo do cabeçalho do Pedido
     inlines = [ItemPedidoInline]
     
-    # Campo total_pedido não existe no modelo, mas será calculado
-    readonly_fields = ['total_pedido']
+    # O total é mantido automaticamente a partir dos itens
+    readonly_fields = ['total']
+
+
+# Fila de pedidos (acompanhamento do trabalhador processar_fila)
+@admin.register(FilaPedido)
+class FilaPedidoAdmin(MarcaGravacaoMixin, admin.ModelAdmin):
+    list_display = ['pedido', 'status', 'tentativas', 'criado_em', 'reservado_por', 'reservado_em']
+    list_filter = ['status']
+    list_select_related = ['pedido']
+    readonly_fields = ['pedido', 'criado_em', 'reservado_em', 'reservado_por', 'tentativas', 'ultimo_erro']
+    actions = ['reenfileirar_com_erro']
+
+    @admin.action(description='Reenfileirar as entradas com erro')
+    def reenfileirar_com_erro(self, request, queryset):
+        self.message_user(request, f"{reenfileirar(queryset)} entrada(s) de volta à fila.")
+
+
+# Numa unidade da rede, categorias e pratos são a cópia do cardápio da matriz:
+# não se cria nem se apaga nada por lá (só o estoque dos pratos é da unidade)
+class CardapioDaMatrizMixin:
+    def has_add_permission(self, request):
+        return unidades.atual() is None and super().has_add_permission(request)
+
+    def has_delete_permission(self, request, obj=None):
+        return unidades.atual() is None and super().has_delete_permission(request, obj)
+
+
+@admin.register(Categoria)
+class CategoriaAdmin(MarcaGravacaoMixin, CardapioDaMatrizMixin, admin.ModelAdmin):
+    def has_change_permission(self, request, obj=None):
+        return unidades.atual() is None and super().has_change_permission(request, obj)
+
+
+# Formulário do Prato: o estoque de um prato existente é alterado por ajuste
+# (lançado no livro de estoque), nunca sobrescrito
+class PratoForm(forms.ModelForm):
+    ajustar_estoque_para = forms.IntegerField(
+        required=False, min_value=0,
+        help_text='Novo estoque atual. A diferença é lançada como ajuste no livro de estoque.'
+    )
+
+    class Meta:
+        model = Prato
+        fields = '__all__'
+
+
+@admin.register(Prato)
+class PratoAdmin(LeituraReplicaMixin, CardapioDaMatrizMixin, admin.ModelAdmin):
+    form = PratoForm
+    list_display = ['codigo_cardapio', 'nome', 'categoria', 'preco', 'estoque_atual']
+    list_filter = ['categoria']
+    search_fields = ['nome', 'codigo_cardapio']
+    list_select_related = ['categoria']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).com_estoque_atual()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Busca pelo índice FTS5 (nome e código, sem acentos) em vez de icontains
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=buscar_pratos(search_term, limite=None)), False
+
+    def get_readonly_fields(self, request, obj=None):
+        # Na criação o estoque é o valor inicial; depois, só por ajuste
+        campos = ['estoque', 'estoque_atual'] if obj else []
+        if unidades.atual() is not None:
+            campos += ['categoria', 'codigo_cardapio', 'nome', 'preco']
+        return campos
+
+    def get_fields(self, request, obj=None):
+        campos = ['categoria', 'codigo_cardapio', 'nome', 'preco', 'estoque']
+        return campos + ['estoque_atual', 'ajustar_estoque_para'] if obj else campos
+
+    @admin.display(description='Estoque atual', ordering='estoque_atual')
+    def estoque_atual(self, obj):
+        return obj.estoque_atual
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        novo = form.cleaned_data.get('ajustar_estoque_para')
+        if change and novo is not None:
+            diferenca = novo - obj.calcular_estoque_atual()
+            if diferenca:
+                lancar_movimento(obj, diferenca, MovimentoEstoque.AJUSTE,
+                                 observacao=f"Ajuste no Admin por {request.user}")
+
+
+# Livro de estoque: só inclusão (reposições e ajustes); nada é alterado ou apagado
+@admin.register(MovimentoEstoque)
+class MovimentoEstoqueAdmin(LeituraReplicaMixin, admin.ModelAdmin):
+    list_display = ['criado_em', 'prato', 'quantidade', 'tipo', 'pedido', 'observacao']
+    list_filter = ['tipo', 'criado_em']
+    list_select_related = ['prato', 'pedido']
+    fields = ['prato', 'quantidade', 'tipo', 'observacao']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# Vendas consolidadas (comando consolidar_vendas): só leitura, sem consultar
+# Pedido/ItemPedido, então a tela não fica mais lenta com o histórico
+class VendaAdminBase(admin.ModelAdmin):
+    change_list_template = 'admin/cardapio/vendas_change_list.html'
+    date_hierarchy = 'dia'
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Em aberto (R$)')
+    def receita_em_aberto(self, obj):
+        return obj.receita_em_aberto
+
+    def changelist_view(self, request, extra_context=None):
+        resposta = super().changelist_view(request, extra_context)
+        # Totais do que está filtrado (uma consulta agregada nas tabelas consolidadas)
+        if hasattr(resposta, 'context_data') and 'cl' in resposta.context_data:
+            totais = resposta.context_data['cl'].queryset.aggregate(
+                quantidade=Sum('quantidade'), receita=Sum('receita'), receita_paga=Sum('receita_paga')
+            )
+            if totais['receita'] is not None:
+                totais['receita_em_aberto'] = totais['receita'] - totais['receita_paga']
+            resposta.context_data['totais'] = totais
+        return resposta
+
+
+@admin.register(VendaPrato)
+class VendaPratoAdmin(LeituraReplicaMixin, VendaAdminBase):
+    list_display = ['dia', 'hora', 'prato', 'quantidade', 'receita', 'receita_paga', 'receita_em_aberto']
+    list_filter = ['hora', 'prato__categoria']
+    search_fields = ['prato__nome', 'prato__codigo_cardapio']
+    list_select_related = ['prato']
+
+
+@admin.register(VendaCategoria)
+class VendaCategoriaAdmin(LeituraReplicaMixin, VendaAdminBase):
+    list_display = ['dia', 'hora', 'categoria', 'quantidade', 'receita', 'receita_paga', 'receita_em_aberto']
+    list_filter = ['hora', 'categoria']
+    list_select_related = ['categoria']
+
+
+# Histórico frio (comando arquivar_pedidos): só leitura, lido do banco 'arquivo'
+class ItemPedidoArquivadoInline(admin.TabularInline):
+    model = ItemPedidoArquivado
+    fields = ['codigo_cardapio', 'prato_nome', 'quantidade', 'preco_unitario']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PedidoArquivado)
+class PedidoArquivadoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'nome_cliente', 'data_pedido', 'total', 'arquivado_em']
+    search_fields = ['^nome_cliente', '=id']
+    date_hierarchy = 'data_pedido'
+    list_filter = [FaixaTotalFilter]
+    inlines = [ItemPedidoArquivadoInline]
+    # O arquivo só cresce: contar todas as linhas a cada página não vale a pena
+    show_full_result_count = False
+
+    # Sem o 'migrate --database=arquivo' a tabela não existe: avisa em vez do erro 500
+    def _sem_tabela(self, request):
+        if arquivo_pronto():
+            return None
+        self.message_user(
+            request,
+            "O banco do arquivo ainda não foi criado: rode 'python manage.py migrate --database=arquivo'.",
+            messages.WARNING,
+        )
+        return redirect('admin:index')
+
+    def changelist_view(self, request, extra_context=None):
+        return self._sem_tabela(request) or super().changelist_view(request, extra_context)
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        return self._sem_tabela(request) or super().change_view(request, object_id, form_url, extra_context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
-    # Método para calcular o total do pedido na lista
-    def total_pedido(self, obj):
-        return obj.calcular_total()
-    total_pedido.short_description = 'Total (R$)' # Nome da coluna
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 # 3. Registro dos modelos simples (que você já tinha)
-admin.site.register(Categoria)
-admin.site.register(Prato)
 
 # OBS: Não precisamos registrar ItemPedido porque ele está dentro do PedidoAdmin
\ No newline at end of file
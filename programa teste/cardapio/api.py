@@ -0,0 +1,172 @@
+# cardapio/api.py
+
+import json
+from django.conf import settings
+from django.db import IntegrityError, OperationalError
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from .models import Categoria, Prato
+from .cache import aversao_cardapio, aversao_estoque
+from .idempotencia import validar_chave
+from .pedidos import itens_do_json, registrar_pedido
+from .sincronizacao import sincronizar
+from .replica import usar_replica
+
+# JSON compacto (sem espaços) para economizar banda dos tablets
+JSON_COMPACTO = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+# --- Cabeçalhos condicionais (ETag / Last-Modified) ---
+# As versões vêm do cache (não consultam o banco) e são carimbos em ms,
+# trocados a cada alteração de Prato/Categoria ou pedido registrado.
+# Lidas com a API assíncrona do cache (aget): a view é assíncrona.
+
+async def _versoes():
+    return await aversao_cardapio(), await aversao_estoque()
+
+
+def _etag_cardapio(versoes):
+    return quote_etag("{}-{}".format(*versoes))
+
+
+def _ultima_alteracao(versoes):
+    return max(versoes) // 1000
+
+
+# --- Leitura do cardápio ---
+
+@require_GET
+async def api_cardapio(request):
+    """
+    Retorna o cardápio em JSON (categorias com pratos, preços e estoque).
+    Montado com .values() (sem instanciar models); se nada mudou desde a
+    última consulta do cliente (ETag/Last-Modified), responde 304 sem corpo.
+    Assíncrona: usa o ORM e o cache assíncronos (aiterator, aget) e, sob
+    ASGI, não ocupa uma thread enquanto o tablet baixa a resposta.
+    Lê da réplica só se a cópia for posterior às versões do ETag (o tablet
+    nunca guarda dados antigos com um ETag novo).
+    """
+    versoes = await _versoes()
+    etag, ultima_alteracao = _etag_cardapio(versoes), _ultima_alteracao(versoes)
+    resposta = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if resposta is None:
+        resposta = await _montar_cardapio(desde=max(versoes))
+    resposta.headers.setdefault('ETag', etag)
+    resposta.headers.setdefault('Last-Modified', http_date(ultima_alteracao))
+    return resposta
+
+
+async def _montar_cardapio(desde):
+    with usar_replica(desde=desde):
+        categorias = [categoria async for categoria in Categoria.objects.values('id', 'nome')]
+        pratos_por_categoria = {categoria['id']: [] for categoria in categorias}
+
+        pratos = Prato.objects.com_estoque_atual().order_by('codigo_cardapio').values(
+            'id', 'categoria_id', 'codigo_cardapio', 'nome', 'preco', 'estoque_atual'
+        )
+        async for prato in pratos.aiterator():
+            prato['estoque'] = prato.pop('estoque_atual')
+            pratos_por_categoria[prato.pop('categoria_id')].append(prato)
+
+    for categoria in categorias:
+        categoria['pratos'] = pratos_por_categoria[categoria['id']]
+
+    return JsonResponse({'categorias': categorias}, json_dumps_params=JSON_COMPACTO)
+
+
+# --- Envio de pedidos ---
+
+def _erro(mensagem, status):
+    return JsonResponse({'erro': mensagem}, status=status, json_dumps_params=JSON_COMPACTO)
+
+
+@csrf_exempt
+@require_POST
+def api_pedidos(request):
+    """
+    Registra um pedido enviado em JSON:
+    {"nome_cliente": "Mesa 4", "itens": [{"prato_id": 1, "quantidade": 2}]}
+    Usa a mesma verificação de estoque da tela do garçom (registrar_pedido).
+    A chave de idempotência vai no cabeçalho Idempotency-Key (ou no campo
+    "chave_idempotencia"); um reenvio devolve o pedido original.
+    """
+    # Só aceita JSON: um formulário de outro site não consegue enviar este tipo
+    if request.content_type != 'application/json':
+        return _erro("Envie o pedido como application/json.", 415)
+
+    try:
+        dados = json.loads(request.body)
+        if not isinstance(dados, dict):
+            raise ValueError("esperado um objeto com 'nome_cliente' e 'itens'.")
+        nome_cliente = dados.get('nome_cliente')
+        if nome_cliente is not None and not isinstance(nome_cliente, str):
+            raise ValueError("'nome_cliente' precisa ser um texto.")
+        itens_do_pedido = itens_do_json(dados.get('itens'))
+        # Chave fora do formato é erro do cliente (400), não do pedido (409)
+        chave = validar_chave(request.headers.get('Idempotency-Key') or dados.get('chave_idempotencia'))
+    except ValueError as e:
+        return _erro(f"JSON inválido: {e}", 400)
+
+    if not nome_cliente or not itens_do_pedido:
+        return _erro("Preencha o nome do cliente/mesa e selecione pelo menos um item.", 400)
+
+    try:
+        novo_pedido = registrar_pedido(
+            nome_cliente, itens_do_pedido, chave_idempotencia=chave
+        )
+    except ValueError as e:
+        # Erros de estoque: mesma mensagem da tela do garçom
+        return _erro(f"ERRO no Pedido: {e}", 409)
+    except IntegrityError:
+        return _erro("ERRO ao salvar o pedido. Tente novamente.", 503)
+    except OperationalError:
+        # Banco ocupado além do tempo de espera (busy_timeout)
+        return _erro("O sistema está ocupado com outros pedidos. Tente novamente em instantes.", 503)
+
+    return JsonResponse(
+        {'id': novo_pedido.id, 'nome_cliente': novo_pedido.nome_cliente, 'total': novo_pedido.total},
+        status=201, json_dumps_params=JSON_COMPACTO
+    )
+
+
+# --- Sincronização dos tablets (pedidos feitos sem rede) ---
+
+@csrf_exempt
+@require_POST
+def api_sincronizar(request):
+    """
+    Recebe de uma vez os pedidos guardados no tablet enquanto estava sem rede:
+    {"token": "<token da última sincronização>",
+     "pedidos": [{"chave": "<uuid do tablet>", "nome_cliente": "Mesa 4",
+                  "itens": [{"prato_id": 1, "quantidade": 2}]}]}
+    Responde com o resultado de cada pedido (aceito, com o id, ou rejeitado,
+    com o motivo), o estoque dos pratos que mudaram desde o token e o token
+    novo. Sem pedidos, só atualiza o estoque. Reenviar o lote é seguro (chaves).
+    """
+    if request.content_type != 'application/json':
+        return _erro("Envie o lote como application/json.", 415)
+
+    try:
+        dados = json.loads(request.body)
+        if not isinstance(dados, dict) or not isinstance(dados.get('pedidos', []), list):
+            raise ValueError("esperado um objeto com 'token' e a lista 'pedidos'.")
+    except ValueError as e:
+        return _erro(f"JSON inválido: {e}", 400)
+
+    pedidos = dados.get('pedidos', [])
+    maximo = getattr(settings, 'CARDAPIO_SINCRONIZACAO_MAXIMO', 200)
+    if len(pedidos) > maximo:
+        return _erro(f"No máximo {maximo} pedidos por sincronização.", 413)
+
+    try:
+        resposta = sincronizar(pedidos, dados.get('token'))
+    except ValueError as e:
+        # Estoque levado por outro garçom durante a gravação: nada foi gravado
+        return _erro(str(e), 409)
+    except (IntegrityError, OperationalError):
+        return _erro("O sistema está ocupado com outros pedidos. Tente novamente em instantes.", 503)
+
+    return JsonResponse(resposta, json_dumps_params=JSON_COMPACTO)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CardapioConfig(AppConfig):
     name = 'cardapio'
+
+    def ready(self):
+        # Registra os receivers de sinais (invalidação do cache do cardápio)
+        from . import signals  # noqa: F401
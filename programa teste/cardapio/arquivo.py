@@ -0,0 +1,130 @@
+# cardapio/arquivo.py
+
+from django.db import connections, router, transaction
+from .models import (
+    Pedido, ItemPedido, FilaPedido, ChaveIdempotencia, MovimentoEstoque, MarcoConsolidacao,
+    PedidoArquivado, ItemPedidoArquivado,
+)
+from .vendas import MARCO
+
+
+def arquivo_pronto():
+    """True se as tabelas do arquivo já existem (manage.py migrate --database=arquivo)."""
+    banco = router.db_for_write(PedidoArquivado)
+    return PedidoArquivado._meta.db_table in connections[banco].introspection.table_names()
+
+
+def pedidos_arquivaveis(corte):
+    """
+    Pedidos que podem sair das tabelas principais: feitos antes de 'corte',
+    pagos e já somados nas vendas consolidadas com a situação atual (os totais
+    de vendas não mudam quando eles saem). Pedidos em aberto nunca são arquivados.
+    """
+    marco = MarcoConsolidacao.objects.filter(nome=MARCO).values_list('ultimo_pedido_id', flat=True).first() or 0
+    return Pedido.objects.filter(
+        data_pedido__lt=corte, pago=True, pago_contabilizado=True, id__lte=marco
+    )
+
+
+def _descartar_copias(ids, banco):
+    ItemPedidoArquivado.objects.using(banco).filter(pedido_id__in=ids)._raw_delete(banco)
+    PedidoArquivado.objects.using(banco).filter(id__in=ids)._raw_delete(banco)
+
+
+def _copiar(ids, banco):
+    """Grava os pedidos e itens no banco do arquivo (mesmos ids dos originais)."""
+    pedidos = [
+        PedidoArquivado(**pedido)
+        for pedido in Pedido.objects.filter(id__in=ids).values(
+            'id', 'data_pedido', 'nome_cliente', 'pago', 'total', 'enviado_cozinha_em'
+        )
+    ]
+    itens = [
+        ItemPedidoArquivado(
+            id=item['id'], pedido_id=item['pedido_id'], prato_id=item['prato_id'],
+            codigo_cardapio=item['prato__codigo_cardapio'], prato_nome=item['prato__nome'],
+            quantidade=item['quantidade'], preco_unitario=item['preco_unitario'],
+        )
+        for item in ItemPedido.objects.filter(pedido_id__in=ids).values(
+            'id', 'pedido_id', 'prato_id', 'prato__codigo_cardapio', 'prato__nome', 'quantidade', 'preco_unitario'
+        )
+    ]
+    # Um lote copiado mas não apagado (processo interrompido, ou pedido que
+    # mudou entre a cópia e a remoção) é copiado de novo por cima
+    with transaction.atomic(using=banco):
+        _descartar_copias(ids, banco)
+        PedidoArquivado.objects.using(banco).bulk_create(pedidos, batch_size=500)
+        ItemPedidoArquivado.objects.using(banco).bulk_create(itens, batch_size=500)
+
+
+def _conferidos(ids, banco, banco_arquivo):
+    """Dos 'ids', os pedidos cuja cópia no arquivo (pedido e itens) é igual ao original."""
+    copias = dict(
+        PedidoArquivado.objects.using(banco_arquivo).filter(id__in=ids).values_list('id', 'total')
+    )
+    campos_itens = ('pedido_id', 'id', 'prato_id', 'quantidade', 'preco_unitario')
+    itens = set(ItemPedido.objects.using(banco).filter(pedido_id__in=ids).values_list(*campos_itens))
+    itens_arquivo = set(
+        ItemPedidoArquivado.objects.using(banco_arquivo).filter(pedido_id__in=ids).values_list(*campos_itens)
+    )
+    diferentes = {item[0] for item in itens ^ itens_arquivo}
+    return [
+        pk for pk, total in Pedido.objects.using(banco).filter(id__in=ids).values_list('id', 'total')
+        if pk in copias and copias[pk] == total and pk not in diferentes
+    ]
+
+
+def _apagar(ids, corte, banco_arquivo):
+    """
+    Apaga os pedidos e o que depende deles no banco principal, sem sinais:
+    os pedidos são pagos e antigos, então não mexem no total (já gravado),
+    no painel ao vivo nem no estoque. O livro de estoque fica como está (só
+    perde a referência ao pedido, como no SET_NULL).
+    Dentro da transação, confere de novo cada pedido: só apaga o que ainda é
+    arquivável e está igual à cópia no arquivo (um pedido que mudou depois da
+    cópia fica para o próximo lote). Retorna os ids apagados.
+    """
+    banco = router.db_for_write(Pedido)
+    with transaction.atomic(using=banco):
+        ids = list(
+            pedidos_arquivaveis(corte).using(banco).select_for_update()
+            .filter(id__in=ids).values_list('id', flat=True)
+        )
+        ids = _conferidos(ids, banco, banco_arquivo)
+        MovimentoEstoque.objects.using(banco).filter(pedido_id__in=ids).update(pedido=None)
+        FilaPedido.objects.using(banco).filter(pedido_id__in=ids)._raw_delete(banco)
+        ChaveIdempotencia.objects.using(banco).filter(pedido_id__in=ids)._raw_delete(banco)
+        ItemPedido.objects.using(banco).filter(pedido_id__in=ids)._raw_delete(banco)
+        Pedido.objects.using(banco).filter(id__in=ids)._raw_delete(banco)
+        return ids
+
+
+def arquivar_pedidos(corte, lote=500, limite=None):
+    """
+    Move os pedidos arquiváveis feitos antes de 'corte' (com os itens) para o
+    banco do arquivo, em lotes de 'lote' pedidos: cada lote é copiado e só
+    depois apagado, e cada etapa é uma transação curta, então os garçons não
+    esperam pelo arquivamento. 'limite' para depois de N pedidos.
+    Retorna a quantidade de pedidos arquivados.
+    """
+    banco_arquivo = router.db_for_write(PedidoArquivado)
+    arquivados = 0
+    ultimo_id = 0
+    while limite is None or arquivados < limite:
+        tamanho = lote if limite is None else min(lote, limite - arquivados)
+        ids = list(
+            pedidos_arquivaveis(corte).filter(id__gt=ultimo_id)
+            .order_by('id').values_list('id', flat=True)[:tamanho]
+        )
+        if not ids:
+            break
+        _copiar(ids, banco_arquivo)
+        apagados = _apagar(ids, corte, banco_arquivo)
+        # O que não saiu do banco principal não pode ficar também no arquivo
+        if len(apagados) < len(ids):
+            with transaction.atomic(using=banco_arquivo):
+                _descartar_copias(set(ids) - set(apagados), banco_arquivo)
+        arquivados += len(apagados)
+        ultimo_id = ids[-1]
+    return arquivados
+
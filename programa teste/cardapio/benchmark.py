@@ -0,0 +1,416 @@
+# cardapio/benchmark.py
+
+import io
+import os
+import sys
+import asyncio
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import Categoria, Prato, Pedido, ItemPedido
+from .metricas import percentil
+
+# Orçamento padrão de consultas SQL por requisição de cada cenário
+ORCAMENTO_PADRAO = {
+    'cardapio_get': 2,
+    'fazer_pedido_post': 12,
+    'admin_pedidos_changelist': 8,
+}
+
+
+# --- Banco temporário ---
+
+@contextmanager
+def banco_temporario(prefixo='cardapio-benchmark-'):
+    """
+    Cria o banco de teste num arquivo temporário (as threads precisam do mesmo
+    arquivo) e o apaga no final.
+    """
+    pasta = tempfile.mkdtemp(prefix=prefixo)
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(pasta, 'benchmark.sqlite3')
+    nome_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+@contextmanager
+def perfil_banco(nome):
+    """
+    Aplica um perfil de settings.CARDAPIO_PERFIS_BANCO à conexão padrão (e às
+    conexões abertas depois, que usam o mesmo settings_dict) e restaura no final.
+    """
+    perfis = getattr(settings, 'CARDAPIO_PERFIS_BANCO', {})
+    if nome not in perfis:
+        raise ValueError(f"Perfil de banco desconhecido: {nome!r}.")
+
+    configuracao = connection.settings_dict
+    campos = ['OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS']
+    original = {campo: configuracao.get(campo) for campo in campos}
+    connections.close_all()
+    configuracao.update({'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False})
+    configuracao.update(perfis[nome])
+    try:
+        yield
+    finally:
+        connections.close_all()
+        configuracao.update(original)
+
+
+# --- Dados sintéticos ---
+
+def semear(categorias=10, pratos_por_categoria=50, pedidos=2000, itens_por_pedido=3,
+           dias=90, estoque=10 ** 6, semente=42):
+    """
+    Cria um conjunto de dados sintético e reprodutível (mesma semente, mesmos
+    dados): categorias, pratos e um histórico de Pedido/ItemPedido espalhado
+    pelos últimos 'dias'.
+    """
+    aleatorio = random.Random(semente)
+
+    objs_categoria = Categoria.objects.bulk_create(
+        [Categoria(nome=f"Categoria {c:03d}") for c in range(categorias)]
+    )
+    pratos = Prato.objects.bulk_create([
+        Prato(
+            categoria=categoria,
+            codigo_cardapio=f"C{c}P{p}",
+            nome=f"Prato {c}-{p}",
+            preco=Decimal(aleatorio.randint(500, 9000)) / 100,
+            estoque=estoque,
+        )
+        for c, categoria in enumerate(objs_categoria)
+        for p in range(pratos_por_categoria)
+    ])
+
+    # Pedidos históricos: escolhe os itens antes para já gravar o total
+    agora = timezone.now()
+    escolhas = [
+        [(aleatorio.choice(pratos), aleatorio.randint(1, 4)) for _ in range(itens_por_pedido)]
+        for _ in range(pedidos)
+    ]
+    objs_pedido = Pedido.objects.bulk_create([
+        Pedido(
+            nome_cliente=f"Mesa {aleatorio.randint(1, 40)}",
+            pago=aleatorio.random() < 0.8,
+            total=sum(prato.preco * quantidade for prato, quantidade in itens),
+        )
+        for itens in escolhas
+    ])
+    for pedido in objs_pedido:
+        pedido.data_pedido = agora - timedelta(seconds=aleatorio.randint(0, dias * 24 * 3600))
+    Pedido.objects.bulk_update(objs_pedido, ['data_pedido'], batch_size=500)
+
+    ItemPedido.objects.bulk_create(
+        [
+            ItemPedido(pedido=pedido, prato=prato, quantidade=quantidade, preco_unitario=prato.preco)
+            for pedido, itens in zip(objs_pedido, escolhas)
+            for prato, quantidade in itens
+        ],
+        batch_size=1000,
+    )
+    return {'categorias': categorias, 'pratos': len(pratos), 'pedidos': pedidos,
+            'itens': pedidos * itens_por_pedido}
+
+
+# --- Medição ---
+
+def _resumir(latencias, erros, duracao):
+    latencias = sorted(latencias)
+    total = len(latencias)
+    return {
+        'requisicoes': total,
+        'erros': erros,
+        'duracao_s': round(duracao, 4),
+        'throughput_rps': round(total / duracao, 2) if duracao else None,
+        'latencia_ms': {
+            'media': round(statistics.fmean(latencias) * 1000, 3) if total else None,
+            'p50': round(percentil(latencias, 50) * 1000, 3) if total else None,
+            'p95': round(percentil(latencias, 95) * 1000, 3) if total else None,
+            'p99': round(percentil(latencias, 99) * 1000, 3) if total else None,
+            'max': round(latencias[-1] * 1000, 3) if total else None,
+        },
+    }
+
+
+def _executar(requisicao, repeticoes, threads):
+    """
+    Executa 'requisicao(cliente)' repeticoes vezes em cada thread (um Client
+    por thread) e retorna o resumo. A requisição devolve True se deu certo.
+    """
+    latencias, erros = [], []
+    lock = threading.Lock()
+
+    def trabalhador(cliente):
+        locais, falhas = [], 0
+        try:
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                ok = requisicao(cliente)
+                locais.append(time.perf_counter() - inicio)
+                falhas += not ok
+        finally:
+            # Cada thread abre a própria conexão com o banco
+            connections.close_all()
+        with lock:
+            latencias.extend(locais)
+            erros.append(falhas)
+
+    clientes = [_novo_cliente(requisicao) for _ in range(threads)]
+    inicio = time.perf_counter()
+    if threads == 1:
+        trabalhador(clientes[0])
+    else:
+        grupo = [threading.Thread(target=trabalhador, args=(cliente,)) for cliente in clientes]
+        for thread in grupo:
+            thread.start()
+        for thread in grupo:
+            thread.join()
+    return _resumir(latencias, sum(erros), time.perf_counter() - inicio)
+
+
+def _novo_cliente(requisicao):
+    # Erros do servidor (ex.: "database is locked") contam como falha, sem interromper
+    cliente = Client(raise_request_exception=False, HTTP_HOST='localhost')
+    usuario = getattr(requisicao, 'usuario', None)
+    if usuario is not None:
+        cliente.force_login(usuario)
+    return cliente
+
+
+def _contar_consultas(requisicao):
+    """Número de consultas SQL de uma única execução da requisição."""
+    cliente = _novo_cliente(requisicao)
+    with CaptureQueriesContext(connection) as consultas:
+        requisicao(cliente)
+    return len(consultas)
+
+
+def cenarios(pratos_disputados=5, itens_por_pedido=3, semente=42):
+    """
+    Monta os cenários medidos: GET do cardápio, POST de pedidos disputando os
+    mesmos pratos e a lista de pedidos do Admin.
+    """
+    aleatorio = random.Random(semente)
+    disputados = list(Prato.objects.order_by('pk').values_list('pk', flat=True)[:pratos_disputados])
+    url_menu = reverse('cardapio')
+    url_pedido = reverse('fazer_pedido')
+    url_admin = reverse('admin:cardapio_pedido_changelist')
+
+    def cardapio_get(cliente):
+        return cliente.get(url_menu).status_code == 200
+
+    def fazer_pedido_post(cliente):
+        dados = {'nome_cliente': 'Benchmark'}
+        for prato_id in aleatorio.sample(disputados, min(itens_por_pedido, len(disputados))):
+            dados[f'quantidade_{prato_id}'] = '1'
+        # Sucesso redireciona (302); erro de estoque/banco volta para o formulário
+        return cliente.post(url_pedido, dados).status_code == 302
+
+    def admin_pedidos_changelist(cliente):
+        return cliente.get(url_admin).status_code == 200
+
+    usuario, _ = get_user_model().objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True, 'is_superuser': True}
+    )
+    admin_pedidos_changelist.usuario = usuario
+
+    return {
+        'cardapio_get': cardapio_get,
+        'fazer_pedido_post': fazer_pedido_post,
+        'admin_pedidos_changelist': admin_pedidos_changelist,
+    }
+
+
+def medir_concorrencia(repeticoes=50, threads=8, pratos_disputados=5, itens_por_pedido=3, semente=42):
+    """
+    Só o POST de pedidos, com 'threads' garçons ao mesmo tempo disputando os
+    mesmos pratos: mede pedidos gravados por segundo e quantos falharam.
+    """
+    requisicao = cenarios(pratos_disputados, itens_por_pedido, semente)['fazer_pedido_post']
+    antes = Pedido.objects.count()
+    resultado = _executar(requisicao, repeticoes, threads)
+    gravados = Pedido.objects.count() - antes
+    return {
+        **resultado,
+        'threads': threads,
+        'pedidos_gravados': gravados,
+        'pedidos_por_s': round(gravados / resultado['duracao_s'], 2) if resultado['duracao_s'] else None,
+    }
+
+
+def executar_benchmark(repeticoes=100, threads=4, orcamento=None, **opcoes_cenarios):
+    """
+    Mede vazão e latência de cada cenário (o POST de pedidos roda com 'threads'
+    threads ao mesmo tempo) e o número de consultas por requisição, comparado
+    ao orçamento. Retorna um dict pronto para ser gravado em JSON.
+    """
+    orcamento = {**ORCAMENTO_PADRAO, **(orcamento or {})}
+    resultado = {}
+    for nome, requisicao in cenarios(**opcoes_cenarios).items():
+        # Começa sempre com o cache frio, para o resultado ser comparável
+        caches[getattr(settings, 'CARDAPIO_CACHE', 'default')].clear()
+        consultas = _contar_consultas(requisicao)
+        concorrentes = threads if nome == 'fazer_pedido_post' else 1
+        resultado[nome] = {
+            **_executar(requisicao, repeticoes, concorrentes),
+            'threads': concorrentes,
+            'consultas': consultas,
+            'orcamento_consultas': orcamento.get(nome),
+            'dentro_do_orcamento': orcamento.get(nome) is None or consultas <= orcamento[nome],
+        }
+    return resultado
+
+
+# --- Clientes lentos: WSGI x ASGI ---
+# Simula celulares em rede ruim (3G): cada cliente demora 'latencia' segundos
+# para enviar a requisição e recebe a resposta a 'banda' bytes por segundo.
+# No WSGI o cliente ocupa uma thread do servidor o tempo todo; no ASGI a
+# espera é um await, e uma única thread atende todas as conexões.
+
+class _Monitor:
+    """Amostra, em segundo plano, o pico de threads e de memória (RSS) do processo."""
+
+    def __init__(self, intervalo=0.01):
+        self.intervalo = intervalo
+        self.pico_threads = threading.active_count()
+        self.rss_inicial = self.pico_rss = _rss_kb()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico_threads = max(self.pico_threads, threading.active_count())
+            rss = _rss_kb()
+            if rss is not None:
+                self.pico_rss = max(self.pico_rss, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+    def resultado(self):
+        # Sem contar a própria thread do monitor
+        return {
+            'pico_threads': self.pico_threads - 1,
+            'pico_rss_kb': self.pico_rss,
+            'rss_adicional_kb': self.pico_rss - self.rss_inicial if self.pico_rss is not None else None,
+        }
+
+
+def _rss_kb():
+    """Memória residente do processo em KB (Linux); None em outros sistemas."""
+    try:
+        with open('/proc/self/status') as status:
+            for linha in status:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1])
+    except OSError:
+        return None
+
+
+def _ambiente_wsgi(caminho):
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def clientes_lentos_wsgi(caminho, clientes=100, threads=8, latencia=0.3, banda=20 * 1024):
+    """
+    'clientes' conexões ao mesmo tempo num servidor WSGI com 'threads' threads
+    (como gunicorn --threads): quem chega com todas ocupadas espera na fila.
+    """
+    aplicacao = get_wsgi_application()
+
+    def atender(chegada):
+        status = {}
+        time.sleep(latencia)  # requisição chegando devagar, já com a thread ocupada
+        corpo = aplicacao(_ambiente_wsgi(caminho), lambda s, cabecalhos: status.update(codigo=s))
+        try:
+            for pedaco in corpo:
+                time.sleep(len(pedaco) / banda)  # cliente baixando devagar
+        finally:
+            if hasattr(corpo, 'close'):
+                corpo.close()
+            connections.close_all()
+        return time.perf_counter() - chegada, status.get('codigo', '').startswith('200')
+
+    with _Monitor() as monitor, ThreadPoolExecutor(max_workers=threads) as grupo:
+        inicio = time.perf_counter()
+        respostas = list(grupo.map(atender, [inicio] * clientes))
+        duracao = time.perf_counter() - inicio
+    latencias = [tempo for tempo, _ in respostas]
+    return {**_resumir(latencias, sum(not ok for _, ok in respostas), duracao),
+            'servidor': f'WSGI ({threads} threads)', **monitor.resultado()}
+
+
+def clientes_lentos_asgi(caminho, clientes=100, latencia=0.3, banda=20 * 1024):
+    """As mesmas conexões num servidor ASGI: um loop de eventos, sem thread por conexão."""
+    aplicacao = get_asgi_application()
+
+    async def atender(chegada):
+        status = {}
+        enviada = False
+
+        async def receive():
+            nonlocal enviada
+            if not enviada:
+                enviada = True
+                await asyncio.sleep(latencia)  # requisição chegando devagar, sem ocupar thread
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()  # o cliente só desconecta depois da resposta
+
+        async def send(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status['codigo'] = mensagem['status']
+            elif mensagem['type'] == 'http.response.body':
+                await asyncio.sleep(len(mensagem.get('body', b'')) / banda)
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'query_string': b'',
+            'root_path': '', 'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        await aplicacao(scope, receive, send)
+        return time.perf_counter() - chegada, status.get('codigo') == 200
+
+    async def todos():
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*(atender(inicio) for _ in range(clientes)))
+        return respostas, time.perf_counter() - inicio
+
+    with _Monitor() as monitor:
+        respostas, duracao = asyncio.run(todos())
+    connections.close_all()
+    latencias = [tempo for tempo, _ in respostas]
+    return {**_resumir(latencias, sum(not ok for _, ok in respostas), duracao),
+            'servidor': 'ASGI (1 loop de eventos)', **monitor.resultado()}
@@ -0,0 +1,166 @@
+# cardapio/busca.py
+
+import re
+import threading
+import unicodedata
+from django.db import connections, router
+from .models import Prato
+from . import cache as menu_cache
+
+# Tabela FTS5 (criada pela migração 0010) com o código e o nome de cada prato;
+# o rowid é o id do prato
+TABELA_BUSCA = 'cardapio_prato_busca'
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Água Mineral' -> 'agua mineral'."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(letra for letra in decomposto if not unicodedata.combining(letra)).casefold()
+
+
+def _termos(consulta):
+    return re.findall(r'\w+', normalizar(consulta or ''))
+
+
+# --- Índice FTS5 no SQLite ---
+
+_fts_disponivel = {}
+
+
+def fts_disponivel(using=None):
+    """True se o banco tem a tabela FTS5 (SQLite compilado com FTS5 e migração aplicada)."""
+    using = using or router.db_for_read(Prato)
+    if using not in _fts_disponivel:
+        conexao = connections[using]
+        _fts_disponivel[using] = (
+            conexao.vendor == 'sqlite' and TABELA_BUSCA in conexao.introspection.table_names()
+        )
+    return _fts_disponivel[using]
+
+
+def _executar(using, sql, params=()):
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def indexar_pratos(prato_ids, using=None):
+    """
+    Regrava no índice o código e o nome dos pratos (na transação atual, junto
+    com a alteração do prato). Pratos que não existem mais saem do índice.
+    """
+    using = using or router.db_for_write(Prato)
+    prato_ids = list(prato_ids)
+    if not prato_ids or not fts_disponivel(using):
+        return
+    marcadores = ', '.join(['%s'] * len(prato_ids))
+    _executar(using, f"DELETE FROM {TABELA_BUSCA} WHERE rowid IN ({marcadores})", prato_ids)
+    _executar(
+        using,
+        f"INSERT INTO {TABELA_BUSCA} (rowid, codigo_cardapio, nome) "
+        f"SELECT id, codigo_cardapio, nome FROM {Prato._meta.db_table} WHERE id IN ({marcadores})",
+        prato_ids,
+    )
+
+
+def reindexar(using=None):
+    """Refaz o índice inteiro (depois de bulk_create/bulk_update, que não disparam sinais)."""
+    using = using or router.db_for_write(Prato)
+    if not fts_disponivel(using):
+        return
+    _executar(using, f"DELETE FROM {TABELA_BUSCA}")
+    _executar(
+        using,
+        f"INSERT INTO {TABELA_BUSCA} (rowid, codigo_cardapio, nome) "
+        f"SELECT id, codigo_cardapio, nome FROM {Prato._meta.db_table}"
+    )
+
+
+def _buscar_fts(termos, limite, using):
+    # Cada termo vira um prefixo entre aspas ("agu"*): digitar parte da palavra
+    # já encontra, e aspas no texto digitado não viram sintaxe do FTS5
+    expressao = ' '.join('"{}"*'.format(termo.replace('"', '""')) for termo in termos)
+    sql = f"SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s ORDER BY rank"
+    params = [expressao]
+    if limite:
+        sql += " LIMIT %s"
+        params.append(limite)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+# --- Alternativa sem FTS5: índice de trigramas na memória ---
+
+class _IndiceTrigramas:
+    """
+    Trigramas das palavras (código e nome, sem acentos) de cada prato. Um termo
+    com 3 letras ou mais só é conferido nos pratos que têm todos os seus
+    trigramas; termos menores conferem todos os pratos (o cardápio é pequeno).
+    """
+
+    def __init__(self, pratos):
+        self.palavras = {}
+        self.trigramas = {}
+        for prato_id, codigo, nome in pratos:
+            palavras = _termos(f"{codigo} {nome}")
+            self.palavras[prato_id] = palavras
+            for palavra in palavras:
+                for trigrama in self._trigramas(palavra):
+                    self.trigramas.setdefault(trigrama, set()).add(prato_id)
+
+    @staticmethod
+    def _trigramas(palavra):
+        return {palavra[i:i + 3] for i in range(len(palavra) - 2)}
+
+    def buscar(self, termos, limite):
+        candidatos = None
+        for termo in termos:
+            if len(termo) >= 3:
+                achados = set.intersection(
+                    *(self.trigramas.get(trigrama, set()) for trigrama in self._trigramas(termo))
+                )
+                candidatos = achados if candidatos is None else candidatos & achados
+        if candidatos is None:
+            candidatos = self.palavras.keys()
+
+        # Mesma regra do FTS5: cada termo é o começo de alguma palavra do prato
+        encontrados = [
+            prato_id for prato_id in candidatos
+            if all(any(palavra.startswith(termo) for palavra in self.palavras[prato_id]) for termo in termos)
+        ]
+        # Primeiro quem tem o código igual ao termo, depois pela ordem do código
+        encontrados.sort(key=lambda prato_id: (self.palavras[prato_id][0] not in termos, self.palavras[prato_id]))
+        return encontrados[:limite] if limite else encontrados
+
+
+_indice_memoria = {'versao': None, 'indice': None}
+_lock_indice = threading.Lock()
+
+
+def _indice_trigramas():
+    """Índice do processo, refeito quando a versão do cardápio muda."""
+    versao = menu_cache.versao_cardapio()
+    with _lock_indice:
+        if _indice_memoria['versao'] != versao:
+            _indice_memoria['indice'] = _IndiceTrigramas(
+                Prato.objects.values_list('pk', 'codigo_cardapio', 'nome')
+            )
+            _indice_memoria['versao'] = versao
+        return _indice_memoria['indice']
+
+
+# --- Busca ---
+
+def buscar_pratos(consulta, limite=50):
+    """
+    Ids dos pratos cujo código ou nome tem palavras começando com cada termo
+    da consulta, sem diferenciar acentos e maiúsculas ('agua' acha 'Água
+    Mineral', 'p1' acha o código 'P1'), do mais relevante para o menos.
+    """
+    termos = _termos(consulta)
+    if not termos:
+        return []
+    using = router.db_for_read(Prato)
+    if fts_disponivel(using):
+        return _buscar_fts(termos, limite, using)
+    return _indice_trigramas().buscar(termos, limite)
@@ -0,0 +1,283 @@
+# cardapio/cache.py
+
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from .models import Categoria, Prato
+from .replica import usar_replica
+from .unidades import prefixo_cache
+
+# Chaves usadas no cache (a versão entra no nome das chaves de conteúdo)
+CHAVE_VERSAO = 'cardapio:versao'
+CHAVE_VERSAO_ESTOQUE = 'cardapio:versao_estoque'
+CHAVE_VERSAO_ESTOQUE_TODAS = 'cardapio:versao_estoque:todas'
+CHAVE_VERSAO_ESTOQUE_CATEGORIA = 'cardapio:versao_estoque:categoria:{}'
+CHAVE_ACERTOS = 'cardapio:acertos'
+CHAVE_FALHAS = 'cardapio:falhas'
+
+
+def alias_cache():
+    """Nome (alias) do cache do cardápio, para o {% cache ... using=... %} dos templates."""
+    return getattr(settings, 'CARDAPIO_CACHE', 'default')
+
+
+def _cache():
+    """Retorna o backend de cache configurado para o cardápio."""
+    return caches[alias_cache()]
+
+
+def timeout_cache():
+    return getattr(settings, 'CARDAPIO_CACHE_TIMEOUT', 60 * 60)
+
+
+def _chave(chave):
+    # Cada unidade da rede tem as suas versões, contadores e conteúdo
+    return prefixo_cache() + chave
+
+
+def _nova_versao(atual):
+    # Usa o relógio em milissegundos: se a chave da versão for expulsa do cache,
+    # a versão recriada nunca coincide com uma versão antiga ainda armazenada
+    return max(int(time.time() * 1000), atual + 1)
+
+
+# --- Versões do cardápio e do estoque ---
+
+def _versao(chave):
+    cache = _cache()
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, _nova_versao(0), timeout=None)
+        versao = cache.get(chave)
+    return versao
+
+
+def _incrementar(chave):
+    """
+    Troca a versão com um incr (atômico no backend): dois commits ao mesmo
+    tempo nunca ficam com a mesma versão. O salto leva a versão até o relógio,
+    porque ela também serve de carimbo de tempo (Last-Modified da API e
+    conferência da réplica); se dois commits saltarem juntos, ela só passa um
+    pouco do relógio, nunca se repete nem volta.
+    """
+    cache = _cache()
+    atual = cache.get(chave)
+    if atual is None:
+        # Chave ainda não criada (ou expulsa do cache): recomeça pelo relógio
+        if cache.add(chave, _nova_versao(0), timeout=None):
+            return
+        atual = cache.get(chave) or 0
+    try:
+        cache.incr(chave, _nova_versao(atual) - atual)
+    except ValueError:
+        # Expulsa entre a leitura e o incr
+        cache.add(chave, _nova_versao(0), timeout=None)
+
+
+async def _aversao(chave):
+    cache = _cache()
+    versao = await cache.aget(chave)
+    if versao is None:
+        await cache.aadd(chave, _nova_versao(0), timeout=None)
+        versao = await cache.aget(chave)
+    return versao
+
+
+def versao_cardapio():
+    """Retorna a versão atual do cardápio (pratos, preços e categorias)."""
+    return _versao(_chave(CHAVE_VERSAO))
+
+
+async def aversao_cardapio():
+    """Versão assíncrona de versao_cardapio()."""
+    return await _aversao(_chave(CHAVE_VERSAO))
+
+
+def versao_estoque():
+    """Retorna a versão atual do estoque (muda a cada pedido registrado)."""
+    return _versao(_chave(CHAVE_VERSAO_ESTOQUE))
+
+
+async def aversao_estoque():
+    """Versão assíncrona de versao_estoque()."""
+    return await _aversao(_chave(CHAVE_VERSAO_ESTOQUE))
+
+
+def invalidar_cardapio(using=None):
+    """
+    Troca a versão do cardápio quando a transação atual for confirmada.
+    As entradas antigas deixam de ser lidas e expiram sozinhas.
+    """
+    chave = _chave(CHAVE_VERSAO)
+    transaction.on_commit(lambda: _incrementar(chave), using=using or router.db_for_write(Prato))
+
+
+def versoes_estoque_categorias(categoria_ids):
+    """
+    Retorna {categoria_id: versão do estoque da categoria} numa única ida ao
+    cache. A versão junta a geral (trocada quando não se sabe quais categorias
+    mudaram) com a da categoria (trocada pelos pedidos e ajustes dos seus pratos).
+    """
+    cache = _cache()
+    chaves = {_chave(CHAVE_VERSAO_ESTOQUE_CATEGORIA.format(categoria_id)): categoria_id for categoria_id in categoria_ids}
+    encontradas = cache.get_many(list(chaves))
+    faltando = [chave for chave in chaves if chave not in encontradas]
+    if faltando:
+        # add (não set): não sobrescreve uma versão trocada por um pedido no meio tempo
+        for chave in faltando:
+            cache.add(chave, _nova_versao(0), timeout=None)
+        encontradas.update(cache.get_many(faltando))
+    todas = _versao(_chave(CHAVE_VERSAO_ESTOQUE_TODAS))
+    return {categoria_id: f"{todas}.{encontradas[chave]}" for chave, categoria_id in chaves.items()}
+
+
+def invalidar_estoque(using=None, categorias=None):
+    """
+    Troca a versão do estoque quando a transação atual for confirmada.
+    Com 'categorias' (ids), só os fragmentos dessas categorias na tela do
+    garçom são refeitos; sem elas, todos.
+    """
+    if categorias is None:
+        chaves = [_chave(CHAVE_VERSAO_ESTOQUE), _chave(CHAVE_VERSAO_ESTOQUE_TODAS)]
+    else:
+        chaves = [_chave(CHAVE_VERSAO_ESTOQUE)] + [
+            _chave(CHAVE_VERSAO_ESTOQUE_CATEGORIA.format(categoria_id)) for categoria_id in set(categorias)
+        ]
+
+    def incrementar():
+        for chave in chaves:
+            _incrementar(chave)
+
+    transaction.on_commit(incrementar, using=using or router.db_for_write(Prato))
+
+
+# --- Contadores de acerto/falha ---
+
+def _contar(chave):
+    cache = _cache()
+    cache.add(chave, 0, timeout=None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # A chave foi expulsa entre o add e o incr; recomeça a contagem
+        cache.set(chave, 1, timeout=None)
+
+
+async def _acontar(chave):
+    cache = _cache()
+    await cache.aadd(chave, 0, timeout=None)
+    try:
+        await cache.aincr(chave)
+    except ValueError:
+        await cache.aset(chave, 1, timeout=None)
+
+
+def estatisticas_cache():
+    """Retorna os contadores de acertos e falhas do cache do cardápio."""
+    cache = _cache()
+    acertos = cache.get(_chave(CHAVE_ACERTOS), 0)
+    falhas = cache.get(_chave(CHAVE_FALHAS), 0)
+    total = acertos + falhas
+    return {
+        'versao': versao_cardapio(),
+        'acertos': acertos,
+        'falhas': falhas,
+        'taxa_acerto': round(acertos / total, 4) if total else None,
+    }
+
+
+def zerar_estatisticas():
+    _cache().delete_many([_chave(CHAVE_ACERTOS), _chave(CHAVE_FALHAS)])
+
+
+# --- Conteúdo versionado ---
+
+def _obter(nome, gerar):
+    """Busca 'nome' na versão atual do cardápio; em caso de falha, gera e armazena."""
+    cache = _cache()
+    versao = versao_cardapio()
+    chave = _chave(f'cardapio:{nome}:{versao}')
+    valor = cache.get(chave)
+    if valor is not None:
+        _contar(_chave(CHAVE_ACERTOS))
+        return valor
+
+    _contar(_chave(CHAVE_FALHAS))
+    # Pode ler da réplica, desde que a cópia seja posterior a esta versão
+    # (senão guardaria conteúdo antigo com a versão nova)
+    with usar_replica(desde=versao):
+        valor = gerar()
+    cache.set(chave, valor, timeout=timeout_cache())
+    return valor
+
+
+async def _aobter(nome, agerar):
+    """Versão assíncrona de _obter(): 'agerar' é uma função async."""
+    cache = _cache()
+    versao = await aversao_cardapio()
+    chave = _chave(f'cardapio:{nome}:{versao}')
+    valor = await cache.aget(chave)
+    if valor is not None:
+        await _acontar(_chave(CHAVE_ACERTOS))
+        return valor
+
+    await _acontar(_chave(CHAVE_FALHAS))
+    with usar_replica(desde=versao):
+        valor = await agerar()
+    await cache.aset(chave, valor, timeout=timeout_cache())
+    return valor
+
+
+def _montar_estrutura():
+    """Monta a lista categoria -> pratos com duas consultas, sem instanciar models."""
+    categorias = list(Categoria.objects.values('id', 'nome'))
+    pratos_por_categoria = {categoria['id']: [] for categoria in categorias}
+
+    pratos = Prato.objects.order_by('codigo_cardapio').values(
+        'id', 'categoria_id', 'codigo_cardapio', 'nome', 'preco'
+    )
+    for prato in pratos:
+        pratos_por_categoria[prato['categoria_id']].append(prato)
+
+    return [
+        {'nome': categoria['nome'], 'pratos': pratos_por_categoria[categoria['id']]}
+        for categoria in categorias
+    ]
+
+
+async def _amontar_estrutura():
+    """Versão assíncrona de _montar_estrutura() (ORM assíncrono, mesmas duas consultas)."""
+    categorias = [categoria async for categoria in Categoria.objects.values('id', 'nome')]
+    pratos_por_categoria = {categoria['id']: [] for categoria in categorias}
+
+    pratos = Prato.objects.order_by('codigo_cardapio').values(
+        'id', 'categoria_id', 'codigo_cardapio', 'nome', 'preco'
+    )
+    async for prato in pratos.aiterator():
+        pratos_por_categoria[prato['categoria_id']].append(prato)
+
+    return [
+        {'nome': categoria['nome'], 'pratos': pratos_por_categoria[categoria['id']]}
+        for categoria in categorias
+    ]
+
+
+def obter_estrutura():
+    """Retorna a estrutura categoria -> pratos do cardápio (com cache)."""
+    return _obter('estrutura', _montar_estrutura)
+
+
+def obter_html(nome, gerar):
+    """Retorna o HTML 'nome' renderizado para a versão atual do cardápio (com cache)."""
+    return _obter(f'html:{nome}', gerar)
+
+
+async def aobter_estrutura():
+    """Versão assíncrona de obter_estrutura()."""
+    return await _aobter('estrutura', _amontar_estrutura)
+
+
+async def aobter_html(nome, agerar):
+    """Versão assíncrona de obter_html(): 'agerar' é uma função async."""
+    return await _aobter(f'html:{nome}', agerar)
@@ -0,0 +1,237 @@
+# cardapio/estaticos.py
+
+import asyncio
+import gzip
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from wsgiref.util import FileWrapper
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote 'brotli', gera só as versões .gz
+    brotli = None
+
+# Tipos de arquivo que valem a pena comprimir (imagens e fontes já vêm comprimidas)
+EXTENSOES_COMPRIMIVEIS = {'.css', '.js', '.mjs', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ico'}
+
+# Nome gerado pelo ManifestStaticFilesStorage: 'style.3f2a9c81d0e4.css'
+NOME_COM_HASH = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+CACHE_LONGO = 'public, max-age=31536000, immutable'
+CACHE_CURTO = 'public, max-age=60'
+
+
+# --- Etapa do collectstatic ---
+
+class ArmazenamentoComprimido(ManifestStaticFilesStorage):
+    """
+    Além dos nomes com hash do conteúdo, grava ao lado de cada arquivo de texto
+    uma versão .gz e (se o pacote 'brotli' estiver instalado) uma .br, já na
+    compressão máxima: o servidor só escolhe o arquivo, não comprime nada.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        gerados = set()
+        for original, processado, alterado in super().post_process(paths, dry_run, **options):
+            if not dry_run and isinstance(processado, str):
+                gerados.add(processado)
+            yield original, processado, alterado
+
+        if dry_run:
+            return
+        # Comprime também os originais (sem hash), usados com DEBUG ou em links fixos
+        for nome in gerados | set(paths):
+            if os.path.splitext(nome)[1].lower() in EXTENSOES_COMPRIMIVEIS and self.exists(nome):
+                self._comprimir(nome)
+
+    def _comprimir(self, nome):
+        with self.open(nome) as arquivo:
+            conteudo = arquivo.read()
+        versoes = {'.gz': gzip.compress(conteudo, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            versoes['.br'] = brotli.compress(conteudo, quality=11)
+
+        for extensao, comprimido in versoes.items():
+            # Só vale guardar se ficou menor
+            if len(comprimido) < len(conteudo):
+                with open(self.path(nome) + extensao, 'wb') as destino:
+                    destino.write(comprimido)
+
+
+# --- Servidor dos arquivos estáticos (WSGI e ASGI) ---
+
+class _IndiceEstaticos:
+    """
+    Índice dos arquivos do STATIC_ROOT montado uma vez, na inicialização:
+    caminho da URL -> arquivo, versões comprimidas e cabeçalhos. Cada
+    requisição é só uma busca num dict (sem acessar o disco para decidir).
+    """
+
+    def __init__(self, raiz=None, prefixo=None):
+        self.raiz = str(raiz or getattr(settings, 'STATIC_ROOT', None) or '')
+        self.prefixo = prefixo or settings.STATIC_URL
+        if not self.prefixo.startswith('/'):
+            self.prefixo = '/' + self.prefixo
+        self.arquivos = {}
+        if self.raiz and os.path.isdir(self.raiz):
+            self._indexar()
+
+    def _indexar(self):
+        for pasta, _, nomes in os.walk(self.raiz):
+            for nome in nomes:
+                if nome.endswith(('.gz', '.br')):
+                    continue
+                caminho = os.path.join(pasta, nome)
+                relativo = os.path.relpath(caminho, self.raiz).replace(os.sep, '/')
+                tipo, _ = mimetypes.guess_type(nome)
+                if tipo and tipo.startswith('text/') or tipo in ('application/javascript', 'image/svg+xml'):
+                    tipo = f'{tipo}; charset=utf-8'
+                info = os.stat(caminho)
+                self.arquivos[self.prefixo + relativo] = {
+                    'caminho': caminho,
+                    'variantes': {
+                        codificacao: (caminho + extensao, os.path.getsize(caminho + extensao))
+                        for codificacao, extensao in (('br', '.br'), ('gzip', '.gz'))
+                        if os.path.exists(caminho + extensao)
+                    },
+                    'tamanho': info.st_size,
+                    'modificado': int(info.st_mtime),
+                    'tipo': tipo or 'application/octet-stream',
+                    'cache': CACHE_LONGO if NOME_COM_HASH.search(nome) else CACHE_CURTO,
+                }
+
+    def resolver(self, metodo, caminho, accept_encoding, if_modified_since):
+        """
+        Retorna (status, cabeçalhos, arquivo_ou_None) ou None se a URL não for
+        de um arquivo estático conhecido (a requisição segue para o Django).
+        """
+        if not self.arquivos or not caminho.startswith(self.prefixo):
+            return None
+        entrada = self.arquivos.get(caminho)
+        if entrada is None:
+            return None
+        if metodo not in ('GET', 'HEAD'):
+            return 405, [('Allow', 'GET, HEAD'), ('Content-Length', '0')], None
+
+        cabecalhos = [
+            ('Cache-Control', entrada['cache']),
+            ('Last-Modified', formatdate(entrada['modificado'], usegmt=True)),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        if if_modified_since:
+            try:
+                if parsedate_to_datetime(if_modified_since).timestamp() >= entrada['modificado']:
+                    return 304, cabecalhos, None
+            except (TypeError, ValueError):
+                pass
+
+        # Escolhe a melhor versão aceita pelo cliente (maior q; empate: br > gzip > original)
+        aceitas = _codificacoes_aceitas(accept_encoding)
+        arquivo, tamanho = entrada['caminho'], entrada['tamanho']
+        escolhida, melhor = None, 0
+        for codificacao, (variante, tamanho_variante) in entrada['variantes'].items():
+            q = aceitas.get(codificacao, aceitas.get('*', 0))
+            if q > melhor:
+                escolhida, melhor, arquivo, tamanho = codificacao, q, variante, tamanho_variante
+        if escolhida:
+            cabecalhos.append(('Content-Encoding', escolhida))
+
+        cabecalhos += [('Content-Type', entrada['tipo']), ('Content-Length', str(tamanho))]
+        return 200, cabecalhos, (arquivo if metodo == 'GET' else None)
+
+
+def _codificacoes_aceitas(accept_encoding):
+    """
+    {codificação: q} do Accept-Encoding ('gzip;q=0.5, br' -> {'gzip': 0.5, 'br': 1.0}).
+    q=0 (ou um q inválido) quer dizer "não aceito".
+    """
+    aceitas = {}
+    for parte in accept_encoding.lower().split(','):
+        nome, _, parametros = parte.partition(';')
+        nome = nome.strip()
+        if not nome:
+            continue
+        q = 1.0
+        for parametro in parametros.split(';'):
+            chave, _, valor = parametro.partition('=')
+            if chave.strip() == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        aceitas[nome] = q
+    return aceitas
+
+
+_FRASES = {200: 'OK', 304: 'Not Modified', 405: 'Method Not Allowed'}
+_BLOCO = 64 * 1024
+
+
+class ServidorEstaticosWSGI:
+    """Envolve a aplicação WSGI: serve o STATIC_ROOT e repassa o resto ao Django."""
+
+    def __init__(self, aplicacao, raiz=None, prefixo=None):
+        self.aplicacao = aplicacao
+        self.indice = _IndiceEstaticos(raiz, prefixo)
+
+    def __call__(self, environ, start_response):
+        resposta = self.indice.resolver(
+            environ.get('REQUEST_METHOD', 'GET'), environ.get('PATH_INFO', ''),
+            environ.get('HTTP_ACCEPT_ENCODING', ''), environ.get('HTTP_IF_MODIFIED_SINCE'),
+        )
+        if resposta is None:
+            return self.aplicacao(environ, start_response)
+
+        status, cabecalhos, arquivo = resposta
+        start_response(f'{status} {_FRASES[status]}', cabecalhos)
+        if arquivo is None:
+            return []
+        # O servidor (gunicorn, uwsgi) pode usar sendfile com o file_wrapper;
+        # sem ele, o FileWrapper do wsgiref lê em blocos e fecha o arquivo no close()
+        envio = environ.get('wsgi.file_wrapper', FileWrapper)
+        return envio(open(arquivo, 'rb'), _BLOCO)
+
+
+class ServidorEstaticosASGI:
+    """Envolve a aplicação ASGI: serve o STATIC_ROOT e repassa o resto ao Django."""
+
+    def __init__(self, aplicacao, raiz=None, prefixo=None):
+        self.aplicacao = aplicacao
+        self.indice = _IndiceEstaticos(raiz, prefixo)
+
+    async def __call__(self, scope, receive, send):
+        resposta = None
+        if scope['type'] == 'http':
+            cabecalhos = {nome.decode('latin-1').lower(): valor.decode('latin-1') for nome, valor in scope['headers']}
+            resposta = self.indice.resolver(
+                scope['method'], scope['path'],
+                cabecalhos.get('accept-encoding', ''), cabecalhos.get('if-modified-since'),
+            )
+        if resposta is None:
+            return await self.aplicacao(scope, receive, send)
+
+        status, cabecalhos, arquivo = resposta
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos],
+        })
+        if arquivo is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        # Lê o arquivo fora do loop de eventos, em blocos
+        conteudo = await asyncio.to_thread(open, arquivo, 'rb')
+        try:
+            while True:
+                bloco = await asyncio.to_thread(conteudo.read, _BLOCO)
+                proximo = len(bloco) == _BLOCO
+                await send({'type': 'http.response.body', 'body': bloco, 'more_body': proximo})
+                if not proximo:
+                    break
+        finally:
+            conteudo.close()
@@ -0,0 +1,89 @@
+# cardapio/estoque.py
+
+from django.db import connections, router, transaction
+from django.db.models import (
+    F, Max, Sum, Value, Exists, OuterRef, Subquery, IntegerField, CharField, DateTimeField
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Prato, MovimentoEstoque
+from .cache import invalidar_estoque
+
+
+def estoques_atuais(prato_ids):
+    """Retorna {prato_id: estoque_atual} para os pratos informados (uma consulta)."""
+    return dict(
+        Prato.objects.com_estoque_atual()
+        .filter(pk__in=prato_ids)
+        .values_list('pk', 'estoque_atual')
+    )
+
+
+def lancar_movimento(prato, quantidade, tipo, observacao='', pedido=None):
+    """Lança uma entrada (+) ou saída (-) no livro de estoque."""
+    movimento = MovimentoEstoque.objects.create(
+        prato=prato, quantidade=quantidade, tipo=tipo, observacao=observacao, pedido=pedido
+    )
+    invalidar_estoque(categorias=[prato.categoria_id])
+    return movimento
+
+
+def baixar_se_disponivel(prato_id, quantidade, pedido=None, tipo=MovimentoEstoque.PEDIDO):
+    """
+    Lança a saída de 'quantidade' só se o estoque atual do prato for suficiente,
+    num único INSERT ... SELECT condicionado ao estoque (sem ler antes nem
+    bloquear a linha do prato). Retorna True se o movimento foi gravado.
+    """
+    banco = router.db_for_write(MovimentoEstoque)
+    selecao = (
+        Prato.objects.using(banco).com_estoque_atual()
+        .filter(pk=prato_id, estoque_atual__gte=quantidade)
+        .order_by()
+        .values_list(
+            'pk',
+            Value(-quantidade, output_field=IntegerField()),
+            Value(tipo, output_field=CharField()),
+            Value(pedido.pk if pedido else None, output_field=IntegerField()),
+            Value('', output_field=CharField()),
+            Value(timezone.now(), output_field=DateTimeField()),
+        )
+    )
+    sql, params = selecao.query.get_compiler(using=banco).as_sql()
+
+    conexao = connections[banco]
+    nome = conexao.ops.quote_name
+    colunas = ', '.join(
+        nome(MovimentoEstoque._meta.get_field(campo).column)
+        for campo in ['prato', 'quantidade', 'tipo', 'pedido', 'observacao', 'criado_em']
+    )
+    with conexao.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {nome(MovimentoEstoque._meta.db_table)} ({colunas}) {sql}", params)
+        # 0 linhas: o SELECT não achou o prato com estoque suficiente
+        return cursor.rowcount == 1
+
+
+def compactar_estoque():
+    """
+    Inclui no fechamento (Prato.estoque) todos os movimentos lançados até agora,
+    com um único UPDATE. Os movimentos continuam no livro; só deixam de ser
+    somados na leitura do estoque atual. Retorna (pratos_fechados, ultimo_movimento).
+
+    Rodar periodicamente mantém curta a lista de movimentos pendentes de cada
+    prato, e a leitura do estoque atual em O(1) amortizado.
+    """
+    with transaction.atomic(using=router.db_for_write(Prato)):
+        ultimo = MovimentoEstoque.objects.aggregate(ultimo=Max('id'))['ultimo']
+        if ultimo is None:
+            return 0, 0
+
+        pendentes = MovimentoEstoque.objects.filter(
+            prato=OuterRef('pk'), id__gt=OuterRef('estoque_ate_movimento'), id__lte=ultimo
+        )
+        soma = pendentes.values('prato').annotate(soma=Sum('quantidade')).values('soma')
+
+        # No SET, OuterRef('estoque_ate_movimento') ainda é o valor anterior da linha
+        fechados = Prato.objects.filter(Exists(pendentes)).update(
+            estoque=F('estoque') + Coalesce(Subquery(soma), Value(0), output_field=IntegerField()),
+            estoque_ate_movimento=ultimo,
+        )
+    return fechados, ultimo
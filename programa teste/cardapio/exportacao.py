@@ -0,0 +1,130 @@
+# cardapio/exportacao.py
+
+import csv
+import json
+import zlib
+from itertools import groupby
+from django.utils import timezone
+from .models import Pedido
+from .replica import usar_replica
+
+FORMATOS = ['csv', 'jsonl']
+
+# Colunas do CSV: uma linha por item, com os dados do pedido repetidos
+COLUNAS_CSV = [
+    'pedido_id', 'data_pedido', 'nome_cliente', 'pago', 'total_pedido',
+    'item_id', 'codigo_cardapio', 'prato', 'quantidade', 'preco_unitario', 'subtotal',
+]
+
+# Campos lidos do banco (Pedido + itens + prato num único JOIN)
+_CAMPOS = [
+    'id', 'data_pedido', 'nome_cliente', 'pago', 'total',
+    'itens__id', 'itens__prato__codigo_cardapio', 'itens__prato__nome',
+    'itens__quantidade', 'itens__preco_unitario',
+]
+
+
+def filtrar_pedidos(inicio=None, fim=None, pago=None):
+    """
+    Pedidos do período (datas locais, inclusivas) e, se informado, da situação
+    de pagamento. Datas em branco não limitam o período.
+    """
+    pedidos = Pedido.objects.all()
+    if inicio:
+        pedidos = pedidos.filter(data_pedido__date__gte=inicio)
+    if fim:
+        pedidos = pedidos.filter(data_pedido__date__lte=fim)
+    if pago is not None:
+        pedidos = pedidos.filter(pago=pago)
+    return pedidos
+
+
+def _linhas(pedidos, tamanho_bloco):
+    """
+    Percorre os pedidos com seus itens em blocos de 'tamanho_bloco' linhas
+    (.iterator: nada fica acumulado na memória). O JOIN com itens e prato é
+    feito na mesma consulta; pedidos sem itens aparecem uma vez, com os campos
+    do item vazios.
+    """
+    return (
+        pedidos.order_by('id', 'itens__id')
+        .values_list(*_CAMPOS)
+        .iterator(chunk_size=tamanho_bloco)
+    )
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(pedidos, tamanho_bloco=2000):
+    """Gera o CSV linha a linha (texto)."""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_CSV)
+    for (pedido_id, data, cliente, pago, total,
+         item_id, codigo, prato, quantidade, preco) in _linhas(pedidos, tamanho_bloco):
+        subtotal = preco * quantidade if item_id else None
+        yield escritor.writerow([
+            pedido_id, timezone.localtime(data).isoformat(), cliente, int(pago), total,
+            item_id, codigo, prato, quantidade, preco, subtotal,
+        ])
+
+
+def gerar_jsonl(pedidos, tamanho_bloco=2000):
+    """Gera um objeto JSON por pedido (uma linha cada), com a lista de itens."""
+    # As linhas vêm ordenadas por pedido: agrupa as consecutivas
+    for pedido_id, linhas in groupby(_linhas(pedidos, tamanho_bloco), key=lambda linha: linha[0]):
+        itens = []
+        for (_, data, cliente, pago, total,
+             item_id, codigo, prato, quantidade, preco) in linhas:
+            if item_id:
+                itens.append({
+                    'id': item_id, 'codigo_cardapio': codigo, 'prato': prato,
+                    'quantidade': quantidade, 'preco_unitario': str(preco),
+                })
+        yield json.dumps({
+            'id': pedido_id, 'data_pedido': timezone.localtime(data).isoformat(),
+            'nome_cliente': cliente, 'pago': pago, 'total': str(total), 'itens': itens,
+        }, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def gerar_exportacao(formato, pedidos, tamanho_bloco=2000):
+    """Gera o conteúdo da exportação ('csv' ou 'jsonl') em pedaços de texto."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato!r}. Use {', '.join(FORMATOS)}.")
+    gerar = gerar_csv if formato == 'csv' else gerar_jsonl
+    return gerar(pedidos, tamanho_bloco)
+
+
+def na_replica(pedacos):
+    """Gera os pedaços lendo da réplica de leitura (se estiver em dia)."""
+    with usar_replica():
+        yield from pedacos
+
+
+def codificar(pedacos, comprimir=False, tamanho_saida=64 * 1024):
+    """
+    Converte os pedaços de texto em bytes UTF-8, opcionalmente em gzip.
+    Junta os pedaços até 'tamanho_saida' bytes antes de entregar, para não
+    fazer uma escrita (ou um pacote HTTP) por linha.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # 31 = formato gzip
+    buffer = []
+    tamanho = 0
+    for pedaco in pedacos:
+        dados = pedaco.encode('utf-8')
+        if compressor:
+            dados = compressor.compress(dados)
+        if dados:
+            buffer.append(dados)
+            tamanho += len(dados)
+        if tamanho >= tamanho_saida:
+            yield b''.join(buffer)
+            buffer, tamanho = [], 0
+    if compressor:
+        buffer.append(compressor.flush())
+    if buffer:
+        yield b''.join(buffer)
@@ -0,0 +1,177 @@
+# cardapio/fila.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Q, Prefetch
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Pedido, ItemPedido, FilaPedido
+from . import painel
+
+logger = logging.getLogger('cardapio.fila')
+
+# Tarefas executadas para cada lote de pedidos (caminhos 'modulo.funcao')
+TAREFAS_PADRAO = [
+    'cardapio.fila.enviar_para_cozinha',
+    'cardapio.fila.emitir_recibos',
+]
+
+
+def modo_fila():
+    """True se os pedidos devem ir para a fila (CARDAPIO_MODO_PEDIDO = 'fila')."""
+    return getattr(settings, 'CARDAPIO_MODO_PEDIDO', 'sincrono') == 'fila'
+
+
+# --- Tarefas de acompanhamento ---
+# Recebem uma lista de Pedidos e precisam ser idempotentes: se o trabalhador
+# cair no meio do lote, o lote inteiro é executado de novo.
+
+def enviar_para_cozinha(pedidos):
+    """Marca os pedidos como enviados à cozinha (e avisa o painel de pedidos)."""
+    pendentes = [pedido for pedido in pedidos if pedido.enviado_cozinha_em is None]
+    agora = timezone.now()
+    if pendentes and Pedido.objects.filter(
+        pk__in=[pedido.pk for pedido in pendentes], enviado_cozinha_em__isnull=True
+    ).update(enviado_cozinha_em=agora):
+        # O update() não dispara sinais: o painel recebe os pedidos já lidos
+        for pedido in pendentes:
+            pedido.enviado_cozinha_em = agora
+        painel.pedidos_carregados_alterados(pendentes)
+
+
+def emitir_recibos(pedidos):
+    """Registra o recibo de cada pedido no logger 'cardapio.recibos'."""
+    recibos = logging.getLogger('cardapio.recibos')
+    for pedido in pedidos:
+        linhas = [f"{item.quantidade}x {item.prato.nome} R$ {item.preco_unitario}" for item in pedido.itens.all()]
+        recibos.info("Recibo %s | %s | Total R$ %s", pedido, '; '.join(linhas), pedido.total)
+
+
+def _tarefas():
+    return [import_string(caminho) for caminho in getattr(settings, 'CARDAPIO_FILA_TAREFAS', TAREFAS_PADRAO)]
+
+
+def executar_tarefas(pedidos):
+    """Executa todas as tarefas de acompanhamento para os pedidos."""
+    for tarefa in _tarefas():
+        tarefa(pedidos)
+
+
+def _carregar_pedidos(ids_pedido):
+    # Pedidos e itens (já com o prato, por JOIN): duas consultas por lote
+    return list(
+        Pedido.objects.filter(pk__in=ids_pedido)
+        .prefetch_related(Prefetch('itens', queryset=ItemPedido.objects.select_related('prato')))
+        .order_by('pk')
+    )
+
+
+# --- Entrada na fila ---
+
+def enfileirar(pedido):
+    """
+    Coloca o pedido na fila. Deve ser chamado na mesma transação que criou o
+    pedido: ou os dois são gravados, ou nenhum.
+    """
+    return FilaPedido.objects.create(pedido=pedido)
+
+
+def enfileirar_varios(pedidos):
+    """Como enfileirar(), para vários pedidos de uma vez (um INSERT)."""
+    return FilaPedido.objects.bulk_create([FilaPedido(pedido=pedido) for pedido in pedidos])
+
+
+def processar_apos_commit(pedido):
+    """Modo síncrono: executa as tarefas dentro da requisição, após o commit."""
+    processar_varios_apos_commit([pedido])
+
+
+def processar_varios_apos_commit(pedidos):
+    """Como processar_apos_commit(), com os pedidos num único lote de tarefas."""
+    ids = [pedido.pk for pedido in pedidos]
+    transaction.on_commit(lambda: _executar_no_commit(ids), using=router.db_for_write(Pedido))
+
+
+def _executar_no_commit(ids_pedido):
+    """
+    Tarefas do modo síncrono. O pedido já foi gravado: um erro aqui não pode
+    chegar ao cliente (ele veria uma falha num pedido feito e poderia reenviar).
+    O erro vai para o log e os pedidos entram na fila com status 'erro'
+    (reenviados pela ação do Admin e concluídos pelo processar_fila).
+    """
+    try:
+        executar_tarefas(_carregar_pedidos(ids_pedido))
+    except Exception as e:
+        logger.exception("Falha nas tarefas dos pedidos %s (modo síncrono)", ids_pedido)
+        try:
+            FilaPedido.objects.bulk_create(
+                [FilaPedido(pedido_id=pedido_id, status=FilaPedido.ERRO, tentativas=1, ultimo_erro=str(e))
+                 for pedido_id in ids_pedido],
+                ignore_conflicts=True,
+            )
+        except Exception:
+            # Banco indisponível também para a fila: fica só o registro no log
+            logger.exception("Não foi possível registrar na fila os pedidos %s", ids_pedido)
+
+
+def reenfileirar(entradas):
+    """Volta entradas com erro para 'pendente' (o próximo processar_fila executa de novo)."""
+    return entradas.filter(status=FilaPedido.ERRO).update(
+        status=FilaPedido.PENDENTE, tentativas=0, reservado_em=None, reservado_por=''
+    )
+
+
+# --- Consumo da fila ---
+
+def reservar_lote(trabalhador, tamanho=50, expiracao=300):
+    """
+    Reserva até 'tamanho' entradas pendentes (ou com reserva vencida há mais de
+    'expiracao' segundos, de um trabalhador que caiu) e retorna seus ids.
+    """
+    agora = timezone.now()
+    disponivel = Q(status=FilaPedido.PENDENTE) | Q(
+        status=FilaPedido.PROCESSANDO, reservado_em__lt=agora - timedelta(seconds=expiracao)
+    )
+    with transaction.atomic(using=router.db_for_write(FilaPedido)):
+        ids = list(
+            FilaPedido.objects.select_for_update(skip_locked=True)
+            .filter(disponivel)
+            .order_by('id')
+            .values_list('id', flat=True)[:tamanho]
+        )
+        # Repete a condição no UPDATE: outro trabalhador pode ter reservado antes
+        FilaPedido.objects.filter(disponivel, id__in=ids).update(
+            status=FilaPedido.PROCESSANDO,
+            reservado_em=agora,
+            reservado_por=trabalhador,
+            tentativas=F('tentativas') + 1,
+        )
+    return list(
+        FilaPedido.objects.filter(id__in=ids, reservado_por=trabalhador, reservado_em=agora)
+        .values_list('id', flat=True)
+    )
+
+
+def processar_lote(ids_fila, max_tentativas=5):
+    """
+    Executa as tarefas para as entradas reservadas. Em caso de erro, o lote
+    volta a ficar pendente (ou vai para 'erro' após max_tentativas).
+    Retorna o número de pedidos concluídos.
+    """
+    if not ids_fila:
+        return 0
+
+    entradas = FilaPedido.objects.filter(id__in=ids_fila)
+    try:
+        executar_tarefas(_carregar_pedidos(entradas.values_list('pedido_id', flat=True)))
+    except Exception as e:
+        logger.exception("Falha ao processar o lote %s", ids_fila)
+        entradas.filter(tentativas__gte=max_tentativas).update(status=FilaPedido.ERRO, ultimo_erro=str(e))
+        entradas.filter(tentativas__lt=max_tentativas).update(
+            status=FilaPedido.PENDENTE, reservado_em=None, reservado_por='', ultimo_erro=str(e)
+        )
+        return 0
+
+    return entradas.update(status=FilaPedido.CONCLUIDO, ultimo_erro='')
@@ -0,0 +1,63 @@
+# cardapio/idempotencia.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import ChaveIdempotencia
+
+TAMANHO_MAXIMO = ChaveIdempotencia._meta.get_field('chave').max_length
+
+
+def validar_chave(chave):
+    """Retorna a chave limpa (ou None se vazia); lança ValueError se for inválida."""
+    if chave is not None and not isinstance(chave, str):
+        raise ValueError("Chave de idempotência precisa ser um texto.")
+    chave = (chave or '').strip()
+    if not chave:
+        return None
+    if len(chave) > TAMANHO_MAXIMO:
+        raise ValueError(f"Chave de idempotência com mais de {TAMANHO_MAXIMO} caracteres.")
+    return chave
+
+
+def pedido_da_chave(chave):
+    """Pedido já registrado com esta chave (se ainda válida), com uma única leitura."""
+    registro = (
+        ChaveIdempotencia.objects.select_related('pedido')
+        .filter(chave=chave, expira_em__gt=timezone.now())
+        .first()
+    )
+    return registro.pedido if registro else None
+
+
+def registrar_chave(chave, pedido):
+    """
+    Grava a chave do pedido (na mesma transação que criou o pedido). Uma chave
+    antiga já expirada, mas ainda não removida, é substituída.
+    """
+    return registrar_chaves([(chave, pedido)])[0]
+
+
+def registrar_chaves(chaves_e_pedidos):
+    """Como registrar_chave(), para vários pedidos de uma vez (um DELETE e um INSERT)."""
+    if not chaves_e_pedidos:
+        return []
+    agora = timezone.now()
+    ChaveIdempotencia.objects.filter(
+        chave__in=[chave for chave, _ in chaves_e_pedidos], expira_em__lte=agora
+    ).delete()
+    expira_em = agora + timedelta(seconds=getattr(settings, 'CARDAPIO_IDEMPOTENCIA_TTL', 24 * 60 * 60))
+    return ChaveIdempotencia.objects.bulk_create([
+        ChaveIdempotencia(chave=chave, pedido=pedido, expira_em=expira_em) for chave, pedido in chaves_e_pedidos
+    ])
+
+
+def purgar_expiradas(lote=5000):
+    """Remove as chaves expiradas em lotes (um DELETE por lote). Retorna o total removido."""
+    agora = timezone.now()
+    removidas = 0
+    while True:
+        ids = list(ChaveIdempotencia.objects.filter(expira_em__lte=agora).values_list('id', flat=True)[:lote])
+        if not ids:
+            return removidas
+        removidas += ChaveIdempotencia.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,232 @@
+# cardapio/importador.py
+
+import os
+import json
+import time
+from decimal import Decimal
+from django.db import transaction
+from .models import Categoria, Prato, ItemPedido, MovimentoEstoque, VendaPrato
+from .cache import invalidar_cardapio, invalidar_estoque
+from .busca import reindexar
+from .rede import replicar_catalogo
+from . import unidades
+
+# Arquivo padrão do cardápio (dentro da pasta 'cardapio')
+ARQUIVO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cardapio.json')
+
+
+# --- Leitura do JSON em streaming ---
+
+class _LeitorJSON:
+    """
+    Lê um arquivo JSON aos pedaços, sem carregar o arquivo inteiro na memória.
+    Só decodifica strings e objetos com raw_decode: um pedaço incompleto deles
+    sempre gera erro, então basta ler mais um bloco e tentar de novo.
+    """
+
+    def __init__(self, arquivo, tamanho_bloco):
+        self.arquivo = arquivo
+        self.tamanho_bloco = tamanho_bloco
+        self.buffer = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder(parse_float=Decimal)
+
+    def _ler_mais(self):
+        dados = self.arquivo.read(self.tamanho_bloco)
+        if not dados:
+            return False
+        # Descarta o que já foi consumido para o buffer não crescer
+        self.buffer = self.buffer[self.pos:] + dados
+        self.pos = 0
+        return True
+
+    def _proximo(self):
+        """Pula espaços e retorna o próximo caractere (sem consumi-lo)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._ler_mais():
+                raise ValueError("Fim inesperado do arquivo JSON.")
+
+    def _consumir(self, esperados):
+        caractere = self._proximo()
+        if caractere not in esperados:
+            raise ValueError(f"JSON inválido: esperado {esperados!r}, encontrado {caractere!r}.")
+        self.pos += 1
+        return caractere
+
+    def valor(self):
+        """Decodifica a próxima string ou objeto JSON."""
+        self._proximo()
+        while True:
+            try:
+                valor, fim = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._ler_mais():
+                    raise
+                continue
+            self.pos = fim
+            return valor
+
+    def chaves(self):
+        """Percorre um objeto JSON gerando suas chaves; o valor deve ser lido em seguida."""
+        self._consumir('{')
+        if self._proximo() == '}':
+            self.pos += 1
+            return
+        while True:
+            chave = self.valor()
+            self._consumir(':')
+            yield chave
+            if self._consumir(',}') == '}':
+                return
+
+
+def ler_cardapio(caminho, tamanho_bloco=64 * 1024):
+    """Gera (categoria, codigo, dados_do_prato) a partir do arquivo do cardápio."""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        leitor = _LeitorJSON(f, tamanho_bloco)
+        for categoria_nome in leitor.chaves():
+            for codigo in leitor.chaves():
+                yield categoria_nome, codigo, leitor.valor()
+
+
+# --- Importação incremental ---
+
+def importar_cardapio(caminho=ARQUIVO_PADRAO, tamanho_lote=500, simular=False):
+    """
+    Sincroniza Categoria/Prato com o arquivo do cardápio usando o codigo_cardapio.
+
+    Insere os pratos novos (bulk_create), atualiza os alterados (bulk_update) e
+    remove os que saíram do arquivo, tudo em lotes de 'tamanho_lote'. Diferenças
+    de estoque viram movimentos de ajuste no livro de estoque. Pratos que já
+    aparecem em algum pedido ou nas vendas consolidadas não podem ser apagados
+    (PROTECT): ficam com estoque zero. Com simular=True tudo é desfeito no final (dry-run).
+
+    Retorna um dict com as contagens e o tempo (segundos) de cada fase.
+    """
+    contagem = dict(inseridos=0, atualizados=0, ajustes_estoque=0, inalterados=0, removidos=0,
+                    zerados=0, duplicados=0, categorias_criadas=0, categorias_removidas=0)
+    tempos = dict(indice=0.0, leitura=0.0, insercao=0.0, atualizacao=0.0, remocao=0.0)
+
+    with transaction.atomic():
+        # 1. Índice dos registros existentes (uma consulta por tabela)
+        inicio = time.perf_counter()
+        categorias = dict(Categoria.objects.values_list('nome', 'id'))
+        existentes = {
+            codigo: (pk, categoria_id, nome, preco, estoque)
+            for pk, codigo, categoria_id, nome, preco, estoque in Prato.objects.com_estoque_atual().values_list(
+                'pk', 'codigo_cardapio', 'categoria_id', 'nome', 'preco', 'estoque_atual'
+            )
+        }
+        tempos['indice'] = time.perf_counter() - inicio
+
+        inserir, atualizar, ajustes = [], [], []
+        vistos, categorias_vistas = set(), set()
+
+        def gravar_insercoes():
+            inicio = time.perf_counter()
+            Prato.objects.bulk_create(inserir, batch_size=tamanho_lote)
+            contagem['inseridos'] += len(inserir)
+            inserir.clear()
+            tempos['insercao'] += time.perf_counter() - inicio
+
+        def gravar_atualizacoes():
+            inicio = time.perf_counter()
+            Prato.objects.bulk_update(atualizar, ['categoria', 'nome', 'preco'], batch_size=tamanho_lote)
+            contagem['atualizados'] += len(atualizar)
+            atualizar.clear()
+            tempos['atualizacao'] += time.perf_counter() - inicio
+
+        def gravar_ajustes():
+            # O estoque não é sobrescrito: a diferença entra no livro de estoque
+            inicio = time.perf_counter()
+            MovimentoEstoque.objects.bulk_create(ajustes, batch_size=tamanho_lote)
+            contagem['ajustes_estoque'] += len(ajustes)
+            ajustes.clear()
+            tempos['atualizacao'] += time.perf_counter() - inicio
+
+        # 2. Lê o arquivo em streaming e compara cada prato com o registro atual
+        inicio_leitura = time.perf_counter()
+        for categoria_nome, codigo, info in ler_cardapio(caminho):
+            categorias_vistas.add(categoria_nome)
+            if categoria_nome not in categorias:
+                categorias[categoria_nome] = Categoria.objects.create(nome=categoria_nome).pk
+                contagem['categorias_criadas'] += 1
+
+            if codigo in vistos:
+                contagem['duplicados'] += 1
+                continue
+            vistos.add(codigo)
+
+            novo = (categorias[categoria_nome], info['nome'], Decimal(str(info['preco'])), int(info['estoque']))
+            atual = existentes.get(codigo)
+
+            if atual is None:
+                inserir.append(Prato(categoria_id=novo[0], codigo_cardapio=codigo,
+                                     nome=novo[1], preco=novo[2], estoque=novo[3]))
+                if len(inserir) >= tamanho_lote:
+                    gravar_insercoes()
+            elif atual[1:] == novo:
+                contagem['inalterados'] += 1
+            else:
+                if atual[1:4] != novo[:3]:
+                    atualizar.append(Prato(pk=atual[0], categoria_id=novo[0], codigo_cardapio=codigo,
+                                           nome=novo[1], preco=novo[2]))
+                    if len(atualizar) >= tamanho_lote:
+                        gravar_atualizacoes()
+                if atual[4] != novo[3]:
+                    ajustes.append(MovimentoEstoque(prato_id=atual[0], quantidade=novo[3] - atual[4],
+                                                   tipo=MovimentoEstoque.AJUSTE, observacao='Importação do cardápio'))
+                    if len(ajustes) >= tamanho_lote:
+                        gravar_ajustes()
+
+        gravar_insercoes()
+        gravar_atualizacoes()
+        gravar_ajustes()
+        tempos['leitura'] = time.perf_counter() - inicio_leitura - tempos['insercao'] - tempos['atualizacao']
+
+        # 3. Remove (ou zera o estoque, se houver pedidos ou vendas) os pratos que saíram do arquivo
+        inicio = time.perf_counter()
+        sairam = [codigo for codigo in existentes if codigo not in vistos]
+        for i in range(0, len(sairam), tamanho_lote):
+            codigos_sairam = sairam[i:i + tamanho_lote]
+            lote = [existentes[codigo][0] for codigo in codigos_sairam]
+            # Pratos com pedidos ou com vendas consolidadas (PROTECT) ficam, com estoque zerado
+            protegidos = set(ItemPedido.objects.filter(prato_id__in=lote).values_list('prato_id', flat=True))
+            protegidos.update(VendaPrato.objects.filter(prato_id__in=lote).values_list('prato_id', flat=True))
+            if protegidos:
+                zerar = [
+                    MovimentoEstoque(prato_id=existentes[codigo][0], quantidade=-existentes[codigo][4],
+                                     tipo=MovimentoEstoque.AJUSTE, observacao='Removido do cardápio')
+                    for codigo in codigos_sairam if existentes[codigo][0] in protegidos and existentes[codigo][4]
+                ]
+                MovimentoEstoque.objects.bulk_create(zerar)
+                contagem['zerados'] += len(protegidos)
+            Prato.objects.filter(pk__in=[pk for pk in lote if pk not in protegidos]).delete()
+            contagem['removidos'] += len(lote) - len(protegidos)
+
+        # Categorias que saíram do arquivo e ficaram vazias (e sem vendas consolidadas)
+        contagem['categorias_removidas'], _ = (
+            Categoria.objects.exclude(nome__in=categorias_vistas)
+            .filter(prato__isnull=True, vendas__isnull=True)
+            .delete()
+        )
+        tempos['remocao'] = time.perf_counter() - inicio
+
+        # bulk_create/bulk_update/update não disparam sinais: invalida o cache
+        # e refaz o índice de busca aqui
+        invalidar_cardapio()
+        invalidar_estoque()
+        reindexar()
+
+        # Numa rede de restaurantes, as unidades recebem o cardápio novo após o commit
+        if unidades.nomes():
+            transaction.on_commit(replicar_catalogo)
+
+        if simular:
+            transaction.set_rollback(True)
+
+    return {'contagem': contagem, 'tempos': tempos}
@@ -0,0 +1,60 @@
+# cardapio/management/commands/arquivar_pedidos.py
+import time
+from datetime import datetime, time as hora, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from cardapio.arquivo import arquivar_pedidos, arquivo_pronto, pedidos_arquivaveis
+from cardapio.vendas import consolidar_vendas
+
+
+class Command(BaseCommand):
+    help = (
+        'Move os pedidos pagos antigos (com os itens) para o banco do arquivo, '
+        'em lotes, deixando as tabelas do dia a dia pequenas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=180,
+                            help='Arquiva os pedidos com mais de N dias (padrão: 180).')
+        parser.add_argument('--antes-de', dest='antes_de',
+                            help='Arquiva os pedidos feitos antes deste dia (AAAA-MM-DD); substitui --dias.')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Pedidos movidos por transação (padrão: 500).')
+        parser.add_argument('--limite', type=int, help='Para depois de arquivar N pedidos.')
+        parser.add_argument('--simular', action='store_true',
+                            help='Só conta os pedidos que seriam arquivados.')
+
+    def _corte(self, options):
+        if not options['antes_de']:
+            return timezone.now() - timedelta(days=options['dias'])
+        try:
+            dia = parse_date(options['antes_de'])
+        except ValueError:
+            dia = None
+        if dia is None:
+            raise CommandError(f"Data inválida em --antes-de: {options['antes_de']!r}. Use AAAA-MM-DD.")
+        # Meia-noite local do dia informado
+        return timezone.make_aware(datetime.combine(dia, hora.min))
+
+    def handle(self, *args, **options):
+        corte = self._corte(options)
+        if not arquivo_pronto():
+            raise CommandError("O banco do arquivo ainda não foi criado: rode 'manage.py migrate --database=arquivo'.")
+
+        # 1. Soma nas vendas o que ainda falta: só sai do banco o que já foi contabilizado
+        consolidar_vendas()
+
+        if options['simular']:
+            total = pedidos_arquivaveis(corte).count()
+            self.stdout.write(f"  > {total} pedido(s) pago(s) antes de {timezone.localtime(corte):%d/%m/%Y %H:%M}.")
+            return
+
+        # 2. Move em lotes (cada lote: copia no arquivo e depois apaga)
+        inicio = time.perf_counter()
+        arquivados = arquivar_pedidos(corte, options['lote'], options['limite'])
+        self.stdout.write(
+            f"  > {arquivados} pedido(s) arquivado(s) "
+            f"({(time.perf_counter() - inicio) * 1000:.1f} ms)"
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Arquivamento concluído."))
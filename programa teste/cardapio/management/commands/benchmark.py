@@ -0,0 +1,110 @@
+# cardapio/management/commands/benchmark.py
+import json
+import logging
+import sqlite3
+import platform
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cardapio.benchmark import ORCAMENTO_PADRAO, banco_temporario, perfil_banco, semear, executar_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark reprodutível do cardápio e dos pedidos: cria um banco SQLite '
+        'temporário com dados sintéticos, mede vazão/latência/consultas e grava JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=int, default=10)
+        parser.add_argument('--pratos-por-categoria', type=int, default=50)
+        parser.add_argument('--pedidos', type=int, default=2000, help='Pedidos históricos semeados.')
+        parser.add_argument('--itens-por-pedido', type=int, default=3)
+        parser.add_argument('--repeticoes', type=int, default=100, help='Requisições por thread em cada cenário.')
+        parser.add_argument('--threads', type=int, default=4, help='Threads disputando os mesmos pratos no POST.')
+        parser.add_argument('--pratos-disputados', type=int, default=5)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument(
+            '--perfil-banco', default='producao',
+            help='Perfil do banco (CARDAPIO_PERFIS_BANCO) usado na medição (padrão: producao).'
+        )
+        parser.add_argument('--saida', help='Arquivo JSON onde gravar o resultado.')
+        parser.add_argument(
+            '--orcamento', action='store_true',
+            help='Falha (código de saída 1) se algum cenário passar do orçamento de consultas.'
+        )
+        parser.add_argument(
+            '--limite', action='append', default=[], metavar='CENARIO=N',
+            help='Altera o orçamento de consultas de um cenário (pode repetir).'
+        )
+
+    def handle(self, *args, **options):
+        orcamento = dict(ORCAMENTO_PADRAO)
+        for limite in options['limite']:
+            nome, _, valor = limite.partition('=')
+            if nome not in orcamento or not valor.isdigit():
+                raise CommandError(f"Limite inválido: '{limite}'. Use CENARIO=N com um destes cenários: {', '.join(orcamento)}")
+            orcamento[nome] = int(valor)
+        if options['perfil_banco'] not in settings.CARDAPIO_PERFIS_BANCO:
+            raise CommandError(
+                f"Perfil desconhecido: {options['perfil_banco']}. "
+                f"Disponíveis: {', '.join(settings.CARDAPIO_PERFIS_BANCO)}"
+            )
+
+        # 1. Banco de teste em arquivo temporário (as threads precisam do mesmo arquivo).
+        # Mede com o perfil de produção: no de desenvolvimento (transações
+        # DEFERRED) os POSTs simultâneos falham na hora com "database is
+        # locked" ao passar de leitura para escrita (veja benchmark_concorrencia)
+        with banco_temporario(), perfil_banco(options['perfil_banco']):
+            self.stdout.write("Semeando dados sintéticos...")
+            dados = semear(
+                categorias=options['categorias'],
+                pratos_por_categoria=options['pratos_por_categoria'],
+                pedidos=options['pedidos'],
+                itens_por_pedido=options['itens_por_pedido'],
+                semente=options['semente'],
+            )
+            self.stdout.write("Executando cenários...")
+            # Os erros 500 (ex.: "database is locked") são contados, não impressos
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+            cenarios = executar_benchmark(
+                repeticoes=options['repeticoes'],
+                threads=options['threads'],
+                orcamento=orcamento,
+                pratos_disputados=options['pratos_disputados'],
+                itens_por_pedido=options['itens_por_pedido'],
+                semente=options['semente'],
+            )
+
+        resultado = {
+            'data': timezone.now().isoformat(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'perfil_banco': options['perfil_banco'],
+            },
+            'dados': dados,
+            'cenarios': cenarios,
+        }
+
+        # 2. Resumo na tela e, se pedido, no arquivo JSON
+        for nome, r in cenarios.items():
+            linha = (
+                f"  > {nome:<26} {r['throughput_rps']} req/s  p50={r['latencia_ms']['p50']} ms  "
+                f"p95={r['latencia_ms']['p95']} ms  erros={r['erros']}  consultas={r['consultas']}"
+            )
+            self.stdout.write(linha if r['dentro_do_orcamento'] else self.style.ERROR(
+                f"{linha}  (orçamento: {r['orcamento_consultas']})"
+            ))
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em: {options['saida']}")
+
+        estourados = [nome for nome, r in cenarios.items() if not r['dentro_do_orcamento']]
+        if options['orcamento'] and estourados:
+            raise CommandError(f"Orçamento de consultas excedido: {', '.join(estourados)}")
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark concluído."))
@@ -0,0 +1,71 @@
+# cardapio/management/commands/benchmark_asgi.py
+import json
+import logging
+import platform
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse, NoReverseMatch
+from django.utils import timezone
+from cardapio.benchmark import banco_temporario, semear, clientes_lentos_wsgi, clientes_lentos_asgi
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara WSGI (threads) e ASGI (views assíncronas) com muitos clientes lentos '
+        '(celulares em 3G) ao mesmo tempo: tempo total, latência, threads e memória'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'rotas', nargs='*', default=['home', 'cardapio', 'api_cardapio'],
+            help='Nomes de URL medidos (padrão: home, cardapio, api_cardapio).'
+        )
+        parser.add_argument('--clientes', type=int, default=100, help='Conexões simultâneas (padrão: 100).')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Threads do servidor WSGI, como gunicorn --threads (padrão: 8).')
+        parser.add_argument('--latencia', type=float, default=0.3,
+                            help='Segundos que cada cliente leva para enviar a requisição (padrão: 0.3).')
+        parser.add_argument('--banda', type=int, default=20 * 1024,
+                            help='Bytes por segundo recebidos por cliente (padrão: 20480, um 3G ruim).')
+        parser.add_argument('--saida', help='Arquivo JSON onde gravar o resultado.')
+
+    def handle(self, *args, **options):
+        try:
+            caminhos = {rota: reverse(rota) for rota in options['rotas']}
+        except NoReverseMatch as e:
+            raise CommandError(f"Rota não encontrada: {e}")
+
+        # Os erros 500 são contados, não impressos
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        parametros = {'clientes': options['clientes'], 'latencia': options['latencia'], 'banda': options['banda']}
+
+        resultados = {}
+        with banco_temporario():
+            semear(pedidos=200)
+            for rota, caminho in caminhos.items():
+                # A primeira requisição de cada lado aquece o cache do cardápio
+                clientes_lentos_wsgi(caminho, clientes=1, threads=1, latencia=0, banda=10 ** 9)
+                resultados[rota] = {
+                    'wsgi': clientes_lentos_wsgi(caminho, threads=options['threads'], **parametros),
+                    'asgi': clientes_lentos_asgi(caminho, **parametros),
+                }
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{rota} ({options['clientes']} clientes lentos)"))
+                for lado in ('wsgi', 'asgi'):
+                    r = resultados[rota][lado]
+                    self.stdout.write(
+                        f"  > {r['servidor']:<26} total={r['duracao_s']} s  {r['throughput_rps']} req/s  "
+                        f"p50={r['latencia_ms']['p50']} ms  p95={r['latencia_ms']['p95']} ms  erros={r['erros']}  "
+                        f"threads={r['pico_threads']}  +RSS={r['rss_adicional_kb']} KB"
+                    )
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'data': timezone.now().isoformat(),
+                    'ambiente': {'python': platform.python_version(), 'django': django.get_version()},
+                    'parametros': {**parametros, 'threads_wsgi': options['threads']},
+                    'rotas': resultados,
+                }, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em: {options['saida']}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark WSGI x ASGI concluído."))
@@ -0,0 +1,80 @@
+# cardapio/management/commands/benchmark_concorrencia.py
+import json
+import logging
+import sqlite3
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from cardapio.benchmark import banco_temporario, perfil_banco, semear, medir_concorrencia
+from cardapio.pedidos import ESTRATEGIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara os perfis do banco (CARDAPIO_PERFIS_BANCO) e as estratégias de baixa '
+        'do estoque com vários garçons enviando pedidos ao mesmo tempo: pedidos/s, latência e falhas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'perfis', nargs='*', default=['desenvolvimento', 'producao'],
+            help='Perfis comparados (padrão: desenvolvimento producao).'
+        )
+        parser.add_argument(
+            '--estrategia', action='append', choices=ESTRATEGIAS, default=[],
+            help='Estratégia de baixa do estoque (pode repetir; padrão: a de CARDAPIO_ESTRATEGIA_PEDIDO).'
+        )
+        parser.add_argument('--threads', type=int, default=8, help='Garçons simultâneos (padrão: 8).')
+        parser.add_argument('--repeticoes', type=int, default=50, help='Pedidos por garçom (padrão: 50).')
+        parser.add_argument('--pratos-disputados', type=int, default=5)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--saida', help='Arquivo JSON onde gravar o resultado.')
+
+    def handle(self, *args, **options):
+        desconhecidos = [nome for nome in options['perfis'] if nome not in settings.CARDAPIO_PERFIS_BANCO]
+        if desconhecidos:
+            raise CommandError(
+                f"Perfil desconhecido: {', '.join(desconhecidos)}. "
+                f"Disponíveis: {', '.join(settings.CARDAPIO_PERFIS_BANCO)}"
+            )
+
+        # Os erros 500 (ex.: "database is locked") são contados, não impressos
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        estrategias = options['estrategia'] or [settings.CARDAPIO_ESTRATEGIA_PEDIDO]
+        resultados = {}
+        for nome in options['perfis']:
+            for estrategia in estrategias:
+                # Cada combinação num banco novo: o modo WAL fica gravado no arquivo
+                with banco_temporario(), perfil_banco(nome), \
+                        override_settings(CARDAPIO_ESTRATEGIA_PEDIDO=estrategia):
+                    semear(categorias=2, pratos_por_categoria=10, pedidos=200, semente=options['semente'])
+                    with connection.cursor() as cursor:
+                        cursor.execute('PRAGMA journal_mode')
+                        modo = cursor.fetchone()[0]
+                    r = medir_concorrencia(
+                        repeticoes=options['repeticoes'],
+                        threads=options['threads'],
+                        pratos_disputados=options['pratos_disputados'],
+                        semente=options['semente'],
+                    )
+                resultados[f"{nome}/{estrategia}"] = {**r, 'journal_mode': modo}
+                self.stdout.write(
+                    f"  > {nome + '/' + estrategia:<26} {r['pedidos_por_s']} pedidos/s  "
+                    f"gravados={r['pedidos_gravados']}/{r['requisicoes']}  falhas={r['erros']}  "
+                    f"p50={r['latencia_ms']['p50']} ms  p95={r['latencia_ms']['p95']} ms  (journal_mode={modo})"
+                )
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'data': timezone.now().isoformat(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'threads': options['threads'],
+                    'resultados': resultados,
+                }, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em: {options['saida']}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark de concorrência concluído."))
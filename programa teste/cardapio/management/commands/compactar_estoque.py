@@ -0,0 +1,29 @@
+# cardapio/management/commands/compactar_estoque.py
+import time
+from django.core.management.base import BaseCommand
+from cardapio.estoque import compactar_estoque
+from cardapio.unidades import OpcaoUnidadeMixin
+
+
+class Command(OpcaoUnidadeMixin, BaseCommand):
+    help = 'Fecha o estoque dos pratos: inclui os movimentos do livro de estoque no valor de Prato.estoque'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float,
+            help='Repete a compactação a cada N segundos (sem isso, roda uma vez).'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.perf_counter()
+            fechados, ultimo = compactar_estoque()
+            self.stdout.write(
+                f"  > {fechados} prato(s) fechado(s) até o movimento #{ultimo} "
+                f"({(time.perf_counter() - inicio) * 1000:.1f} ms)"
+            )
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS("✅ Compactação concluída."))
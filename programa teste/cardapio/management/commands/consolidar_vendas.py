@@ -0,0 +1,45 @@
+# cardapio/management/commands/consolidar_vendas.py
+import time
+from django.core.management.base import BaseCommand
+from cardapio.vendas import consolidar_vendas, recalcular_vendas
+from cardapio.unidades import OpcaoUnidadeMixin
+
+
+class Command(OpcaoUnidadeMixin, BaseCommand):
+    help = 'Atualiza as vendas consolidadas (por dia/hora, prato e categoria) com os pedidos desde o último marco'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=5000,
+            help='Quantidade de pedidos somados por transação (padrão: 5000).'
+        )
+        parser.add_argument(
+            '--recalcular', action='store_true',
+            help='Apaga as tabelas consolidadas e soma todos os pedidos de novo.'
+        )
+        parser.add_argument(
+            '--intervalo', type=float,
+            help='Repete a consolidação a cada N segundos (sem isso, roda uma vez).'
+        )
+
+    def handle(self, *args, **options):
+        if options['recalcular']:
+            self.stdout.write("Recalculando as vendas consolidadas do zero...")
+            executar = recalcular_vendas
+        else:
+            executar = consolidar_vendas
+
+        while True:
+            inicio = time.perf_counter()
+            novos, alterados, refeitas = executar(options['lote'])
+            self.stdout.write(
+                f"  > {novos} pedido(s) novo(s), {alterados} pagamento(s) alterado(s), "
+                f"{refeitas} hora(s) somada(s) de novo "
+                f"({(time.perf_counter() - inicio) * 1000:.1f} ms)"
+            )
+            if not options['intervalo']:
+                break
+            executar = consolidar_vendas
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS("✅ Vendas consolidadas."))
@@ -0,0 +1,114 @@
+# cardapio/management/commands/explicar_consultas.py
+import re
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse, NoReverseMatch
+
+# Rotas verificadas por padrão (nome da URL, com filtros opcionais após '?')
+ROTAS_PADRAO = [
+    'home',
+    'cardapio',
+    'fazer_pedido',
+    'fazer_pedido?q=agua&parcial=1',
+    'api_cardapio',
+    'admin:cardapio_pedido_changelist',
+    'admin:cardapio_pedido_changelist?pago__exact=0',
+    'admin:cardapio_pedido_changelist?q=Mesa',
+    'admin:cardapio_prato_changelist',
+    'admin:cardapio_prato_changelist?q=agua',
+]
+
+# Tabelas pequenas que as telas listam inteiras de propósito (sqlite_master:
+# a busca confere uma vez por processo se a tabela FTS5 existe)
+VARREDURAS_PERMITIDAS = {'cardapio_categoria', 'sqlite_master'}
+
+# 'SCAN tabela' sem índice = leitura da tabela inteira
+VARREDURA = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Faz uma requisição GET a cada rota, roda EXPLAIN QUERY PLAN em cada SELECT '
+        'executado e aponta as leituras de tabela inteira (varreduras)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'rotas', nargs='*', default=ROTAS_PADRAO,
+            help='Nomes de URL a verificar, aceitando filtros (ex.: "admin:cardapio_pedido_changelist?pago__exact=1").'
+        )
+        parser.add_argument('--usuario', help='Usuário da equipe usado nas páginas do Admin.')
+        parser.add_argument(
+            '--permitir', action='append', default=[],
+            help='Tabela que pode ser lida inteira sem ser apontada (pode repetir).'
+        )
+        parser.add_argument('--planos', action='store_true', help='Mostra o plano de todas as consultas.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("EXPLAIN QUERY PLAN só está disponível no SQLite.")
+
+        cliente = Client(HTTP_HOST='localhost')
+        if options['usuario']:
+            try:
+                cliente.force_login(get_user_model().objects.get(username=options['usuario']))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+
+        permitidas = VARREDURAS_PERMITIDAS | set(options['permitir'])
+        problemas = 0
+
+        # O cache do cardápio esconderia as consultas: começa com um cache vazio, só desta execução
+        caches = {**settings.CACHES, 'explicar': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'cardapio-explicar',
+        }}
+        with override_settings(CACHES=caches, CARDAPIO_CACHE='explicar'):
+            for rota in options['rotas']:
+                nome, _, filtros = rota.partition('?')
+                try:
+                    url = reverse(nome) + (f'?{filtros}' if filtros else '')
+                except NoReverseMatch:
+                    raise CommandError(f"Rota '{nome}' não encontrada.")
+
+                # 1. Guarda os SELECTs executados pela requisição (sem repetir)
+                consultas = {}
+
+                def capturar(execute, sql, params, many, context):
+                    if sql.lstrip().upper().startswith('SELECT') and not many:
+                        consultas.setdefault(sql, params)
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(capturar):
+                    resposta = cliente.get(url)
+
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"{rota} (HTTP {resposta.status_code}, {len(consultas)} consulta(s) distinta(s))"
+                ))
+                if resposta.status_code in (301, 302):
+                    self.stdout.write(self.style.WARNING("  > Redirecionada (login?): use --usuario para o Admin."))
+
+                # 2. Explica cada consulta e procura varreduras
+                with connection.cursor() as cursor:
+                    for sql, params in consultas.items():
+                        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                        plano = [linha[-1] for linha in cursor.fetchall()]
+                        varreduras = [
+                            detalhe for detalhe in plano
+                            if (achado := VARREDURA.match(detalhe)) and achado.group(1) not in permitidas
+                        ]
+                        if varreduras:
+                            problemas += 1
+                            self.stdout.write(self.style.ERROR(f"  ✗ {', '.join(varreduras)}"))
+                        if varreduras or options['planos']:
+                            self.stdout.write(f"    {sql[:300]}")
+                            for detalhe in plano:
+                                self.stdout.write(f"      {detalhe}")
+
+        if problemas:
+            # Código de saída diferente de zero: falha no CI
+            raise CommandError(f"{problemas} consulta(s) lendo tabela inteira.")
+        self.stdout.write(self.style.SUCCESS("✅ Nenhuma varredura de tabela fora das permitidas."))
@@ -0,0 +1,51 @@
+# cardapio/management/commands/exportar_pedidos.py
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from cardapio.exportacao import FORMATOS, filtrar_pedidos, gerar_exportacao, codificar, na_replica
+from cardapio.unidades import OpcaoUnidadeMixin
+
+
+class Command(OpcaoUnidadeMixin, BaseCommand):
+    help = 'Exporta pedidos e itens (CSV ou JSONL) em streaming, para a contabilidade'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='csv',
+                            help='csv (uma linha por item) ou jsonl (um pedido por linha). Padrão: csv.')
+        parser.add_argument('--inicio', help='Primeiro dia do período (AAAA-MM-DD).')
+        parser.add_argument('--fim', help='Último dia do período (AAAA-MM-DD).')
+        parser.add_argument('--pago', choices=['sim', 'nao'],
+                            help='Exporta só os pedidos pagos (sim) ou em aberto (nao).')
+        parser.add_argument('--saida',
+                            help='Arquivo de saída (padrão: saída padrão). Terminando em .gz, sai comprimido.')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída com gzip.')
+        parser.add_argument('--bloco', type=int, default=2000,
+                            help='Linhas lidas do banco por vez (padrão: 2000).')
+
+    def _data(self, options, campo):
+        valor = options[campo]
+        try:
+            data = parse_date(valor) if valor else None
+        except ValueError:
+            data = None
+        if valor and data is None:
+            raise CommandError(f"Data inválida em --{campo}: {valor!r}. Use AAAA-MM-DD.")
+        return data
+
+    def handle(self, *args, **options):
+        pedidos = filtrar_pedidos(
+            self._data(options, 'inicio'), self._data(options, 'fim'),
+            {'sim': True, 'nao': False}.get(options['pago'])
+        )
+        comprimir = options['gzip'] or (options['saida'] or '').endswith('.gz')
+        conteudo = codificar(na_replica(gerar_exportacao(options['formato'], pedidos, options['bloco'])), comprimir)
+
+        if options['saida']:
+            with open(options['saida'], 'wb') as arquivo:
+                for pedaco in conteudo:
+                    arquivo.write(pedaco)
+            self.stderr.write(self.style.SUCCESS(f"✅ Exportação gravada em {options['saida']}."))
+        else:
+            for pedaco in conteudo:
+                sys.stdout.buffer.write(pedaco)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,14 @@
+# cardapio/management/commands/limpar_idempotencia.py
+from django.core.management.base import BaseCommand
+from cardapio.idempotencia import purgar_expiradas
+
+
+class Command(BaseCommand):
+    help = 'Remove em lotes as chaves de idempotência de pedidos já expiradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Chaves removidas por DELETE (padrão: 5000).')
+
+    def handle(self, *args, **options):
+        removidas = purgar_expiradas(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {removidas} chave(s) expirada(s) removida(s)."))
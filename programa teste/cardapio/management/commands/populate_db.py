@@ -1,47 +1,49 @@
 # cardapio/management/commands/populate_db.py
-import os, json
+import os
 from django.core.management.base import BaseCommand
-from django.conf import settings
-from cardapio.models import Categoria, Prato
+from cardapio.importador import ARQUIVO_PADRAO, importar_cardapio
 
 class Command(BaseCommand):
-    help = 'Popula o banco de dados com dados do cardapio.json'
+    help = 'Sincroniza o banco de dados com o cardapio.json (inserções, atualizações e remoções em lote)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--arquivo', default=ARQUIVO_PADRAO,
+            help='Caminho do arquivo JSON do cardápio (padrão: cardapio/cardapio.json).'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help='Quantidade de registros por bulk_create/bulk_update (padrão: 500).'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Calcula as alterações e os tempos, mas desfaz tudo no final.'
+        )
 
     def handle(self, *args, **options):
-        # O caminho é relativo a BASE_DIR.parent
-        JSON_FILE_PATH = os.path.join(settings.BASE_DIR.parent, 'programa teste', 'cardapio', 'cardapio.json')
-        
-        # 1. Limpar dados
-        self.stdout.write("Limpando dados antigos...")
-        Prato.objects.all().delete()
-        Categoria.objects.all().delete()
+        JSON_FILE_PATH = options['arquivo']
 
         self.stdout.write(f"Carregando dados de: {JSON_FILE_PATH}")
-        try:
-            # Tenta carregar o arquivo JSON
-            with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except FileNotFoundError:
+        if not os.path.exists(JSON_FILE_PATH):
             self.stderr.write(self.style.ERROR(f"ERRO: Arquivo cardapio.json não encontrado no caminho: {JSON_FILE_PATH}"))
             return
 
-        # 2. Inserir dados
-        self.stdout.write("Iniciando inserção de dados...")
-        
-        prato_count = 0
-        for categoria_nome, itens in data.items():
-            # Cria ou busca a categoria (entrada no banco)
-            categoria_obj, created = Categoria.objects.get_or_create(nome=categoria_nome)
-            
-            # Insere cada prato/bebida
-            for codigo, prato_info in itens.items():
-                Prato.objects.create(
-                    categoria=categoria_obj,
-                    codigo_cardapio=codigo,
-                    nome=prato_info['nome'],
-                    preco=prato_info['preco'],
-                    estoque=prato_info['estoque']
-                )
-                prato_count += 1
-                
-        self.stdout.write(self.style.SUCCESS(f"\n✅ Inserção de dados concluída! {prato_count} pratos inseridos."))
\ No newline at end of file
+        resultado = importar_cardapio(JSON_FILE_PATH, tamanho_lote=options['lote'], simular=options['dry_run'])
+        contagem, tempos = resultado['contagem'], resultado['tempos']
+
+        # 1. Resumo das alterações
+        for nome, valor in contagem.items():
+            self.stdout.write(f"  > {nome.replace('_', ' ').capitalize()}: {valor}")
+
+        # 2. Tempo de cada fase
+        self.stdout.write("Tempo por fase:")
+        for fase, segundos in tempos.items():
+            self.stdout.write(f"  > {fase}: {segundos * 1000:.1f} ms")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("\nDry-run: nenhuma alteração foi gravada."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"\n✅ Sincronização concluída! {contagem['inseridos']} pratos inseridos, "
+                f"{contagem['atualizados']} atualizados, {contagem['removidos']} removidos."
+            ))
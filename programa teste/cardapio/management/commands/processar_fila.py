@@ -0,0 +1,44 @@
+# cardapio/management/commands/processar_fila.py
+import os
+import time
+import socket
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from cardapio.fila import reservar_lote, processar_lote
+from cardapio.unidades import OpcaoUnidadeMixin
+
+
+class Command(OpcaoUnidadeMixin, BaseCommand):
+    help = 'Trabalhador da fila de pedidos: envia à cozinha e executa as tarefas de acompanhamento em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50, help='Pedidos por lote (padrão: 50).')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos de espera com a fila vazia (padrão: 1).')
+        parser.add_argument(
+            '--expiracao', type=int, default=300,
+            help='Segundos até a reserva de um trabalhador que caiu ser retomada (padrão: 300).'
+        )
+        parser.add_argument('--max-tentativas', type=int, default=5)
+        parser.add_argument('--uma-vez', action='store_true', help='Esvazia a fila e termina.')
+
+    def handle(self, *args, **options):
+        trabalhador = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Trabalhador {trabalhador} iniciado.")
+
+        try:
+            while True:
+                close_old_connections()
+                ids = reservar_lote(trabalhador, options['lote'], options['expiracao'])
+                if ids:
+                    concluidos = processar_lote(ids, options['max_tentativas'])
+                    self.stdout.write(f"  > Lote de {len(ids)}: {concluidos} concluído(s).")
+                    continue
+
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            # As entradas reservadas e não concluídas são retomadas após a expiração
+            self.stdout.write("Interrompido.")
+
+        self.stdout.write(self.style.SUCCESS("✅ Trabalhador finalizado."))
@@ -0,0 +1,51 @@
+# cardapio/management/commands/recalcular_totais.py
+from django.core.management.base import BaseCommand
+from django.db.models import F, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from cardapio.models import Pedido
+
+
+class Command(BaseCommand):
+    help = 'Preenche ou verifica o campo Pedido.total a partir dos itens de cada pedido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help='Apenas lista os pedidos com total divergente, sem gravar nada.'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Quantidade de pedidos atualizados por UPDATE (padrão: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        # 1. Busca os pedidos cujo total gravado difere da soma dos itens (uma consulta)
+        soma_itens = Coalesce(
+            Sum(F('itens__preco_unitario') * F('itens__quantidade')),
+            Value(0),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+        divergentes = list(
+            Pedido.objects.annotate(soma=soma_itens)
+            .exclude(total=F('soma'))
+            .order_by('pk')
+            .values_list('pk', 'total', 'soma')
+        )
+
+        if not divergentes:
+            self.stdout.write(self.style.SUCCESS("✅ Todos os totais estão corretos."))
+            return
+
+        if options['verificar']:
+            for pk, total, soma in divergentes:
+                self.stdout.write(f"  > Pedido #{pk}: gravado R$ {total}, itens somam R$ {soma}")
+            self.stdout.write(self.style.WARNING(f"{len(divergentes)} pedido(s) com total divergente."))
+            return
+
+        # 2. Corrige os divergentes em lotes, com um UPDATE por lote
+        ids = [pk for pk, _, _ in divergentes]
+        lote = options['lote']
+        for inicio in range(0, len(ids), lote):
+            Pedido.objects.filter(pk__in=ids[inicio:inicio + lote]).update(total=Pedido.subconsulta_total())
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(ids)} pedido(s) com total recalculado."))
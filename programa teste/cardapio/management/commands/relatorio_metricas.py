@@ -0,0 +1,58 @@
+# cardapio/management/commands/relatorio_metricas.py
+import json
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse, NoReverseMatch
+from cardapio import metricas
+
+
+class Command(BaseCommand):
+    help = (
+        'Faz N requisições GET a cada rota (pelo nome da URL) passando pelo '
+        'MetricasMiddleware e mostra p50/p95/p99 de consultas e tempos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'rotas', nargs='*',
+            default=['home', 'cardapio', 'fazer_pedido', 'admin:cardapio_pedido_changelist'],
+            help='Nomes de URL a medir (padrão: home, cardapio, fazer_pedido e a lista de pedidos do Admin).'
+        )
+        parser.add_argument('--repeticoes', type=int, default=50, help='Requisições por rota (padrão: 50).')
+        parser.add_argument('--usuario', help='Usuário da equipe usado nas páginas do Admin.')
+        parser.add_argument('--json', action='store_true', help='Mostra o resumo em JSON.')
+
+    def handle(self, *args, **options):
+        cliente = Client(HTTP_HOST='localhost')
+        if options['usuario']:
+            try:
+                cliente.force_login(get_user_model().objects.get(username=options['usuario']))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+
+        # 1. Começa com os buffers vazios e faz as requisições
+        metricas.limpar()
+        for rota in options['rotas']:
+            try:
+                url = reverse(rota)
+            except NoReverseMatch:
+                raise CommandError(f"Rota '{rota}' não encontrada.")
+            for _ in range(options['repeticoes']):
+                cliente.get(url)
+
+        resumo = metricas.resumo()
+        if options['json']:
+            self.stdout.write(json.dumps(resumo, indent=2, ensure_ascii=False))
+            return
+
+        # 2. Tabela: uma linha por rota e métrica
+        for rota, dados in resumo.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{rota} ({dados['amostras']} amostras)"))
+            for campo in metricas.CAMPOS:
+                valores = dados[campo]
+                unidade = '' if campo == 'consultas' else ' ms'
+                self.stdout.write(
+                    f"  > {campo:<15} p50={valores['p50']}{unidade}  "
+                    f"p95={valores['p95']}{unidade}  p99={valores['p99']}{unidade}"
+                )
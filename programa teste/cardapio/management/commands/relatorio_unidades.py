@@ -0,0 +1,56 @@
+# cardapio/management/commands/relatorio_unidades.py
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from cardapio.rede import relatorio_vendas
+
+
+class Command(BaseCommand):
+    help = 'Vendas consolidadas de cada unidade da rede e da matriz, lidas em paralelo, com o total da rede'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Primeiro dia do período (AAAA-MM-DD).')
+        parser.add_argument('--fim', help='Último dia do período (AAAA-MM-DD).')
+        parser.add_argument(
+            '--consolidar', action='store_true',
+            help='Roda consolidar_vendas em cada banco antes de somar.'
+        )
+        parser.add_argument('--json', action='store_true', help='Mostra o relatório em JSON.')
+
+    def _data(self, options, campo):
+        valor = options[campo]
+        try:
+            data = parse_date(valor) if valor else None
+        except ValueError:
+            data = None
+        if valor and data is None:
+            raise CommandError(f"Data inválida em --{campo}: {valor!r}. Use AAAA-MM-DD.")
+        return data
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        relatorio = relatorio_vendas(
+            self._data(options, 'inicio'), self._data(options, 'fim'), consolidar=options['consolidar']
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False, default=str))
+            return
+
+        for nome, totais in relatorio['unidades'].items():
+            self.stdout.write(
+                f"  > {nome:<15} {totais['quantidade']:>8} itens  R$ {totais['receita']:>12}  "
+                f"(pago R$ {totais['receita_paga']})"
+            )
+        for nome, erro in relatorio['erros'].items():
+            self.stderr.write(self.style.ERROR(f"  > {nome:<15} falhou: {erro}"))
+
+        rede = relatorio['rede']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Rede: {rede['quantidade']} itens, R$ {rede['receita']} (pago R$ {rede['receita_paga']})"
+        ))
+        for posicao, prato in enumerate(relatorio['mais_vendidos'], start=1):
+            self.stdout.write(f"  {posicao:>2}. {prato['prato']}: {prato['quantidade']} un., R$ {prato['receita']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Relatório de {len(relatorio['unidades'])} banco(s) em {(time.perf_counter() - inicio) * 1000:.1f} ms."
+        ))
@@ -0,0 +1,71 @@
+# cardapio/management/commands/replicar_banco.py
+import sqlite3
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from cardapio import replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco principal para a réplica de leitura (CARDAPIO_REPLICA) com a "
+        "API de backup online do SQLite, sem parar os pedidos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float,
+            help='Repete a cópia a cada N segundos (sem isso, copia uma vez).'
+        )
+        parser.add_argument(
+            '--paginas', type=int, default=-1,
+            help='Páginas copiadas por passo (padrão: todas de uma vez; valores menores '
+                 'liberam o banco entre os passos, mas a cópia recomeça se houver gravação).'
+        )
+        parser.add_argument('--situacao', action='store_true', help='Só mostra o atraso atual da réplica.')
+
+    def handle(self, *args, **options):
+        if not replica.configurada():
+            raise CommandError("Réplica não configurada: defina CARDAPIO_REPLICA com o caminho do arquivo.")
+        principal = connections[DEFAULT_DB_ALIAS]
+        if principal.vendor != 'sqlite' or connections[replica.BANCO_REPLICA].vendor != 'sqlite':
+            raise CommandError("A cópia pela API de backup só funciona entre bancos SQLite.")
+
+        if options['situacao']:
+            self.stdout.write(f"  > {replica.situacao()}")
+            return
+
+        while True:
+            inicio = time.perf_counter()
+            self._copiar(principal, options['paginas'])
+            self.stdout.write(f"  > Réplica atualizada ({(time.perf_counter() - inicio) * 1000:.1f} ms)")
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS("✅ Réplica atualizada."))
+
+    def _copiar(self, principal, paginas):
+        # 1. Instante da cópia: tomado ANTES de começar, então tudo o que foi
+        # confirmado até aqui está na réplica (as versões do cache comparam com ele)
+        copiado_em = int(time.time() * 1000)
+
+        # 2. Backup online: lê um retrato consistente do principal (os garçons
+        # continuam gravando) e substitui o conteúdo da réplica
+        principal.ensure_connection()
+        destino = sqlite3.connect(connections[replica.BANCO_REPLICA].settings_dict['NAME'])
+        try:
+            principal.connection.backup(destino, pages=paginas, sleep=0.05)
+
+            # 3. Marca o instante da cópia na própria réplica (é por ele que o
+            # roteador calcula o atraso)
+            destino.execute(
+                f"CREATE TABLE IF NOT EXISTS {replica.TABELA_ESTADO} "
+                f"(id INTEGER PRIMARY KEY CHECK (id = 1), copiado_em INTEGER NOT NULL)"
+            )
+            destino.execute(
+                f"INSERT OR REPLACE INTO {replica.TABELA_ESTADO} (id, copiado_em) VALUES (1, ?)", [copiado_em]
+            )
+            destino.commit()
+        finally:
+            destino.close()
@@ -0,0 +1,43 @@
+# cardapio/management/commands/replicar_catalogo.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cardapio import unidades
+from cardapio.rede import replicar_catalogo
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o cardápio mestre (categorias e pratos da matriz) para o banco de cada unidade '
+        'da rede, em paralelo; o estoque de cada unidade não é alterado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--unidade', action='append', dest='unidades',
+            help='Copia só para esta unidade (pode repetir). Padrão: todas.'
+        )
+
+    def handle(self, *args, **options):
+        if not unidades.nomes():
+            raise CommandError("Nenhuma unidade configurada (CARDAPIO_UNIDADES).")
+        desconhecidas = set(options['unidades'] or []) - set(unidades.nomes())
+        if desconhecidas:
+            raise CommandError(f"Unidade(s) não configurada(s): {', '.join(sorted(desconhecidas))}.")
+
+        inicio = time.perf_counter()
+        falhas = 0
+        for nome, resultado in replicar_catalogo(options['unidades']).items():
+            if isinstance(resultado, Exception):
+                falhas += 1
+                self.stderr.write(self.style.ERROR(f"  > {nome}: falhou ({resultado})"))
+                continue
+            self.stdout.write(
+                f"  > {nome}: {resultado['categorias']} categoria(s), {resultado['pratos']} prato(s)"
+                + (f", {resultado['mantidos']} mantido(s) por ter pedidos" if resultado['mantidos'] else '')
+            )
+
+        if falhas:
+            raise CommandError(f"A cópia falhou em {falhas} unidade(s).")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Cardápio copiado ({(time.perf_counter() - inicio) * 1000:.1f} ms)."
+        ))
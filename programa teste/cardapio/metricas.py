@@ -0,0 +1,150 @@
+# cardapio/metricas.py
+
+import math
+import time
+import threading
+import contextvars
+from collections import deque
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate, reraise
+
+# Medição da requisição em andamento (usada pelo hook de templates)
+medicao_atual = contextvars.ContextVar('cardapio_medicao', default=None)
+
+# Métricas guardadas para cada amostra (nome do campo em Medicao)
+CAMPOS = ['consultas', 'tempo_db', 'tempo_template', 'tempo_total']
+
+
+class Medicao:
+    """Custo de uma requisição: consultas SQL, tempo de banco, de template e total."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.tempo_total = 0.0
+
+    def registrar_consulta(self, execute, sql, params, many, context):
+        """Wrapper para connection.execute_wrapper: conta e cronometra cada consulta."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tempo_db += time.perf_counter() - inicio
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """
+    Wrapper instalado em todas as conexões: mede a consulta na requisição em
+    andamento (medicao_atual). Por ser um ContextVar, também funciona nas views
+    assíncronas, cujo ORM roda as consultas em outra thread (sync_to_async).
+    """
+    medicao = medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    return medicao.registrar_consulta(execute, sql, params, many, context)
+
+
+def _instalar_wrapper(conexao):
+    # No início da lista: o execute_wrapper() do Django remove sempre o último
+    if medir_consulta not in conexao.execute_wrappers:
+        conexao.execute_wrappers.insert(0, medir_consulta)
+
+
+def _conexao_criada(sender, connection, **kwargs):
+    _instalar_wrapper(connection)
+
+
+def instrumentar_conexoes():
+    """Instala medir_consulta nas conexões já abertas e em todas as próximas."""
+    connection_created.connect(_conexao_criada, dispatch_uid='cardapio_metricas')
+    for conexao in connections.all(initialized_only=True):
+        _instalar_wrapper(conexao)
+
+
+# --- Registro em memória (ring buffer por nome de URL) ---
+
+_amostras = {}
+_lock = threading.Lock()
+
+
+def _tamanho_buffer():
+    return getattr(settings, 'CARDAPIO_METRICAS_TAMANHO', 1000)
+
+
+def registrar(nome_url, medicao):
+    """Guarda a medição no buffer circular do nome de URL (as mais antigas saem)."""
+    amostra = tuple(getattr(medicao, campo) for campo in CAMPOS)
+    with _lock:
+        buffer = _amostras.get(nome_url)
+        if buffer is None:
+            buffer = _amostras[nome_url] = deque(maxlen=_tamanho_buffer())
+        buffer.append(amostra)
+
+
+def limpar():
+    with _lock:
+        _amostras.clear()
+
+
+def percentil(valores_ordenados, p):
+    # Método nearest-rank
+    indice = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+def resumo():
+    """
+    Retorna p50/p95/p99 de cada métrica por nome de URL.
+    Tempos em milissegundos.
+    """
+    with _lock:
+        copia = {nome: list(buffer) for nome, buffer in _amostras.items()}
+
+    resultado = {}
+    for nome, amostras in sorted(copia.items()):
+        resultado[nome] = {'amostras': len(amostras)}
+        for i, campo in enumerate(CAMPOS):
+            valores = sorted(amostra[i] for amostra in amostras)
+            escala = 1 if campo == 'consultas' else 1000
+            resultado[nome][campo] = {
+                f'p{p}': round(percentil(valores, p) * escala, 3) for p in (50, 95, 99)
+            }
+    return resultado
+
+
+# --- Tempo de renderização de templates ---
+# Backend de templates ligado no settings (TEMPLATES['BACKEND']): é o mesmo
+# DjangoTemplates, com o render() de cada template somando o tempo gasto na
+# medição da requisição atual. Sem medição ativa, só repassa a chamada.
+
+class TemplateMedido(DjangoTemplate):
+    def render(self, context=None, request=None):
+        medicao = medicao_atual.get()
+        if medicao is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicao.tempo_template += time.perf_counter() - inicio
+
+
+class DjangoTemplatesMedidos(DjangoTemplates):
+    def from_string(self, template_code):
+        return TemplateMedido(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TemplateMedido(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def ativas():
+    """True se as métricas estão ligadas (CARDAPIO_METRICAS_ATIVAS)."""
+    return getattr(settings, 'CARDAPIO_METRICAS_ATIVAS', True)
@@ -0,0 +1,199 @@
+# cardapio/middleware.py
+
+import json
+import time
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.urls import get_script_prefix, set_script_prefix
+from . import metricas, perfilador, unidades
+
+logger = logging.getLogger('cardapio.metricas')
+logger_perfil = logging.getLogger('cardapio.perfilador')
+
+
+class MetricasMiddleware:
+    """
+    Mede cada requisição (consultas SQL, tempo de banco, de template e total)
+    e guarda o resultado no buffer do nome da URL (ex.: 'cardapio',
+    'admin:cardapio_pedido_changelist'). Veja /metricas/ e relatorio_metricas.
+    Funciona em WSGI e em ASGI (sem ocupar uma thread nas views assíncronas).
+    O tempo de template vem do backend metricas.DjangoTemplatesMedidos
+    (TEMPLATES no settings). Com CARDAPIO_METRICAS_ATIVAS = False, sai da
+    lista de middlewares e não instala nada nas conexões.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metricas.ativas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.intervalo_log = getattr(settings, 'CARDAPIO_METRICAS_LOG_INTERVALO', None)
+        self.ultimo_log = time.monotonic()
+        # Conta as consultas de todos os bancos configurados
+        metricas.instrumentar_conexoes()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicao, token, inicio = self._iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            self._encerrar(request, medicao, token, inicio)
+        return response
+
+    async def __acall__(self, request):
+        medicao, token, inicio = self._iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._encerrar(request, medicao, token, inicio)
+        return response
+
+    def _iniciar(self):
+        medicao = metricas.Medicao()
+        return medicao, metricas.medicao_atual.set(medicao), time.perf_counter()
+
+    def _encerrar(self, request, medicao, token, inicio):
+        medicao.tempo_total = time.perf_counter() - inicio
+        metricas.medicao_atual.reset(token)
+
+        match = request.resolver_match
+        metricas.registrar(match.view_name if match else '(sem rota)', medicao)
+        self._log_periodico()
+
+    def _log_periodico(self):
+        # Despejo periódico do resumo no log (desligado se o intervalo for None)
+        if self.intervalo_log is None:
+            return
+        agora = time.monotonic()
+        if agora - self.ultimo_log >= self.intervalo_log:
+            self.ultimo_log = agora
+            logger.info("Resumo de métricas: %s", json.dumps(metricas.resumo(), ensure_ascii=False))
+
+
+class PerfilMiddleware:
+    """
+    Perfil sob demanda de uma requisição (somente equipe): com o cabeçalho
+    X-Cardapio-Perfil ou ?_perfil=1 na URL (também em POSTs de formulário),
+    grava cProfile (.prof), pilhas amostradas (.txt, para flamegraph) e as
+    consultas SQL com a origem no código (.json). O id volta no cabeçalho
+    X-Cardapio-Perfil; os arquivos ficam em /perfis/. Sem o pedido de perfil,
+    só confere um cabeçalho e a query string.
+    Fica depois do AuthenticationMiddleware (precisa de request.user).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        perfilador.instrumentar_conexoes()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not perfilador.solicitado(request):
+            return self.get_response(request)
+        perfilador.retirar_parametro(request)
+        if not request.user.is_staff:
+            return self.get_response(request)
+        perfil = perfilador.Perfil()
+        if not perfil.iniciar():
+            return self._ocupado(request, self.get_response(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            perfil.encerrar()
+        return self._concluir(perfil, request, response)
+
+    async def __acall__(self, request):
+        if not perfilador.solicitado(request):
+            return await self.get_response(request)
+        perfilador.retirar_parametro(request)
+        if not (await request.auser()).is_staff:
+            return await self.get_response(request)
+        perfil = perfilador.Perfil()
+        if not perfil.iniciar():
+            return self._ocupado(request, await self.get_response(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            perfil.encerrar()
+        return self._concluir(perfil, request, response)
+
+    def _ocupado(self, request, response):
+        # Outro perfil em andamento: a requisição é atendida, só sem perfil
+        response['X-Cardapio-Perfil'] = perfilador.OCUPADO
+        logger_perfil.info("Perfil não gravado: outro em andamento (%s %s)", request.method, request.path)
+        return response
+
+    def _concluir(self, perfil, request, response):
+        # Respostas em streaming: o perfil cobre a view, não o envio do conteúdo
+        perfil_id = perfil.salvar(request, response)
+        response['X-Cardapio-Perfil'] = perfil_id
+        logger_perfil.info("Perfil %s gravado (%s %s)", perfil_id, request.method, request.path)
+        return response
+
+
+class UnidadeMiddleware:
+    """
+    Escolhe a unidade da rede pelo host ou pelo prefixo /u/<nome>/ e atende a
+    requisição no banco dela (unidades.usar_unidade). O prefixo sai do caminho
+    antes das rotas e volta nos links gerados ({% url %}, reverse), então as
+    mesmas rotas servem todas as unidades. Sem unidade, segue na matriz.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        nome, prefixo = unidades.resolver(request)
+        if nome is None:
+            return self.get_response(request)
+        prefixo_original = self._entrar(request, prefixo)
+        try:
+            with unidades.usar_unidade(nome):
+                response = self.get_response(request)
+        finally:
+            set_script_prefix(prefixo_original)
+        return self._sair(response, nome)
+
+    async def __acall__(self, request):
+        nome, prefixo = unidades.resolver(request)
+        if nome is None:
+            return await self.get_response(request)
+        prefixo_original = self._entrar(request, prefixo)
+        try:
+            with unidades.usar_unidade(nome):
+                response = await self.get_response(request)
+        finally:
+            set_script_prefix(prefixo_original)
+        return self._sair(response, nome)
+
+    def _entrar(self, request, prefixo):
+        prefixo_original = get_script_prefix()
+        if prefixo:
+            request.path_info = request.path_info[len(prefixo):]
+            set_script_prefix(prefixo_original.rstrip('/') + prefixo + '/')
+        return prefixo_original
+
+    def _sair(self, response, nome):
+        # Respostas em streaming (exportação, painel) consultam o banco depois
+        # que a view retorna: o conteúdo também é gerado dentro da unidade
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = unidades.na_unidade(response.streaming_content, nome)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 17:43
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Sum, Value, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def preencher_totais(apps, schema_editor):
+    """Preenche o total dos pedidos já existentes com um único UPDATE."""
+    Pedido = apps.get_model('cardapio', 'Pedido')
+    ItemPedido = apps.get_model('cardapio', 'ItemPedido')
+    soma = (
+        ItemPedido.objects.filter(pedido=OuterRef('pk'))
+        .values('pedido')
+        .annotate(soma=Sum(F('preco_unitario') * F('quantidade')))
+        .values('soma')
+    )
+    Pedido.objects.update(
+        total=Coalesce(Subquery(soma), Value(Decimal('0.00')), output_field=models.DecimalField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0002_pedido_itempedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total (R$)'),
+        ),
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
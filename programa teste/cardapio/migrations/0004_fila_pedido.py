@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0003_pedido_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='enviado_cozinha_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FilaPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=12)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('reservado_em', models.DateTimeField(blank=True, null=True)),
+                ('reservado_por', models.CharField(blank=True, max_length=100)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('pedido', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fila', to='cardapio.pedido')),
+            ],
+            options={
+                'verbose_name_plural': 'Fila de Pedidos',
+                'indexes': [models.Index(fields=['status', 'id'], name='fila_status_id_idx')],
+            },
+        ),
+    ]
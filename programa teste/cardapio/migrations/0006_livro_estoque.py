@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 17:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0005_chave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prato',
+            name='estoque_ate_movimento',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='MovimentoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField()),
+                ('tipo', models.CharField(choices=[('pedido', 'Pedido'), ('reposicao', 'Reposição'), ('ajuste', 'Ajuste')], max_length=10)),
+                ('observacao', models.CharField(blank=True, max_length=200)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimentos_estoque', to='cardapio.pedido')),
+                ('prato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentos', to='cardapio.prato')),
+            ],
+            options={
+                'verbose_name': 'Movimento de Estoque',
+                'verbose_name_plural': 'Movimentos de Estoque',
+                'indexes': [models.Index(fields=['prato', 'id'], name='movimento_prato_id_idx')],
+            },
+        ),
+    ]
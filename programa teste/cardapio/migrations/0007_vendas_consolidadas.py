@@ -0,0 +1,83 @@
+# Generated by Django 6.0 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0006_livro_estoque'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcoConsolidacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('ultimo_pedido_id', models.BigIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Marcos de Consolidação',
+            },
+        ),
+        migrations.CreateModel(
+            name='VendaCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('quantidade', models.IntegerField(default=0)),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('receita_paga', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Venda por Categoria',
+                'verbose_name_plural': 'Vendas por Categoria',
+            },
+        ),
+        migrations.CreateModel(
+            name='VendaPrato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('quantidade', models.IntegerField(default=0)),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('receita_paga', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Venda por Prato',
+                'verbose_name_plural': 'Vendas por Prato',
+            },
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='pago_contabilizado',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['pago', 'pago_contabilizado'], name='pedido_pago_contab_idx'),
+        ),
+        migrations.AddField(
+            model_name='vendacategoria',
+            name='categoria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendas', to='cardapio.categoria'),
+        ),
+        migrations.AddField(
+            model_name='vendaprato',
+            name='prato',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendas', to='cardapio.prato'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendacategoria',
+            constraint=models.UniqueConstraint(fields=('dia', 'hora', 'categoria'), name='venda_categoria_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendaprato',
+            constraint=models.UniqueConstraint(fields=('dia', 'hora', 'prato'), name='venda_prato_unica'),
+        ),
+    ]
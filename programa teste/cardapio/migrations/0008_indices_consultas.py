@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 17:55
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0007_vendas_consolidadas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prato',
+            name='categoria',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='cardapio.categoria'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['-data_pedido'], name='pedido_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['pago', 'data_pedido'], name='pedido_pago_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(django.db.models.functions.comparison.Collate('nome_cliente', 'NOCASE'), name='pedido_cliente_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prato',
+            index=models.Index(fields=['categoria', 'codigo_cardapio'], name='prato_categoria_codigo_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-18 18:10
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0008_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('data_pedido', models.DateTimeField()),
+                ('nome_cliente', models.CharField(max_length=255)),
+                ('pago', models.BooleanField(default=False)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total (R$)')),
+                ('enviado_cozinha_em', models.DateTimeField(blank=True, null=True)),
+                ('arquivado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Pedido Arquivado',
+                'verbose_name_plural': 'Pedidos Arquivados',
+                'ordering': ['-data_pedido'],
+                'indexes': [models.Index(fields=['-data_pedido'], name='arquivo_pedido_data_idx'), models.Index(django.db.models.functions.comparison.Collate('nome_cliente', 'NOCASE'), name='arquivo_cliente_nocase_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemPedidoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('prato_id', models.IntegerField()),
+                ('codigo_cardapio', models.CharField(max_length=10)),
+                ('prato_nome', models.CharField(max_length=200, verbose_name='Prato')),
+                ('quantidade', models.IntegerField()),
+                ('preco_unitario', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='cardapio.pedidoarquivado')),
+            ],
+            options={
+                'verbose_name': 'Item Arquivado',
+                'verbose_name_plural': 'Itens Arquivados',
+            },
+        ),
+    ]
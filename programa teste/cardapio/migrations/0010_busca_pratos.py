@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 19:20
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def criar_indice_busca(apps, schema_editor):
+    """
+    Cria a tabela FTS5 da busca de pratos (sem acentos: remove_diacritics) e
+    indexa os pratos existentes. Fora do SQLite, ou num SQLite sem FTS5, não
+    cria nada: a busca usa o índice de trigramas na memória (cardapio/busca.py).
+    """
+    conexao = schema_editor.connection
+    if conexao.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE cardapio_prato_busca USING fts5("
+            "codigo_cardapio, nome, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        "INSERT INTO cardapio_prato_busca (rowid, codigo_cardapio, nome) "
+        "SELECT id, codigo_cardapio, nome FROM cardapio_prato"
+    )
+
+
+def remover_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS cardapio_prato_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0009_arquivo_pedidos'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
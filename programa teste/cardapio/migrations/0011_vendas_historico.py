@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0010_busca_pratos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vendacategoria',
+            name='categoria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='vendas', to='cardapio.categoria'),
+        ),
+        migrations.AlterField(
+            model_name='vendaprato',
+            name='prato',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='vendas', to='cardapio.prato'),
+        ),
+        migrations.CreateModel(
+            name='HoraVendaPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('marcada_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Hora de Venda Pendente',
+                'verbose_name_plural': 'Horas de Venda Pendentes',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'hora'), name='hora_venda_pendente_unica')],
+            },
+        ),
+    ]
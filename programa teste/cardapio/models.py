@@ -1,6 +1,9 @@
 # cardapio/models.py
 
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Sum, Value, OuterRef, Subquery, DecimalField
+from django.db.models.functions import Coalesce, Collate
 
 # --- MODEL 1: Categoria ---
 class Categoria(models.Model):
@@ -17,13 +20,32 @@ class Categoria(models.Model):
         # Retorna o nome da categoria no Admin do Django
         return self.nome
 
+# --- QuerySet do Prato: estoque atual calculado pelo livro de estoque ---
+class PratoQuerySet(models.QuerySet):
+    def com_estoque_atual(self):
+        """
+        Anota 'estoque_atual' = estoque do último fechamento (Prato.estoque)
+        + soma dos movimentos lançados depois dele.
+        """
+        pendentes = (
+            MovimentoEstoque.objects.filter(prato=OuterRef('pk'), id__gt=OuterRef('estoque_ate_movimento'))
+            .values('prato')
+            .annotate(soma=Sum('quantidade'))
+            .values('soma')
+        )
+        return self.annotate(
+            estoque_atual=F('estoque') + Coalesce(Subquery(pendentes), Value(0), output_field=models.IntegerField())
+        )
+
+
 # --- MODEL 2: Prato ---
 class Prato(models.Model):
     """
     Define os pratos e bebidas do cardápio.
     """
     # Relação: Um prato pertence a uma Categoria (ForeignKey)
-    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE)
+    # (sem índice próprio: o índice (categoria, codigo_cardapio) já atende)
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, db_index=False)
     
     # ID ou Código (Ex: E1, P1, B1) - O Django já cria um ID numérico automático
     codigo_cardapio = models.CharField(max_length=10, unique=True)
@@ -33,16 +55,30 @@ class Prato(models.Model):
     preco = models.DecimalField(max_digits=6, decimal_places=2)
     
     # Estoque - O campo que você gerenciava no main.py
+    # Com o livro de estoque, é o valor do último fechamento (compactar_estoque);
+    # o estoque atual soma os movimentos posteriores (Prato.objects.com_estoque_atual())
     estoque = models.IntegerField(default=0)
     
+    # Id do último MovimentoEstoque já incluído em 'estoque'
+    estoque_ate_movimento = models.BigIntegerField(default=0, editable=False)
+    
+    objects = PratoQuerySet.as_manager()
+    
     class Meta:
         # Garante que o prato seja ordenado por nome por padrão
         ordering = ['nome']
         verbose_name_plural = 'Pratos'
+        # Pratos de uma categoria já na ordem do cardápio (tela do garçom),
+        # sem ordenar em memória
+        indexes = [models.Index(fields=['categoria', 'codigo_cardapio'], name='prato_categoria_codigo_idx')]
     
     def __str__(self):
         # Retorna o nome e código do prato no Admin
         return f"[{self.codigo_cardapio}] {self.nome}"
+
+    def calcular_estoque_atual(self):
+        """Estoque atual deste prato (último fechamento + movimentos posteriores)."""
+        return Prato.objects.com_estoque_atual().values_list('estoque_atual', flat=True).get(pk=self.pk)
 # cardapio/models.py (ADICIONAR ESTE CÓDIGO NO FINAL)
 
 # --- MODEL 3: Pedido (O cabeçalho do pedido) ---
@@ -59,9 +95,28 @@ class Pedido(models.Model):
     # Status de pagamento
     pago = models.BooleanField(default=False)
     
+    # Total do pedido gravado no banco (mantido pelos sinais do ItemPedido),
+    # para o Admin listar, ordenar e filtrar sem somar os itens de cada linha
+    total = models.DecimalField('Total (R$)', max_digits=10, decimal_places=2, default=0)
+    
+    # Quando o pedido foi entregue à cozinha (preenchido pela fila de pedidos)
+    enviado_cozinha_em = models.DateTimeField(null=True, blank=True)
+    
+    # Valor de 'pago' já contabilizado nos totais de vendas (consolidar_vendas)
+    pago_contabilizado = models.BooleanField(default=False, editable=False)
+    
     class Meta:
         ordering = ['-data_pedido'] # Ordena do mais novo para o mais antigo
         verbose_name_plural = 'Pedidos'
+        indexes = [
+            # Acha rápido os pedidos cujo pagamento mudou desde a última consolidação
+            models.Index(fields=['pago', 'pago_contabilizado'], name='pedido_pago_contab_idx'),
+            # Lista do Admin: ordem padrão (-data_pedido), com ou sem o filtro 'pago'
+            models.Index(fields=['-data_pedido'], name='pedido_data_idx'),
+            models.Index(fields=['pago', 'data_pedido'], name='pedido_pago_data_idx'),
+            # Busca por começo do nome no Admin (LIKE 'x%' sem diferenciar maiúsculas)
+            models.Index(Collate('nome_cliente', 'NOCASE'), name='pedido_cliente_nocase_idx'),
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.nome_cliente}"
@@ -71,6 +126,25 @@ class Pedido(models.Model):
         # Usa o related_name 'itens' definido no ItemPedido
         total = sum(item.preco_unitario * item.quantidade for item in self.itens.all())
         return total
+
+    @staticmethod
+    def subconsulta_total():
+        """Expressão com a soma dos itens do pedido, para usar em update()/annotate()."""
+        soma = (
+            ItemPedido.objects.filter(pedido=OuterRef('pk'))
+            .values('pedido')
+            .annotate(soma=Sum(F('preco_unitario') * F('quantidade')))
+            .values('soma')
+        )
+        return Coalesce(
+            Subquery(soma),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+
+    def atualizar_total(self):
+        """Recalcula o campo 'total' direto no banco (um único UPDATE)."""
+        Pedido.objects.filter(pk=self.pk).update(total=Pedido.subconsulta_total())
         
 # --- MODEL 4: ItemPedido (Os itens dentro do pedido) ---
 class ItemPedido(models.Model):
@@ -92,5 +166,235 @@ class ItemPedido(models.Model):
     class Meta:
         verbose_name_plural = 'Itens Pedido'
 
+    def save(self, *args, **kwargs):
+        # No Admin (ItemPedidoInline) o preço é somente leitura: usa o preço atual do prato
+        if self.preco_unitario is None:
+            self.preco_unitario = self.prato.preco
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.quantidade}x {self.prato.nome} no Pedido #{self.pedido.id}"
+
+
+# --- MODEL 5: FilaPedido (Fila de trabalho da cozinha) ---
+class FilaPedido(models.Model):
+    """
+    Entrada da fila de pedidos consumida pelo comando processar_fila
+    (envio à cozinha, recibos e demais tarefas de acompanhamento).
+    """
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDO = 'concluido'
+    ERRO = 'erro'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDO, 'Concluído'),
+        (ERRO, 'Erro'),
+    ]
+
+    pedido = models.OneToOneField(Pedido, related_name='fila', on_delete=models.CASCADE)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDENTE)
+    
+    # Quantas vezes um trabalhador já pegou esta entrada
+    tentativas = models.PositiveIntegerField(default=0)
+    
+    criado_em = models.DateTimeField(auto_now_add=True)
+    
+    # Reserva do trabalhador: se ele cair, a reserva expira e outro retoma a entrada
+    reservado_em = models.DateTimeField(null=True, blank=True)
+    reservado_por = models.CharField(max_length=100, blank=True)
+    
+    ultimo_erro = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Fila de Pedidos'
+        indexes = [models.Index(fields=['status', 'id'], name='fila_status_id_idx')]
+
+    def __str__(self):
+        return f"{self.pedido} ({self.get_status_display()})"
+
+
+# --- MODEL 6: ChaveIdempotencia (Evita pedidos duplicados em reenvios) ---
+class ChaveIdempotencia(models.Model):
+    """
+    Chave enviada com o pedido (formulário ou API). Um reenvio com a mesma
+    chave, antes de expirar, devolve o pedido original em vez de criar outro.
+    """
+    chave = models.CharField(max_length=64, unique=True)
+    pedido = models.ForeignKey(Pedido, related_name='chaves_idempotencia', on_delete=models.CASCADE)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    
+    # Depois desta data a chave é ignorada e removida pelo limpar_idempotencia
+    expira_em = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'Chaves de Idempotência'
+
+    def __str__(self):
+        return f"{self.chave} -> {self.pedido}"
+
+
+# --- MODEL 7: MovimentoEstoque (Livro de estoque, somente inserção) ---
+class MovimentoEstoque(models.Model):
+    """
+    Entrada (+) ou saída (-) de estoque de um prato. As linhas nunca são
+    alteradas: o estoque atual é o último fechamento do prato mais a soma
+    dos movimentos posteriores.
+    """
+    PEDIDO = 'pedido'
+    REPOSICAO = 'reposicao'
+    AJUSTE = 'ajuste'
+    TIPO_CHOICES = [
+        (PEDIDO, 'Pedido'),
+        (REPOSICAO, 'Reposição'),
+        (AJUSTE, 'Ajuste'),
+    ]
+
+    prato = models.ForeignKey(Prato, related_name='movimentos', on_delete=models.CASCADE)
+    
+    # Positivo para entradas (reposição), negativo para saídas (pedido)
+    quantidade = models.IntegerField()
+    
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    
+    # Pedido que gerou a saída (apenas para o tipo 'pedido')
+    pedido = models.ForeignKey(
+        Pedido, related_name='movimentos_estoque', null=True, blank=True, on_delete=models.SET_NULL
+    )
+    
+    observacao = models.CharField(max_length=200, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Movimento de Estoque'
+        verbose_name_plural = 'Movimentos de Estoque'
+        # Atende a soma dos movimentos de um prato depois do último fechamento
+        indexes = [models.Index(fields=['prato', 'id'], name='movimento_prato_id_idx')]
+
+    def __str__(self):
+        return f"{self.quantidade:+d} {self.prato.nome} ({self.get_tipo_display()})"
+
+
+# --- MODELS 8 e 9: VendaPrato / VendaCategoria (Totais de vendas por hora) ---
+class VendaBase(models.Model):
+    """
+    Totais pré-agregados por dia e hora (horário local), mantidos pelo comando
+    consolidar_vendas. Os relatórios leem só daqui, não do histórico de pedidos.
+    """
+    dia = models.DateField()
+    hora = models.PositiveSmallIntegerField()
+    quantidade = models.IntegerField(default=0)
+    receita = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Parte da receita de pedidos já pagos (o restante está em aberto)
+    receita_paga = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def receita_em_aberto(self):
+        return self.receita - self.receita_paga
+
+
+# PROTECT: apagar o prato ou a categoria apagaria junto o histórico de vendas
+class VendaPrato(VendaBase):
+    prato = models.ForeignKey(Prato, related_name='vendas', on_delete=models.PROTECT)
+
+    class Meta:
+        verbose_name = 'Venda por Prato'
+        verbose_name_plural = 'Vendas por Prato'
+        constraints = [models.UniqueConstraint(fields=['dia', 'hora', 'prato'], name='venda_prato_unica')]
+
+    def __str__(self):
+        return f"{self.prato.nome} em {self.dia} {self.hora:02d}h"
+
+
+class VendaCategoria(VendaBase):
+    categoria = models.ForeignKey(Categoria, related_name='vendas', on_delete=models.PROTECT)
+
+    class Meta:
+        verbose_name = 'Venda por Categoria'
+        verbose_name_plural = 'Vendas por Categoria'
+        constraints = [models.UniqueConstraint(fields=['dia', 'hora', 'categoria'], name='venda_categoria_unica')]
+
+    def __str__(self):
+        return f"{self.categoria.nome} em {self.dia} {self.hora:02d}h"
+
+
+# --- MODEL 10: MarcoConsolidacao (Até onde os totais já foram consolidados) ---
+class MarcoConsolidacao(models.Model):
+    nome = models.CharField(max_length=50, unique=True)
+    ultimo_pedido_id = models.BigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Marcos de Consolidação'
+
+    def __str__(self):
+        return f"{self.nome}: até o pedido #{self.ultimo_pedido_id}"
+
+
+class HoraVendaPendente(models.Model):
+    """
+    Hora (local) já consolidada cujos itens mudaram depois (ItemPedidoInline
+    do Admin): consolidar_vendas soma essa hora de novo e apaga a marca.
+    """
+    dia = models.DateField()
+    hora = models.PositiveSmallIntegerField()
+    marcada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Hora de Venda Pendente'
+        verbose_name_plural = 'Horas de Venda Pendentes'
+        constraints = [models.UniqueConstraint(fields=['dia', 'hora'], name='hora_venda_pendente_unica')]
+
+    def __str__(self):
+        return f"{self.dia} {self.hora:02d}h"
+
+
+# --- MODELS 11 e 12: PedidoArquivado / ItemPedidoArquivado (Histórico frio) ---
+# Ficam no banco 'arquivo' (veja cardapio/roteadores.py). Sem chaves para
+# Prato: o arquivo é lido sozinho, então o item guarda código e nome do prato.
+class PedidoArquivado(models.Model):
+    """
+    Pedido antigo (pago e já consolidado nas vendas) movido pelo comando
+    arquivar_pedidos. Mantém o mesmo id do Pedido original.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    data_pedido = models.DateTimeField()
+    nome_cliente = models.CharField(max_length=255)
+    pago = models.BooleanField(default=False)
+    total = models.DecimalField('Total (R$)', max_digits=10, decimal_places=2, default=0)
+    enviado_cozinha_em = models.DateTimeField(null=True, blank=True)
+    arquivado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-data_pedido']
+        verbose_name = 'Pedido Arquivado'
+        verbose_name_plural = 'Pedidos Arquivados'
+        indexes = [
+            models.Index(fields=['-data_pedido'], name='arquivo_pedido_data_idx'),
+            models.Index(Collate('nome_cliente', 'NOCASE'), name='arquivo_cliente_nocase_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.id} - {self.nome_cliente} (arquivado)"
+
+
+class ItemPedidoArquivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    pedido = models.ForeignKey(PedidoArquivado, related_name='itens', on_delete=models.CASCADE)
+    prato_id = models.IntegerField()
+    codigo_cardapio = models.CharField(max_length=10)
+    prato_nome = models.CharField('Prato', max_length=200)
+    quantidade = models.IntegerField()
+    preco_unitario = models.DecimalField(max_digits=6, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Item Arquivado'
+        verbose_name_plural = 'Itens Arquivados'
+
     def __str__(self):
-        return f"{self.quantidade}x {self.prato.nome} no Pedido #{self.pedido.id}"
\ No newline at end of file
+        return f"{self.quantidade}x {self.prato_nome} no Pedido #{self.pedido_id}"
@@ -0,0 +1,246 @@
+# cardapio/painel.py
+
+import json
+import asyncio
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import router, transaction
+from .models import Pedido, ItemPedido
+from . import unidades
+
+# Tipos de evento enviados ao painel de pedidos
+NOVO = 'novo'          # pedido criado (com os itens)
+PEDIDO = 'pedido'      # mudou o cabeçalho (pago, envio à cozinha)
+ITENS = 'itens'        # mudaram as linhas de itens (com o novo total)
+REMOVIDO = 'removido'  # pedido apagado
+RECOMECAR = 'recomecar'  # o cliente perdeu eventos: precisa recarregar a lista
+
+
+# --- Transmissor (fan-out dentro do processo) ---
+
+class Transmissor:
+    """
+    Guarda os últimos eventos num buffer circular e acorda quem está esperando.
+    Os ids são '<época>-<número>': a época muda a cada processo, então um id
+    de antes de um reinício é reconhecido e o cliente recebe 'recomecar'.
+
+    Só vale para um processo: os eventos ficam na memória de quem gravou o
+    pedido. Com vários processos (gunicorn -w N) cada um tem o seu transmissor
+    e só vê os pedidos gravados por ele; o comando processar_fila (modo
+    'fila') também roda em outro processo, e o envio à cozinha marcado por ele
+    só aparece quando o painel é recarregado. Por isso o servidor do painel
+    roda com um processo só (gunicorn -w 1 --threads N, ou um worker ASGI);
+    veja CARDAPIO_PAINEL_EVENTOS nos settings.
+    """
+
+    def __init__(self, tamanho=1000):
+        self.epoca = str(int(time.time() * 1000))
+        self.eventos = deque(maxlen=tamanho)
+        self.ultimo = 0
+        self._lock = threading.Lock()
+        self._ouvintes = set()  # funções que acordam quem está esperando
+
+    def publicar(self, tipo, dados):
+        with self._lock:
+            self.ultimo += 1
+            self.eventos.append((self.ultimo, tipo, dados))
+            ouvintes = list(self._ouvintes)
+        # Pode ser chamado de qualquer thread: cada ouvinte sabe como acordar
+        for acordar in ouvintes:
+            acordar()
+
+    def id_atual(self):
+        with self._lock:
+            return f"{self.epoca}-{self.ultimo}"
+
+    def _proximos(self, ultimo_id):
+        """
+        Eventos depois de 'ultimo_id', como (id, tipo, dados). Se o cliente
+        perdeu eventos (id de outro processo ou mais antigo que o buffer),
+        retorna só um evento 'recomecar' com o id atual.
+        """
+        epoca, _, numero = (ultimo_id or '').partition('-')
+        with self._lock:
+            perdeu = (
+                epoca != self.epoca or not numero.isdigit()
+                or int(numero) > self.ultimo
+                or (self.eventos and int(numero) < self.eventos[0][0] - 1)
+            )
+            if perdeu:
+                return [(f"{self.epoca}-{self.ultimo}", RECOMECAR, {})]
+            numero = int(numero)
+            return [(f"{self.epoca}-{n}", tipo, dados) for n, tipo, dados in self.eventos if n > numero]
+
+    def _inscrever(self, acordar):
+        with self._lock:
+            self._ouvintes.add(acordar)
+
+    def _cancelar(self, acordar):
+        with self._lock:
+            self._ouvintes.discard(acordar)
+
+    def ouvir(self, ultimo_id, intervalo_keepalive=15):
+        """
+        Gera os eventos (id, tipo, dados) depois de 'ultimo_id' e depois espera
+        pelos próximos; gera None a cada 'intervalo_keepalive' segundos sem
+        eventos (para manter a conexão aberta). Versão WSGI: ocupa a thread.
+        """
+        sinal = threading.Event()
+        self._inscrever(sinal.set)
+        try:
+            while True:
+                # Limpa antes de ler: um evento publicado depois disso acorda a espera
+                sinal.clear()
+                eventos = self._proximos(ultimo_id)
+                if eventos:
+                    ultimo_id = eventos[-1][0]
+                    yield from eventos
+                elif not sinal.wait(intervalo_keepalive):
+                    yield None
+        finally:
+            self._cancelar(sinal.set)
+
+    async def aouvir(self, ultimo_id, intervalo_keepalive=15):
+        """Como ouvir(), para ASGI: a espera não ocupa nenhuma thread."""
+        sinal = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def acordar():
+            loop.call_soon_threadsafe(sinal.set)
+
+        self._inscrever(acordar)
+        try:
+            while True:
+                sinal.clear()
+                eventos = self._proximos(ultimo_id)
+                if eventos:
+                    ultimo_id = eventos[-1][0]
+                    for evento in eventos:
+                        yield evento
+                    continue
+                try:
+                    await asyncio.wait_for(sinal.wait(), intervalo_keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._cancelar(acordar)
+
+
+# Um transmissor por unidade da rede (None = matriz): cada painel só vê os
+# pedidos da sua unidade
+_transmissores = {}
+_lock_transmissores = threading.Lock()
+
+
+def transmissor_atual():
+    """Transmissor da unidade em andamento (criado no primeiro uso)."""
+    nome = unidades.atual()
+    with _lock_transmissores:
+        if nome not in _transmissores:
+            _transmissores[nome] = Transmissor(getattr(settings, 'CARDAPIO_PAINEL_EVENTOS', 1000))
+        return _transmissores[nome]
+
+
+def formatar_evento(id_evento, tipo, dados):
+    """Formato text/event-stream (um evento por bloco, terminado por linha em branco)."""
+    return f"id: {id_evento}\nevent: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n"
+
+
+# --- Estado dos pedidos (o que vai em cada evento) ---
+
+def _itens(pedido_ids):
+    """Itens dos pedidos, agrupados por pedido (uma consulta)."""
+    itens = {pedido_id: [] for pedido_id in pedido_ids}
+    linhas = (
+        ItemPedido.objects.filter(pedido_id__in=pedido_ids)
+        .order_by('pk')
+        .values('pk', 'pedido_id', 'prato__codigo_cardapio', 'prato__nome', 'quantidade', 'preco_unitario')
+    )
+    for linha in linhas:
+        itens[linha['pedido_id']].append({
+            'id': linha['pk'],
+            'codigo': linha['prato__codigo_cardapio'],
+            'prato': linha['prato__nome'],
+            'quantidade': linha['quantidade'],
+            'preco_unitario': str(linha['preco_unitario']),
+        })
+    return itens
+
+
+CAMPOS_CABECALHO = ['pk', 'nome_cliente', 'data_pedido', 'pago', 'total', 'enviado_cozinha_em']
+
+
+def _cabecalho(pedido):
+    """Cabeçalho de um pedido no painel; 'pedido' é um dict com CAMPOS_CABECALHO."""
+    return {
+        'id': pedido['pk'],
+        'nome_cliente': pedido['nome_cliente'],
+        'data_pedido': pedido['data_pedido'].isoformat(),
+        'pago': pedido['pago'],
+        'total': str(pedido['total']),
+        'enviado_cozinha_em': pedido['enviado_cozinha_em'].isoformat() if pedido['enviado_cozinha_em'] else None,
+    }
+
+
+def _cabecalhos(pedidos):
+    return {pedido['pk']: _cabecalho(pedido) for pedido in pedidos.values(*CAMPOS_CABECALHO)}
+
+
+def pedidos_em_aberto(limite=500):
+    """Lista inicial do painel: pedidos não pagos com os itens (duas consultas)."""
+    cabecalhos = _cabecalhos(Pedido.objects.filter(pago=False).order_by('-data_pedido')[:limite])
+    itens = _itens(list(cabecalhos))
+    return [{**cabecalho, 'itens': itens[pk]} for pk, cabecalho in cabecalhos.items()]
+
+
+# --- Publicação (sempre após o commit: o painel nunca vê um pedido desfeito) ---
+
+def _publicar_apos_commit(funcao, using=None):
+    transaction.on_commit(funcao, using=using or router.db_for_write(Pedido))
+
+
+def pedido_criado(pedido_id, using=None):
+    pedidos_criados([pedido_id], using=using)
+
+
+def pedidos_criados(pedido_ids, using=None):
+    """Publica vários pedidos novos lendo todos de uma vez (duas consultas)."""
+    def publicar():
+        cabecalhos = _cabecalhos(Pedido.objects.filter(pk__in=pedido_ids).order_by('pk'))
+        itens = _itens(list(cabecalhos))
+        for pk, cabecalho in cabecalhos.items():
+            transmissor_atual().publicar(NOVO, {**cabecalho, 'itens': itens[pk]})
+    _publicar_apos_commit(publicar, using)
+
+
+def pedido_alterado(pedido_ids, using=None):
+    def publicar():
+        for cabecalho in _cabecalhos(Pedido.objects.filter(pk__in=pedido_ids)).values():
+            transmissor_atual().publicar(PEDIDO, cabecalho)
+    _publicar_apos_commit(publicar, using)
+
+
+def pedidos_carregados_alterados(pedidos, using=None):
+    """Como pedido_alterado(), com Pedidos já lidos e atualizados em memória (sem consultar de novo)."""
+    cabecalhos = [_cabecalho({campo: getattr(pedido, campo) for campo in CAMPOS_CABECALHO}) for pedido in pedidos]
+
+    def publicar():
+        for cabecalho in cabecalhos:
+            transmissor_atual().publicar(PEDIDO, cabecalho)
+    _publicar_apos_commit(publicar, using)
+
+
+def itens_alterados(pedido_id, using=None):
+    def publicar():
+        total = Pedido.objects.filter(pk=pedido_id).values_list('total', flat=True).first()
+        if total is not None:
+            transmissor_atual().publicar(ITENS, {
+                'id': pedido_id, 'total': str(total), 'itens': _itens([pedido_id])[pedido_id],
+            })
+    _publicar_apos_commit(publicar, using)
+
+
+def pedido_removido(pedido_id, using=None):
+    _publicar_apos_commit(lambda: transmissor_atual().publicar(REMOVIDO, {'id': pedido_id}), using)
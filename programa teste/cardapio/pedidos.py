@@ -0,0 +1,222 @@
+# cardapio/pedidos.py
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router, transaction, IntegrityError
+from .models import Prato, Pedido, ItemPedido, MovimentoEstoque
+from .cache import invalidar_estoque
+from .estoque import baixar_se_disponivel, estoques_atuais
+from .fila import modo_fila, enfileirar_varios, processar_varios_apos_commit
+from .idempotencia import validar_chave, pedido_da_chave, registrar_chaves
+from . import painel
+
+
+# Estratégias de baixa do estoque (CARDAPIO_ESTRATEGIA_PEDIDO):
+# - 'livro': confere em memória, lança todas as saídas e confere de novo se
+#   algum prato ficou negativo (padrão);
+# - 'bloqueio': lê os pratos com select_for_update (trava as linhas até o fim
+#   da transação; no SQLite quem serializa é a própria transação);
+# - 'otimista': sem leitura prévia do estoque nem bloqueio; cada saída é um
+#   INSERT condicionado ao estoque atual, conferido pelo número de linhas.
+ESTRATEGIAS = ['livro', 'bloqueio', 'otimista']
+
+
+class EstoqueAlterado(ValueError):
+    """Algum prato ficou negativo depois das saídas lançadas (estratégia 'livro')."""
+
+
+def estrategia_pedido():
+    estrategia = getattr(settings, 'CARDAPIO_ESTRATEGIA_PEDIDO', 'livro')
+    if estrategia not in ESTRATEGIAS:
+        raise ImproperlyConfigured(
+            f"CARDAPIO_ESTRATEGIA_PEDIDO inválida: {estrategia!r}. Use {', '.join(ESTRATEGIAS)}."
+        )
+    return estrategia
+
+
+def itens_do_json(itens):
+    """
+    Converte a lista 'itens' de um pedido em JSON (API e sincronização dos
+    tablets) em [(prato_id, quantidade)], como no formulário. Itens com
+    quantidade zero são ignorados; um formato inválido lança ValueError.
+    """
+    itens = itens or []
+    if not isinstance(itens, list):
+        raise ValueError("'itens' precisa ser uma lista.")
+    itens_do_pedido = []
+    for item in itens:
+        if not isinstance(item, dict):
+            raise ValueError("Cada item precisa ser um objeto com 'prato_id' e 'quantidade'.")
+        try:
+            prato_id, quantidade = int(item['prato_id']), int(item['quantidade'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Cada item precisa de 'prato_id' e 'quantidade' numéricos.")
+        if quantidade > 0:
+            itens_do_pedido.append((prato_id, quantidade))
+    return itens_do_pedido
+
+
+def registrar_pedido(nome_cliente, itens_do_pedido, chave_idempotencia=None):
+    """
+    Cria um Pedido com seus itens e baixa o estoque dos pratos.
+
+    'itens_do_pedido' é uma lista de (prato_id, quantidade). O número de
+    consultas é constante, qualquer que seja o número de itens (no modo
+    otimista, uma saída por prato). Lança ValueError (com a mesma mensagem da
+    tela do garçom) se faltar estoque.
+
+    Com 'chave_idempotencia', um reenvio da mesma chave (ex.: toque duplo em
+    "Finalizar") devolve o pedido original sem gravar nada de novo.
+    """
+    chave = validar_chave(chave_idempotencia)
+    if chave:
+        original = pedido_da_chave(chave)
+        if original is not None:
+            return original
+
+    try:
+        # Transação no banco dos pedidos (o da unidade, numa rede de restaurantes)
+        with transaction.atomic(using=router.db_for_write(Pedido)):
+            [resultado] = registrar_pedidos([(nome_cliente, itens_do_pedido, chave)])
+            if isinstance(resultado, ValueError):
+                raise resultado
+            return resultado
+    except IntegrityError:
+        # Dois envios simultâneos com a mesma chave: o segundo perde no índice único
+        original = pedido_da_chave(chave) if chave else None
+        if original is None:
+            raise
+        return original
+
+
+def _conferir(itens, pratos, disponivel, estrategia):
+    """
+    Confere o estoque de um pedido em memória, item a item e na ordem do
+    formulário; só se o pedido inteiro couber, desconta de 'disponivel'.
+    Retorna {prato_id: quantidade}.
+    """
+    baixas = {}
+    for prato_id, quantidade in itens:
+        prato = pratos.get(prato_id)
+        if prato is None:
+            raise ValueError(f"Prato {prato_id} não encontrado.")
+        if estrategia != 'otimista':
+            restante = disponivel[prato_id] - baixas.get(prato_id, 0)
+            if restante < quantidade:
+                raise ValueError(f"Estoque insuficiente para {prato.nome}. Disponível: {restante}")
+        baixas[prato_id] = baixas.get(prato_id, 0) + quantidade
+    if estrategia != 'otimista':
+        for prato_id, quantidade in baixas.items():
+            disponivel[prato_id] -= quantidade
+    return baixas
+
+
+def _criar_itens(pedidos_e_itens, pratos):
+    ItemPedido.objects.bulk_create([
+        ItemPedido(pedido=pedido, prato=pratos[prato_id], quantidade=quantidade,
+                   preco_unitario=pratos[prato_id].preco)
+        for pedido, itens in pedidos_e_itens for prato_id, quantidade in itens
+    ])
+
+
+def _gravar_otimista(pedido, itens, baixas, pratos):
+    """Grava um pedido com uma saída condicional por prato; se faltar estoque, desfaz só este pedido."""
+    with transaction.atomic(using=router.db_for_write(Pedido)):
+        Pedido.objects.bulk_create([pedido])
+        _criar_itens([(pedido, itens)], pratos)
+        for prato_id, quantidade in baixas.items():
+            if not baixar_se_disponivel(prato_id, quantidade, pedido=pedido):
+                atual = estoques_atuais([prato_id]).get(prato_id, 0)
+                raise ValueError(f"Estoque insuficiente para {pratos[prato_id].nome}. Disponível: {atual}")
+
+
+def registrar_pedidos(pedidos):
+    """
+    Grava uma lista de pedidos [(nome_cliente, itens, chave)] na transação em
+    andamento, com a baixa de estoque de CARDAPIO_ESTRATEGIA_PEDIDO. Usado
+    pelo registrar_pedido (um pedido) e pela sincronização dos tablets (um lote).
+
+    O estoque é conferido pedido a pedido, na ordem da lista: o pedido sem
+    estoque é rejeitado sozinho e os outros seguem. Retorna, na mesma ordem, o
+    Pedido gravado ou o ValueError com o motivo. Na estratégia 'livro', se algum
+    prato ficar negativo depois das saídas (outro pedido levou o estoque no
+    meio), lança EstoqueAlterado: quem chamou desfaz a transação.
+    """
+    estrategia = estrategia_pedido()
+    pedidos = [
+        (nome_cliente, [(int(prato_id), quantidade) for prato_id, quantidade in itens], chave)
+        for nome_cliente, itens, chave in pedidos
+    ]
+
+    # 1. Lê todos os pratos em uma única consulta (com o estoque atual, exceto
+    # no modo otimista, que confere o estoque ao gravar)
+    pratos = Prato.objects.all()
+    if estrategia == 'bloqueio':
+        pratos = pratos.select_for_update()
+    if estrategia != 'otimista':
+        pratos = pratos.com_estoque_atual()
+    pratos = pratos.in_bulk({prato_id for _, itens, _ in pedidos for prato_id, _ in itens})
+    disponivel = {prato_id: getattr(prato, 'estoque_atual', None) for prato_id, prato in pratos.items()}
+
+    # 2. Confere o estoque em memória e monta os pedidos (já com o total:
+    # o bulk_create não dispara os sinais que o calculariam)
+    resultados, aceitos = [], []  # aceitos: (posição, Pedido, itens, baixas, chave)
+    for nome_cliente, itens, chave in pedidos:
+        try:
+            baixas = _conferir(itens, pratos, disponivel, estrategia)
+        except ValueError as e:
+            resultados.append(e)
+            continue
+        total = sum(pratos[prato_id].preco * quantidade for prato_id, quantidade in itens)
+        pedido = Pedido(nome_cliente=nome_cliente, pago=False, total=total)
+        aceitos.append((len(resultados), pedido, itens, baixas, chave))
+        resultados.append(pedido)
+
+    # 3. Grava pedidos, itens e saídas no livro de estoque: só inserções, a
+    # linha do prato não é alterada (pedidos do mesmo prato não disputam o mesmo registro)
+    if estrategia == 'otimista':
+        # Saídas condicionais: cada pedido no seu savepoint, rejeitado sozinho se faltar estoque
+        gravados = []
+        for aceito in aceitos:
+            posicao, pedido, itens, baixas, _ = aceito
+            try:
+                _gravar_otimista(pedido, itens, baixas, pratos)
+            except ValueError as e:
+                resultados[posicao] = e
+            else:
+                gravados.append(aceito)
+        aceitos = gravados
+    elif aceitos:
+        Pedido.objects.bulk_create([pedido for _, pedido, _, _, _ in aceitos])
+        _criar_itens([(pedido, itens) for _, pedido, itens, _, _ in aceitos], pratos)
+        MovimentoEstoque.objects.bulk_create([
+            MovimentoEstoque(prato_id=prato_id, quantidade=-quantidade,
+                             tipo=MovimentoEstoque.PEDIDO, pedido=pedido)
+            for _, pedido, _, baixas, _ in aceitos for prato_id, quantidade in baixas.items()
+        ])
+
+    if not aceitos:
+        return resultados
+    baixados = {prato_id for _, _, _, baixas, _ in aceitos for prato_id in baixas}
+
+    # 4. Confere, já com as saídas lançadas, se algum prato ficou negativo:
+    # desfaz tudo. No SQLite só há um escritor por vez, então esta conferência basta.
+    if estrategia == 'livro' and (
+        Prato.objects.com_estoque_atual().filter(pk__in=baixados, estoque_atual__lt=0).exists()
+    ):
+        raise EstoqueAlterado("O estoque mudou durante o pedido. Tente novamente.")
+
+    registrar_chaves([(chave, pedido) for _, pedido, _, _, chave in aceitos if chave])
+
+    # bulk_create não dispara sinais: cache (ETag da API), painel e tarefas aqui
+    novos = [pedido for _, pedido, _, _, _ in aceitos]
+    invalidar_estoque(categorias=[pratos[prato_id].categoria_id for prato_id in baixados])
+    painel.pedidos_criados([pedido.pk for pedido in novos])
+
+    # 5. Modo fila: só enfileira (o trabalhador faz o resto); modo síncrono:
+    # as tarefas de acompanhamento rodam nesta requisição, após o commit
+    if modo_fila():
+        enfileirar_varios(novos)
+    else:
+        processar_varios_apos_commit(novos)
+    return resultados
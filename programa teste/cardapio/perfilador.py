@@ -0,0 +1,269 @@
+# cardapio/perfilador.py
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import cProfile
+import threading
+import traceback
+import contextvars
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Liga o perfil de uma requisição (só para a equipe): cabeçalho ou parâmetro na URL
+CABECALHO = 'HTTP_X_CARDAPIO_PERFIL'
+PARAMETRO = '_perfil'
+
+# Nome dos arquivos de um perfil: <id>.prof, <id>.txt e <id>.json
+EXTENSOES = ('.prof', '.txt', '.json')
+NOME_ARQUIVO = re.compile(r'^[\w.-]+\.(prof|txt|json)$')
+
+# Perfil da requisição em andamento (usado pelo wrapper das consultas)
+perfil_atual = contextvars.ContextVar('cardapio_perfil', default=None)
+
+# Um perfil por vez no processo: o Python (3.12+) só aceita um perfilador
+# ativo, e dois perfis juntos misturariam as pilhas amostradas
+_em_uso = threading.Lock()
+
+# Valor do cabeçalho X-Cardapio-Perfil quando já há outro perfil em andamento
+OCUPADO = 'ocupado'
+
+
+def pasta():
+    return Path(getattr(settings, 'CARDAPIO_PERFIS_PASTA', settings.BASE_DIR / 'perfis'))
+
+
+def solicitado(request):
+    """
+    True se a requisição pediu perfil. Só olha a query string e um cabeçalho:
+    é o único custo quando o perfil está desligado (quem pode usar é conferido depois).
+    """
+    return CABECALHO in request.META or (
+        PARAMETRO in request.META.get('QUERY_STRING', '') and PARAMETRO in request.GET
+    )
+
+
+def retirar_parametro(request):
+    """Tira ?_perfil da query da view (o Admin trata parâmetros desconhecidos como filtro)."""
+    if PARAMETRO in request.GET:
+        request.GET = request.GET.copy()
+        del request.GET[PARAMETRO]
+
+
+# --- Amostragem de pilhas (para o flamegraph) ---
+
+class Amostrador(threading.Thread):
+    """
+    Lê a pilha das threads da requisição a cada 'intervalo' segundos
+    (sys._current_frames) e conta cada pilha. O custo fica nesta thread, não
+    na requisição. Gera o formato "collapsed" (uma pilha por linha, funções
+    separadas por ';' e o número de amostras no fim), lido por flamegraph.pl,
+    speedscope e similares.
+    """
+
+    def __init__(self, threads, intervalo):
+        super().__init__(name='cardapio-perfil', daemon=True)
+        self.threads = threads
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            quadros = sys._current_frames()
+            for thread_id in list(self.threads):
+                quadro = quadros.get(thread_id)
+                if quadro is not None:
+                    self.pilhas[self._pilha(quadro)] += 1
+
+    @staticmethod
+    def _pilha(quadro):
+        funcoes = []
+        while quadro is not None:
+            codigo = quadro.f_code
+            funcoes.append(f"{codigo.co_qualname} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+            quadro = quadro.f_back
+        return ';'.join(reversed(funcoes))
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f"{pilha} {quantidade}\n" for pilha, quantidade in self.pilhas.most_common())
+
+
+# --- Consultas com a origem no código ---
+
+# Módulos da própria instrumentação, fora da origem das consultas
+_INSTRUMENTACAO = ('middleware.py', 'metricas.py', 'perfilador.py')
+
+
+def _origem():
+    # Só os quadros do projeto (sem Django e bibliotecas): de onde a consulta saiu
+    raiz = str(settings.BASE_DIR)
+    return [
+        f"{quadro.filename[len(raiz) + 1:]}:{quadro.lineno} {quadro.name}"
+        for quadro in traceback.extract_stack()
+        if quadro.filename.startswith(raiz) and 'site-packages' not in quadro.filename
+        and not quadro.filename.endswith(_INSTRUMENTACAO)
+    ][-6:]
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """Wrapper das conexões: sem perfil ativo, só repassa a chamada."""
+    perfil = perfil_atual.get()
+    if perfil is None:
+        return execute(sql, params, many, context)
+    # A consulta pode rodar em outra thread (views assíncronas): amostra ela também
+    perfil.threads.add(threading.get_ident())
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        perfil.consultas.append({
+            'banco': context['connection'].alias,
+            'sql': sql,
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+            'origem': _origem(),
+        })
+
+
+def _instalar_wrapper(conexao):
+    if registrar_consulta not in conexao.execute_wrappers:
+        conexao.execute_wrappers.insert(0, registrar_consulta)
+
+
+def _conexao_criada(sender, connection, **kwargs):
+    _instalar_wrapper(connection)
+
+
+def instrumentar_conexoes():
+    connection_created.connect(_conexao_criada, dispatch_uid='cardapio_perfilador')
+    for conexao in connections.all(initialized_only=True):
+        _instalar_wrapper(conexao)
+
+
+# --- Perfil de uma requisição ---
+
+class Perfil:
+    """
+    Perfil de uma requisição: cProfile na thread que a atende (arquivo .prof,
+    abra com snakeviz ou pstats), pilhas amostradas (.txt collapsed) e as
+    consultas SQL com tempo e origem (.json).
+    Em views assíncronas, o cProfile vê só o laço de eventos; as pilhas
+    amostradas incluem também as threads onde o ORM rodou.
+    Só um perfil por vez no processo: iniciar() retorna False se outro
+    (ou outra ferramenta de perfil) já estiver ativo.
+    """
+
+    def __init__(self):
+        self.threads = {threading.get_ident()}
+        self.consultas = []
+        self.perfilador = cProfile.Profile()
+        self.amostrador = Amostrador(self.threads, getattr(settings, 'CARDAPIO_PERFIS_INTERVALO', 0.001))
+        self.token = None
+        self.inicio = None
+        self.duracao = None
+
+    def iniciar(self):
+        if not _em_uso.acquire(blocking=False):
+            return False
+        self.token = perfil_atual.set(self)
+        self.amostrador.start()
+        self.inicio = time.perf_counter()
+        try:
+            self.perfilador.enable()
+        except ValueError:
+            # Outra ferramenta de perfil ativa no processo (ex.: python -m cProfile)
+            self.amostrador.parar()
+            perfil_atual.reset(self.token)
+            _em_uso.release()
+            return False
+        return True
+
+    def encerrar(self):
+        try:
+            self.perfilador.disable()
+            self.duracao = time.perf_counter() - self.inicio
+            self.amostrador.parar()
+            perfil_atual.reset(self.token)
+        finally:
+            _em_uso.release()
+
+    def salvar(self, request, response):
+        """Grava os três arquivos, aplica a retenção e retorna o id do perfil."""
+        match = request.resolver_match
+        rota = match.view_name if match else 'sem-rota'
+        perfil_id = '{}-{}-{}'.format(
+            time.strftime('%Y%m%d-%H%M%S'), re.sub(r'[^\w-]', '_', rota), uuid.uuid4().hex[:6]
+        )
+        destino = pasta()
+        destino.mkdir(parents=True, exist_ok=True)
+
+        self.perfilador.dump_stats(destino / f'{perfil_id}.prof')
+        (destino / f'{perfil_id}.txt').write_text(self.amostrador.collapsed(), encoding='utf-8')
+        resumo = {
+            'id': perfil_id,
+            'metodo': request.method,
+            'caminho': request.get_full_path(),
+            'rota': rota,
+            'status': response.status_code,
+            'usuario': request.user.get_username(),
+            'duracao_ms': round(self.duracao * 1000, 3),
+            'amostras': sum(self.amostrador.pilhas.values()),
+            'tempo_db_ms': round(sum(consulta['tempo_ms'] for consulta in self.consultas), 3),
+            'consultas': self.consultas,
+        }
+        (destino / f'{perfil_id}.json').write_text(
+            json.dumps(resumo, ensure_ascii=False, indent=2), encoding='utf-8'
+        )
+        aplicar_retencao()
+        return perfil_id
+
+
+# --- Arquivos guardados ---
+
+def listar():
+    """Perfis guardados, do mais novo para o mais antigo: [(id, [arquivos], bytes, mtime)]."""
+    grupos = {}
+    if not pasta().is_dir():
+        return []
+    for arquivo in pasta().iterdir():
+        if arquivo.suffix not in EXTENSOES:
+            continue
+        info = arquivo.stat()
+        grupo = grupos.setdefault(arquivo.stem, [arquivo.stem, [], 0, 0])
+        grupo[1].append(arquivo.name)
+        grupo[2] += info.st_size
+        grupo[3] = max(grupo[3], info.st_mtime)
+    return sorted((tuple(grupo) for grupo in grupos.values()), key=lambda grupo: grupo[3], reverse=True)
+
+
+def aplicar_retencao():
+    """
+    Apaga os perfis mais antigos até ficarem no máximo CARDAPIO_PERFIS_MAXIMO
+    perfis e CARDAPIO_PERFIS_TAMANHO_MAXIMO bytes na pasta.
+    """
+    maximo = getattr(settings, 'CARDAPIO_PERFIS_MAXIMO', 50)
+    tamanho_maximo = getattr(settings, 'CARDAPIO_PERFIS_TAMANHO_MAXIMO', 100 * 1024 * 1024)
+    total = 0
+    for posicao, (_, arquivos, tamanho, _) in enumerate(listar()):
+        total += tamanho
+        if posicao >= maximo or (posicao > 0 and total > tamanho_maximo):
+            for nome in arquivos:
+                (pasta() / nome).unlink(missing_ok=True)
+
+
+def caminho_arquivo(nome):
+    """Caminho de um arquivo de perfil para download, ou None (nome inválido ou apagado)."""
+    if not NOME_ARQUIVO.match(nome):
+        return None
+    caminho = pasta() / nome
+    return caminho if caminho.is_file() else None
@@ -0,0 +1,220 @@
+# cardapio/rede.py
+
+import logging
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import ProtectedError, Sum
+from .models import Categoria, Prato, VendaPrato
+from .cache import invalidar_cardapio
+from .vendas import consolidar_vendas
+from . import busca, unidades
+
+logger = logging.getLogger('cardapio.rede')
+
+
+# --- Cópia do cardápio mestre (matriz) para as unidades ---
+# Só os campos do cardápio vão para as unidades: o estoque (Prato.estoque e o
+# livro de movimentos) é de cada unidade e nunca é sobrescrito.
+
+def _ler_mestre(categoria_ids=None, prato_ids=None):
+    """Linhas do cardápio mestre no 'default' (todas, ou só os ids pedidos)."""
+    categorias = Categoria.objects.using(DEFAULT_DB_ALIAS)
+    pratos = Prato.objects.using(DEFAULT_DB_ALIAS)
+    if categoria_ids is not None:
+        categorias = categorias.filter(pk__in=categoria_ids)
+    if prato_ids is not None:
+        pratos = pratos.filter(pk__in=prato_ids)
+    return (
+        [Categoria(pk=pk, nome=nome) for pk, nome in categorias.values_list('pk', 'nome')],
+        [
+            Prato(pk=pk, categoria_id=categoria_id, codigo_cardapio=codigo, nome=nome, preco=preco)
+            for pk, categoria_id, codigo, nome, preco in pratos.values_list(
+                'pk', 'categoria_id', 'codigo_cardapio', 'nome', 'preco'
+            )
+        ],
+    )
+
+
+def _remover(queryset):
+    """Apaga um a um; o que a unidade ainda usa (pedidos e vendas: PROTECT) fica e é retornado."""
+    mantidos = []
+    for objeto in queryset:
+        try:
+            with transaction.atomic(using=queryset.db):
+                objeto.delete()
+        except (ProtectedError, IntegrityError):
+            mantidos.append(objeto.pk)
+    return mantidos
+
+
+def _aplicar(nome, categorias, pratos, remover_categorias, remover_pratos, completo):
+    """
+    Grava o cardápio no banco da unidade 'nome' numa transação: remove o que
+    saiu da matriz (antes, para liberar códigos reaproveitados) e insere ou
+    atualiza o resto com um bulk_create cada (upsert pelo id).
+    """
+    banco = unidades.banco(nome)
+    with transaction.atomic(using=banco):
+        mantidos = _remover(Prato.objects.using(banco).filter(pk__in=remover_pratos))
+        mantidos += _remover(Categoria.objects.using(banco).filter(pk__in=remover_categorias))
+
+        Categoria.objects.using(banco).bulk_create(
+            categorias, update_conflicts=True, unique_fields=['id'], update_fields=['nome']
+        )
+        Prato.objects.using(banco).bulk_create(
+            pratos, update_conflicts=True, unique_fields=['id'],
+            update_fields=['categoria', 'codigo_cardapio', 'nome', 'preco'],
+        )
+
+        # bulk_create não dispara sinais: índice de busca e cache aqui
+        if completo:
+            busca.reindexar(using=banco)
+        else:
+            busca.indexar_pratos([prato.pk for prato in pratos] + list(remover_pratos), using=banco)
+        invalidar_cardapio(using=banco)
+
+    if mantidos:
+        logger.warning("Unidade %s: %d registro(s) com pedidos ou vendas não foram apagados.", nome, len(mantidos))
+    return {'categorias': len(categorias), 'pratos': len(pratos), 'mantidos': len(mantidos)}
+
+
+def replicar_catalogo(nomes=None):
+    """
+    Copia o cardápio mestre inteiro para as unidades (todas, ou só 'nomes'),
+    em paralelo: usado ao criar uma unidade e depois de importações em massa.
+    Retorna {unidade: resumo ou exceção}.
+    """
+    categorias, pratos = _ler_mestre()
+    ids_categorias = {categoria.pk for categoria in categorias}
+    ids_pratos = {prato.pk for prato in pratos}
+
+    def copiar(nome):
+        banco = unidades.banco(nome)
+        sobrando_pratos = set(Prato.objects.using(banco).values_list('pk', flat=True)) - ids_pratos
+        sobrando_categorias = set(Categoria.objects.using(banco).values_list('pk', flat=True)) - ids_categorias
+        return _aplicar(nome, categorias, pratos, sobrando_categorias, sobrando_pratos, completo=True)
+
+    return unidades.em_paralelo(copiar, nomes, incluir_matriz=False)
+
+
+def replicar_alteracoes(categoria_ids=(), prato_ids=()):
+    """
+    Copia para todas as unidades só as categorias e os pratos alterados na
+    matriz: os que ainda existem são gravados, os que não existem mais são apagados.
+    """
+    categorias, pratos = _ler_mestre(categoria_ids, prato_ids)
+    remover_categorias = set(categoria_ids) - {categoria.pk for categoria in categorias}
+    remover_pratos = set(prato_ids) - {prato.pk for prato in pratos}
+
+    resultados = unidades.em_paralelo(
+        lambda nome: _aplicar(nome, categorias, pratos, remover_categorias, remover_pratos, completo=False),
+        incluir_matriz=False,
+    )
+    for nome, resultado in resultados.items():
+        if isinstance(resultado, Exception):
+            # A unidade fica como estava; o comando replicar_catalogo acerta depois
+            logger.error("Cópia do cardápio para a unidade %s falhou: %s", nome, resultado)
+    return resultados
+
+
+# Ids alterados na transação atual de cada thread, copiados juntos no commit
+_pendentes = threading.local()
+
+
+def replicar_apos_commit(modelo, pk, using):
+    """
+    Chamado pelos sinais de Categoria/Prato: alterações no cardápio mestre
+    (banco 'default', fora de uma unidade) vão para as unidades após o commit,
+    num único lote por transação.
+
+    A cópia roda na própria requisição (Admin), depois do commit: a matriz já
+    gravou, então uma unidade fora do ar não desfaz nada nem vira erro 500;
+    só fica registrada no log e é acertada pelo comando replicar_catalogo.
+    Com CARDAPIO_REPLICACAO_IMEDIATA = False o Admin não espera as unidades:
+    a cópia fica só com o replicar_catalogo (rodado periodicamente).
+    """
+    if using != DEFAULT_DB_ALIAS or unidades.atual() is not None or not unidades.nomes():
+        return
+    if not getattr(settings, 'CARDAPIO_REPLICACAO_IMEDIATA', True):
+        return
+    pendentes = getattr(_pendentes, 'ids', None)
+    if pendentes is None:
+        pendentes = _pendentes.ids = {Categoria: set(), Prato: set()}
+    pendentes[modelo].add(pk)
+
+    def replicar():
+        ids = getattr(_pendentes, 'ids', None)
+        _pendentes.ids = None
+        # O primeiro callback da transação já copiou tudo
+        if not ids or not (ids[Categoria] or ids[Prato]):
+            return
+        try:
+            replicar_alteracoes(ids[Categoria], ids[Prato])
+        except Exception:
+            # As falhas de cada unidade já voltam como resultado; isto é o
+            # que falhou antes delas (ex.: a leitura do cardápio mestre)
+            logger.exception("Cópia do cardápio para as unidades falhou; rode o comando replicar_catalogo.")
+
+    transaction.on_commit(replicar, using=using)
+
+
+# --- Relatório da rede (todas as unidades em paralelo) ---
+
+def _vendas_da_unidade(inicio, fim):
+    vendas = VendaPrato.objects.all()
+    if inicio:
+        vendas = vendas.filter(dia__gte=inicio)
+    if fim:
+        vendas = vendas.filter(dia__lte=fim)
+    totais = vendas.aggregate(quantidade=Sum('quantidade'), receita=Sum('receita'), receita_paga=Sum('receita_paga'))
+    por_prato = {
+        linha['prato_id']: linha
+        for linha in vendas.values('prato_id').annotate(quantidade=Sum('quantidade'), receita=Sum('receita')).order_by()
+    }
+    return totais, por_prato
+
+
+def relatorio_vendas(inicio=None, fim=None, consolidar=False, mais_vendidos=10):
+    """
+    Vendas consolidadas (VendaPrato) de cada unidade e da matriz, lidas em
+    paralelo (uma thread por banco), e o total da rede. Com consolidar=True,
+    cada banco roda consolidar_vendas antes de somar. Os pratos têm o mesmo id
+    em todas as unidades (cardápio copiado da matriz), então somam direto.
+    """
+    def somar(nome):
+        if consolidar:
+            consolidar_vendas()
+        return _vendas_da_unidade(inicio, fim)
+
+    resultados = unidades.em_paralelo(somar)
+
+    por_unidade, erros, por_prato = {}, {}, {}
+    rede = {'quantidade': 0, 'receita': 0, 'receita_paga': 0}
+    for nome, resultado in resultados.items():
+        rotulo = nome or 'matriz'
+        if isinstance(resultado, Exception):
+            erros[rotulo] = str(resultado)
+            continue
+        totais, pratos = resultado
+        totais = {campo: valor or 0 for campo, valor in totais.items()}
+        por_unidade[rotulo] = totais
+        for campo in rede:
+            rede[campo] += totais[campo]
+        for prato_id, linha in pratos.items():
+            soma = por_prato.setdefault(prato_id, {'quantidade': 0, 'receita': 0})
+            soma['quantidade'] += linha['quantidade']
+            soma['receita'] += linha['receita']
+
+    nomes_pratos = dict(
+        Prato.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=list(por_prato)).values_list('pk', 'nome')
+    )
+    ranking = sorted(por_prato.items(), key=lambda item: item[1]['receita'], reverse=True)[:mais_vendidos]
+    return {
+        'unidades': por_unidade,
+        'rede': rede,
+        'mais_vendidos': [
+            {'prato_id': prato_id, 'prato': nomes_pratos.get(prato_id), **soma} for prato_id, soma in ranking
+        ],
+        'erros': erros,
+    }
@@ -0,0 +1,163 @@
+# cardapio/replica.py
+
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Banco de leitura (cópia do 'default' atualizada pelo comando replicar_banco)
+BANCO_REPLICA = 'replica'
+
+# Tabela gravada na réplica a cada cópia, com o instante (ms) em que a cópia começou
+TABELA_ESTADO = 'cardapio_replica_estado'
+
+# Leitura do estado da réplica guardada por este tempo (segundos) em cada processo
+INTERVALO_ESTADO = 1.0
+
+# Modo de leitura do contexto atual: None (sempre o principal),
+# ('replica', desde_ms) ou ('principal', None). Vale para threads e asyncio.
+_modo = contextvars.ContextVar('cardapio_replica_modo', default=None)
+
+_estado = {'lido_em': None, 'copiado_em': None}
+
+# Instante (ms) da última gravação do usuário, guardado na sessão: as
+# listagens dele só leem da réplica copiada depois disso (vê o que gravou)
+SESSAO_GRAVACAO = 'cardapio_replica_gravou_em'
+
+
+def configurada():
+    return BANCO_REPLICA in settings.DATABASES
+
+
+def atraso_maximo():
+    """Atraso (segundos) acima do qual as leituras voltam para o principal."""
+    return getattr(settings, 'CARDAPIO_REPLICA_ATRASO_MAXIMO', 60)
+
+
+# --- Escolha do banco nas leituras ---
+
+@contextmanager
+def usar_replica(desde=None):
+    """
+    Leituras deste bloco vão para a réplica, se ela estiver em dia: com
+    'desde' (ms, como as versões do cache), só se a cópia começou depois desse
+    instante; sem 'desde', só se o atraso for menor que atraso_maximo().
+    Dentro de transaction.atomic() as leituras continuam no principal.
+    """
+    token = _modo.set(('replica', desde))
+    try:
+        yield
+    finally:
+        _modo.reset(token)
+
+
+@contextmanager
+def fixar_principal():
+    """Leituras deste bloco sempre no principal (dados que precisam estar em dia)."""
+    token = _modo.set(('principal', None))
+    try:
+        yield
+    finally:
+        _modo.reset(token)
+
+
+def _decorador(gerenciador):
+    def decorar(view):
+        if iscoroutinefunction(view):
+            async def envolvida(*args, **kwargs):
+                with gerenciador():
+                    return await view(*args, **kwargs)
+        else:
+            def envolvida(*args, **kwargs):
+                with gerenciador():
+                    return view(*args, **kwargs)
+        return functools.wraps(view)(envolvida)
+    return decorar
+
+
+# Decoradores de views (síncronas ou assíncronas)
+leitura_replica = _decorador(usar_replica)
+leitura_principal = _decorador(fixar_principal)
+
+
+def marcar_gravacao(request):
+    """Chamado depois de uma gravação do usuário (Admin): fixa a sessão no principal até a próxima cópia."""
+    if hasattr(request, 'session'):
+        request.session[SESSAO_GRAVACAO] = int(time.time() * 1000)
+
+
+def gravou_em(request):
+    """
+    Instante (ms) da última gravação da sessão, para usar_replica(desde=...).
+    Passado o atraso_maximo(), volta a valer só o atraso (None).
+    """
+    instante = getattr(request, 'session', {}).get(SESSAO_GRAVACAO)
+    if instante is None or time.time() - instante / 1000 > atraso_maximo():
+        return None
+    return instante
+
+
+# --- Estado e atraso da réplica ---
+
+def copiado_em():
+    """Instante (ms) em que a última cópia da réplica começou, ou None se não há cópia."""
+    agora = time.monotonic()
+    if _estado['lido_em'] is None or agora - _estado['lido_em'] >= INTERVALO_ESTADO:
+        try:
+            with connections[BANCO_REPLICA].cursor() as cursor:
+                cursor.execute(f"SELECT copiado_em FROM {TABELA_ESTADO}")
+                linha = cursor.fetchone()
+        except DatabaseError:
+            # Réplica ainda não copiada (ou no meio da cópia, sem a tabela de estado)
+            linha = None
+        _estado['copiado_em'] = linha[0] if linha else None
+        _estado['lido_em'] = agora
+    return _estado['copiado_em']
+
+
+def atraso():
+    """Atraso da réplica em segundos (None se não houver réplica ou cópia)."""
+    if not configurada():
+        return None
+    copia = copiado_em()
+    if copia is None:
+        return None
+    return max(0.0, time.time() - copia / 1000)
+
+
+def situacao():
+    """Resumo para /metricas/ e para o comando replicar_banco."""
+    if not configurada():
+        return {'configurada': False}
+    atual = atraso()
+    return {
+        'configurada': True,
+        'atraso_s': None if atual is None else round(atual, 3),
+        'atraso_maximo_s': atraso_maximo(),
+        'em_uso': atual is not None and atual <= atraso_maximo(),
+    }
+
+
+def banco_de_leitura():
+    """
+    Banco das leituras no contexto atual: BANCO_REPLICA ou None (deixa o
+    Django usar o principal). Usado pelo RoteadorReplica.
+    """
+    modo = _modo.get()
+    if modo is None or modo[0] != 'replica' or not configurada():
+        return None
+    # Dentro de uma transação no principal, lê o que a própria transação gravou
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    copia = copiado_em()
+    if copia is None:
+        return None
+    desde = modo[1]
+    if desde is not None:
+        em_dia = copia >= desde
+    else:
+        em_dia = time.time() - copia / 1000 <= atraso_maximo()
+    return BANCO_REPLICA if em_dia else None
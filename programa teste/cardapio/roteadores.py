@@ -0,0 +1,116 @@
+# cardapio/roteadores.py
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from . import replica, unidades
+
+# Banco do histórico frio (pedidos arquivados)
+BANCO_ARQUIVO = 'arquivo'
+
+# Modelos que moram no banco do arquivo (nomes em minúsculas, como em _meta)
+MODELOS_ARQUIVO = {'pedidoarquivado', 'itempedidoarquivado'}
+
+
+def _arquivo_configurado():
+    return BANCO_ARQUIVO in settings.DATABASES
+
+
+def _do_arquivo(app_label, model_name):
+    return app_label == 'cardapio' and model_name in MODELOS_ARQUIVO
+
+
+class RoteadorArquivo:
+    """
+    Manda os pedidos arquivados para o banco 'arquivo' (um SQLite separado) e
+    todo o resto para o 'default'. Sem o banco 'arquivo' nas configurações,
+    tudo fica no 'default'.
+
+    As tabelas de cada banco são criadas com:
+        python manage.py migrate
+        python manage.py migrate --database=arquivo
+    """
+
+    def _banco(self, model):
+        if _arquivo_configurado() and _do_arquivo(model._meta.app_label, model._meta.model_name):
+            return BANCO_ARQUIVO
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._banco(model)
+
+    def db_for_write(self, model, **hints):
+        return self._banco(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Pedido arquivado e item arquivado estão no mesmo banco; o resto decide o Django
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not _arquivo_configurado():
+            return None
+        if db == BANCO_ARQUIVO:
+            return _do_arquivo(app_label, model_name)
+        if _do_arquivo(app_label, model_name):
+            return False
+        return None
+
+
+class RoteadorUnidades:
+    """
+    Dentro de uma unidade (unidades.usar_unidade(), escolhida pelo
+    UnidadeMiddleware), todos os modelos do cardápio vão para o banco da
+    unidade: pedidos, itens, fila e estoque são dela, e as categorias e os
+    pratos são a cópia do cardápio mestre (a matriz, no 'default'). Fora de
+    uma unidade, não faz nada. Os pedidos arquivados continuam no 'arquivo'.
+
+    O banco de cada unidade só recebe as tabelas do cardápio:
+        python manage.py migrate --database=unidade_<nome>
+    """
+
+    def _banco(self, model):
+        if model._meta.app_label != 'cardapio' or _do_arquivo('cardapio', model._meta.model_name):
+            return None
+        return unidades.banco_atual()
+
+    def db_for_read(self, model, **hints):
+        return self._banco(model)
+
+    def db_for_write(self, model, **hints):
+        return self._banco(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db.startswith(unidades.PREFIXO_BANCO):
+            return app_label == 'cardapio' and not _do_arquivo(app_label, model_name)
+        return None
+
+
+class RoteadorReplica:
+    """
+    Manda para a réplica ('replica', cópia do 'default' feita pelo comando
+    replicar_banco) as leituras marcadas com replica.usar_replica() ou
+    @leitura_replica, enquanto ela estiver em dia. Todo o resto (gravações,
+    transações, leituras sem marca ou com fixar_principal) fica no 'default'.
+    Sem o banco 'replica' nas configurações, não faz nada.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica.banco_de_leitura()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Um objeto lido da réplica pode ser ligado a outro do principal (mesmos dados)
+        bancos = {DEFAULT_DB_ALIAS, replica.BANCO_REPLICA}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o banco inteiro pela cópia, nunca por migrações
+        if db == replica.BANCO_REPLICA:
+            return False
+        return None
@@ -0,0 +1,52 @@
+# cardapio/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Categoria, Prato, Pedido, ItemPedido, MovimentoEstoque
+from .cache import invalidar_cardapio, invalidar_estoque
+from . import painel, busca, rede, vendas
+
+
+# Qualquer alteração no cardápio (Admin, populate_db) troca a versão do cache
+@receiver([post_save, post_delete], sender=Prato)
+@receiver([post_save, post_delete], sender=Categoria)
+def cardapio_alterado(sender, instance, using=None, **kwargs):
+    invalidar_cardapio(using=using)
+    # Numa rede de restaurantes, o cardápio da matriz é copiado para as unidades
+    rede.replicar_apos_commit(sender, instance.pk, using)
+
+
+# Mantém o índice de busca de pratos (FTS5) igual à tabela, na mesma transação
+@receiver([post_save, post_delete], sender=Prato)
+def prato_alterado(sender, instance, using=None, **kwargs):
+    busca.indexar_pratos([instance.pk], using=using)
+
+
+# Mantém Pedido.total correto quando um item é criado, editado ou apagado
+# (inclusive pelo ItemPedidoInline do Admin)
+@receiver([post_save, post_delete], sender=ItemPedido)
+def item_pedido_alterado(sender, instance, using=None, **kwargs):
+    Pedido.objects.filter(pk=instance.pedido_id).update(total=Pedido.subconsulta_total())
+    painel.itens_alterados(instance.pedido_id, using=using)
+    # Pedido já consolidado: a hora dele é somada de novo em consolidar_vendas
+    vendas.marcar_hora_alterada(instance.pedido_id, using=using)
+
+
+# Painel de pedidos ao vivo (cozinha/caixa): avisa após o commit
+@receiver(post_save, sender=Pedido)
+def pedido_salvo(sender, instance, created, using=None, **kwargs):
+    if created:
+        painel.pedido_criado(instance.pk, using=using)
+    else:
+        painel.pedido_alterado([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Pedido)
+def pedido_apagado(sender, instance, using=None, **kwargs):
+    painel.pedido_removido(instance.pk, using=using)
+
+
+# Reposições e ajustes lançados pelo Admin mudam o estoque exibido
+@receiver(post_save, sender=MovimentoEstoque)
+def movimento_lancado(sender, instance, using=None, **kwargs):
+    invalidar_estoque(using=using, categorias=[instance.prato.categoria_id])
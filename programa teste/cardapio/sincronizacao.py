@@ -0,0 +1,128 @@
+# cardapio/sincronizacao.py
+
+from django.db import router, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+from .models import Prato, Pedido, MovimentoEstoque, ChaveIdempotencia
+from .cache import versao_cardapio
+from .idempotencia import validar_chave
+from .pedidos import EstoqueAlterado, itens_do_json, registrar_pedidos
+
+ACEITO = 'aceito'
+REJEITADO = 'rejeitado'
+
+
+# --- Token de sincronização ---
+# '<versão do cardápio>.<último movimento do livro de estoque>': o estoque só
+# muda por movimentos (o livro nunca é apagado nem alterado), então os pratos
+# com movimentos depois do token são exatamente os que mudaram. Se o cardápio
+# mudou (pratos novos, estoque inicial), o token não vale e vai o estoque inteiro.
+
+def _ler_token(token):
+    versao, _, movimento = (token or '').partition('.')
+    if not versao.isdigit() or not movimento.isdigit() or int(versao) != versao_cardapio():
+        return None
+    return int(movimento)
+
+
+def variacao_estoque(token):
+    """
+    Retorna (novo_token, {prato_id: estoque_atual}, completo): só os pratos
+    cujo estoque mudou desde 'token' ou, se o token não vale mais, todos
+    (completo=True). Duas consultas; rodar na mesma transação das gravações.
+    """
+    desde = _ler_token(token)
+    ultimo = MovimentoEstoque.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+    pratos = Prato.objects.com_estoque_atual()
+    if desde is not None:
+        pratos = pratos.filter(
+            Exists(MovimentoEstoque.objects.filter(prato=OuterRef('pk'), id__gt=desde, id__lte=ultimo))
+        )
+    estoque = dict(pratos.order_by().values_list('pk', 'estoque_atual'))
+    return f"{versao_cardapio()}.{ultimo}", estoque, desde is None
+
+
+# --- Lote de pedidos feitos sem conexão ---
+
+def _validar(pedido):
+    """Confere um pedido do lote; retorna (chave, nome_cliente, [(prato_id, quantidade)])."""
+    if not isinstance(pedido, dict):
+        raise ValueError("Pedido precisa ser um objeto.")
+    chave = validar_chave(pedido.get('chave'))
+    if not chave:
+        raise ValueError("Pedido sem 'chave' (gerada no tablet, obrigatória para reenviar com segurança).")
+    nome_cliente = pedido.get('nome_cliente')
+    if nome_cliente is not None and not isinstance(nome_cliente, str):
+        raise ValueError("'nome_cliente' precisa ser um texto.")
+    itens = itens_do_json(pedido.get('itens'))
+    if not nome_cliente or not itens:
+        raise ValueError("Preencha o nome do cliente/mesa e selecione pelo menos um item.")
+    return chave, nome_cliente, itens
+
+
+def sincronizar(pedidos, token=None):
+    """
+    Registra um lote de pedidos guardados no tablet enquanto estava sem rede,
+    numa única transação e com um número constante de consultas:
+    1. pedidos cuja chave já foi registrada (reenvio) voltam como aceitos,
+       com o id original, sem gravar nada;
+    2. os outros são gravados por registrar_pedidos (o mesmo caminho da tela
+       do garçom e da API, com a estratégia de CARDAPIO_ESTRATEGIA_PEDIDO):
+       o pedido sem estoque é rejeitado sozinho, os outros seguem; se outro
+       garçom levou o estoque no meio, desfaz o lote (ValueError).
+
+    Retorna {'resultados': [...], 'token': ..., 'estoque': {...}, 'completo': bool}
+    com um resultado por pedido, na ordem recebida.
+    """
+    resultados = [None] * len(pedidos)
+    validos = []
+    for posicao, pedido in enumerate(pedidos):
+        try:
+            validos.append((posicao, *_validar(pedido)))
+        except ValueError as e:
+            chave = pedido.get('chave') if isinstance(pedido, dict) else None
+            resultados[posicao] = {'chave': chave, 'status': REJEITADO, 'erro': str(e)}
+
+    with transaction.atomic(using=router.db_for_write(Pedido)):
+        # 1. Reenvios: chaves já registradas (uma consulta para o lote todo)
+        registrados = {
+            chave: {'id': pedido_id, 'total': str(total)}
+            for chave, pedido_id, total in ChaveIdempotencia.objects.filter(
+                chave__in=[chave for _, chave, _, _ in validos], expira_em__gt=timezone.now()
+            ).values_list('chave', 'pedido_id', 'pedido__total')
+        }
+
+        novos = []  # (posicao, chave, nome_cliente, itens)
+        primeira = {}  # chave -> posição da primeira vez no lote
+        repetidos = []
+        for posicao, chave, nome_cliente, itens in validos:
+            if chave in registrados:
+                resultados[posicao] = {'chave': chave, 'status': ACEITO, **registrados[chave]}
+            elif chave in primeira:
+                # A mesma chave duas vezes no lote: é o mesmo pedido
+                repetidos.append((posicao, primeira[chave]))
+            else:
+                primeira[chave] = posicao
+                novos.append((posicao, chave, nome_cliente, itens))
+
+        # 2. Grava os novos (pedidos, itens, saídas de estoque e chaves)
+        if novos:
+            try:
+                gravados = registrar_pedidos([(nome_cliente, itens, chave) for _, chave, nome_cliente, itens in novos])
+            except EstoqueAlterado:
+                raise ValueError("O estoque mudou durante a sincronização. Envie o lote de novo.")
+            for (posicao, chave, _, _), resultado in zip(novos, gravados):
+                if isinstance(resultado, ValueError):
+                    resultados[posicao] = {'chave': chave, 'status': REJEITADO, 'erro': str(resultado)}
+                else:
+                    resultados[posicao] = {
+                        'chave': chave, 'status': ACEITO, 'id': resultado.pk, 'total': str(resultado.total)
+                    }
+
+        for posicao, original in repetidos:
+            resultados[posicao] = resultados[original]
+
+        # 3. Estoque que mudou desde a última sincronização do tablet (já com este lote)
+        novo_token, estoque, completo = variacao_estoque(token)
+
+    return {'resultados': resultados, 'token': novo_token, 'estoque': estoque, 'completo': completo}
@@ -1,3 +1,1119 @@
-from django.test import TestCase
+# cardapio/tests.py
 
-# Create your tests here.
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import call_command
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper as ConexaoSQLite
+from django.db.models import ProtectedError
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    Categoria, Prato, Pedido, ItemPedido, MovimentoEstoque, ChaveIdempotencia, VendaPrato, VendaCategoria,
+    HoraVendaPendente, MarcoConsolidacao, FilaPedido, PedidoArquivado, ItemPedidoArquivado,
+)
+from .arquivo import arquivar_pedidos
+from .benchmark import ORCAMENTO_PADRAO
+from .busca import buscar_pratos, fts_disponivel
+from . import cache as menu_cache
+from . import fila, metricas, perfilador, replica
+from .cache import invalidar_estoque
+from .estaticos import NOME_COM_HASH, ServidorEstaticosWSGI, _codificacoes_aceitas
+from .estoque import compactar_estoque
+from .importador import importar_cardapio, ler_cardapio
+from .management.commands.explicar_consultas import VARREDURA
+from .painel import NOVO, RECOMECAR, Transmissor, formatar_evento, transmissor_atual
+from .pedidos import ESTRATEGIAS, registrar_pedido, registrar_pedidos
+from . import unidades
+from .roteadores import BANCO_ARQUIVO, RoteadorArquivo
+from .vendas import consolidar_vendas, recalcular_vendas
+
+
+def criar_cardapio():
+    """Uma categoria com três pratos (estoque inicial no fechamento)."""
+    categoria = Categoria.objects.create(nome='Pratos Principais')
+    return [
+        Prato.objects.create(categoria=categoria, codigo_cardapio=codigo, nome=nome, preco=preco, estoque=estoque)
+        for codigo, nome, preco, estoque in (
+            ('P1', 'Filé à Parmegiana', Decimal('35.50'), 5),
+            ('P2', 'Salada Caesar', Decimal('28.00'), 1),
+            ('B1', 'Água Mineral', Decimal('4.00'), 10),
+        )
+    ]
+
+
+def estoque_atual(prato):
+    return Prato.objects.com_estoque_atual().get(pk=prato.pk).estoque_atual
+
+
+def entrar_como_equipe(client):
+    client.force_login(User.objects.create_user('gerente', is_staff=True))
+
+
+class CacheLimpoMixin:
+    def setUp(self):
+        super().setUp()
+        caches[getattr(settings, 'CARDAPIO_CACHE', 'default')].clear()
+
+
+# --- Cache do cardápio ---
+
+class CacheCardapioTests(CacheLimpoMixin, TestCase):
+    def test_pagina_em_cache_ate_o_cardapio_mudar(self):
+        file, _, _ = criar_cardapio()
+        self.assertContains(self.client.get(reverse('cardapio')), 'Filé à Parmegiana')
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('cardapio'))
+        # Primeira visita: falha no HTML e na estrutura; segunda: acerto no HTML
+        estatisticas = menu_cache.estatisticas_cache()
+        self.assertEqual((estatisticas['acertos'], estatisticas['falhas']), (1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            file.nome = 'Filé ao Molho Madeira'
+            file.save()
+        self.assertGreater(menu_cache.versao_cardapio(), estatisticas['versao'])
+        self.assertContains(self.client.get(reverse('cardapio')), 'Filé ao Molho Madeira')
+
+    def test_versao_so_troca_depois_do_commit(self):
+        antes = menu_cache.versao_cardapio()
+        with self.captureOnCommitCallbacks() as tarefas:
+            menu_cache.invalidar_cardapio()
+            self.assertEqual(menu_cache.versao_cardapio(), antes)
+        for tarefa in tarefas:
+            tarefa()
+        self.assertGreater(menu_cache.versao_cardapio(), antes)
+
+    def test_versao_recriada_nunca_volta(self):
+        antes = menu_cache.versao_cardapio()
+        caches[menu_cache.alias_cache()].delete(menu_cache.CHAVE_VERSAO)
+        self.assertGreaterEqual(menu_cache.versao_cardapio(), antes)
+
+    def test_estoque_por_categoria(self):
+        versoes = menu_cache.versoes_estoque_categorias([1, 2])
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_estoque(categorias=[1])
+        novas = menu_cache.versoes_estoque_categorias([1, 2])
+        self.assertNotEqual(novas[1], versoes[1])
+        self.assertEqual(novas[2], versoes[2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_estoque()
+        self.assertNotEqual(menu_cache.versoes_estoque_categorias([2])[2], versoes[2])
+
+
+# --- Tela do garçom (fragmentos em cache) ---
+
+class FragmentosGarcomTests(CacheLimpoMixin, TestCase):
+    def test_pedido_refaz_so_a_categoria_dos_seus_pratos(self):
+        file, _, agua = criar_cardapio()
+        Prato.objects.filter(pk=agua.pk).update(categoria=Categoria.objects.create(nome='Bebidas'))
+        resposta = self.client.get(reverse('fazer_pedido'))
+        self.assertContains(resposta, 'Estoque: 5')
+        self.assertContains(resposta, 'Estoque: 10')
+
+        # bulk_create não dispara sinais: a categoria das bebidas continua no cache
+        MovimentoEstoque.objects.bulk_create([
+            MovimentoEstoque(prato=agua, quantidade=-3, tipo=MovimentoEstoque.AJUSTE)
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_pedido('Mesa 1', [(file.pk, 1)])
+
+        resposta = self.client.get(reverse('fazer_pedido'))
+        self.assertContains(resposta, 'Estoque: 4')
+        self.assertContains(resposta, 'Estoque: 10')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_estoque()
+        self.assertContains(self.client.get(reverse('fazer_pedido')), 'Estoque: 7')
+
+    def test_segunda_exibicao_sem_consultar_os_pratos(self):
+        criar_cardapio()
+        self.client.get(reverse('fazer_pedido'))
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertContains(self.client.get(reverse('fazer_pedido')), 'Filé à Parmegiana')
+        self.assertFalse([consulta for consulta in consultas if 'cardapio_prato' in consulta['sql']])
+
+
+# --- Importação do cardápio ---
+
+class ImportarCardapioTests(CacheLimpoMixin, TestCase):
+    def arquivo(self, cardapio):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8', delete=False) as arquivo:
+            json.dump(cardapio, arquivo, ensure_ascii=False)
+        self.addCleanup(os.remove, arquivo.name)
+        return arquivo.name
+
+    def test_leitura_em_blocos_pequenos(self):
+        caminho = self.arquivo({'Bebidas': {'B1': {'nome': 'Água "com gás"', 'preco': 4.5, 'estoque': 3}}, 'Vazia': {}})
+        self.assertEqual(
+            list(ler_cardapio(caminho, tamanho_bloco=3)),
+            [('Bebidas', 'B1', {'nome': 'Água "com gás"', 'preco': Decimal('4.5'), 'estoque': 3})],
+        )
+
+    def test_insere_atualiza_e_remove(self):
+        file, salada, agua = criar_cardapio()
+        registrar_pedido('Mesa 1', [(salada.pk, 1)])
+        caminho = self.arquivo({
+            'Pratos Principais': {
+                'P1': {'nome': 'Filé à Parmegiana', 'preco': 39.90, 'estoque': 8},
+                'P3': {'nome': 'Risoto de Camarão', 'preco': 52.00, 'estoque': 6},
+            },
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            contagem = importar_cardapio(caminho, tamanho_lote=1)['contagem']
+
+        self.assertEqual(
+            {campo: contagem[campo] for campo in ('inseridos', 'atualizados', 'ajustes_estoque', 'removidos', 'zerados')},
+            {'inseridos': 1, 'atualizados': 1, 'ajustes_estoque': 1, 'removidos': 1, 'zerados': 1},
+        )
+        self.assertEqual(Prato.objects.get(codigo_cardapio='P1').preco, Decimal('39.90'))
+        self.assertEqual(estoque_atual(file), 8)
+        self.assertFalse(Prato.objects.filter(pk=agua.pk).exists())
+        # A salada tem pedido (PROTECT): fica, sem estoque
+        self.assertEqual(estoque_atual(salada), 0)
+        self.assertEqual(buscar_pratos('risoto'), [Prato.objects.get(codigo_cardapio='P3').pk])
+
+        # Arquivo igual: nada muda
+        self.assertEqual(importar_cardapio(caminho)['contagem']['inalterados'], 2)
+
+    def test_dry_run_nao_grava(self):
+        criar_cardapio()
+        caminho = self.arquivo({'Bebidas': {'B2': {'nome': 'Suco', 'preco': 9, 'estoque': 1}}})
+        contagem = importar_cardapio(caminho, simular=True)['contagem']
+        self.assertEqual((contagem['inseridos'], contagem['removidos']), (1, 3))
+        self.assertEqual(Prato.objects.count(), 3)
+
+
+# --- Métricas por rota ---
+
+class MetricasTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        metricas.limpar()
+        self.addCleanup(metricas.limpar)
+        criar_cardapio()
+
+    def test_percentil(self):
+        valores = list(range(1, 101))
+        self.assertEqual([metricas.percentil(valores, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(metricas.percentil([7], 99), 7)
+
+    def test_consultas_e_template_por_nome_de_url(self):
+        for _ in range(2):
+            self.client.get(reverse('fazer_pedido'))
+        self.client.get(reverse('api_cardapio'))  # view assíncrona
+
+        resumo = metricas.resumo()
+        self.assertEqual(resumo['fazer_pedido']['amostras'], 2)
+        self.assertGreater(resumo['fazer_pedido']['consultas']['p50'], 0)
+        self.assertGreater(resumo['fazer_pedido']['tempo_template']['p99'], 0)
+        self.assertGreaterEqual(resumo['fazer_pedido']['tempo_total']['p50'], resumo['fazer_pedido']['tempo_db']['p50'])
+        self.assertEqual(resumo['api_cardapio']['consultas']['p50'], 2)
+        self.assertEqual(resumo['api_cardapio']['tempo_template']['p50'], 0)
+
+    def test_resumo_so_para_a_equipe(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 302)
+        entrar_como_equipe(self.client)
+        resposta = self.client.get(reverse('metricas'))
+        self.assertIn('replica', resposta.json())
+
+
+# --- Pedidos ---
+
+class RegistrarPedidoTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.file, self.salada, self.agua = criar_cardapio()
+
+    def test_registra_pedido_com_total_itens_e_baixa(self):
+        pedido = registrar_pedido('Mesa 4', [(self.file.pk, 2), (str(self.agua.pk), 1)])
+
+        self.assertEqual(pedido.total, Decimal('75.00'))
+        self.assertEqual(pedido.itens.count(), 2)
+        self.assertEqual(estoque_atual(self.file), 3)
+        self.assertEqual(estoque_atual(self.agua), 9)
+
+    def test_estoque_insuficiente_nao_grava_nada(self):
+        with self.assertRaisesMessage(ValueError, "Estoque insuficiente para Salada Caesar. Disponível: 1"):
+            registrar_pedido('Mesa 4', [(self.file.pk, 1), (self.salada.pk, 2)])
+
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(estoque_atual(self.file), 5)
+
+    def test_estoque_insuficiente_conta_o_mesmo_prato_repetido(self):
+        with self.assertRaisesMessage(ValueError, "Estoque insuficiente para Filé à Parmegiana. Disponível: 2"):
+            registrar_pedido('Mesa 4', [(self.file.pk, 3), (self.file.pk, 3)])
+
+    def test_prato_inexistente(self):
+        with self.assertRaisesMessage(ValueError, "Prato 999 não encontrado."):
+            registrar_pedido('Mesa 4', [(999, 1)])
+
+    def test_mensagens_da_tela_do_garcom(self):
+        resposta = self.client.post(
+            reverse('fazer_pedido'), {'nome_cliente': 'Mesa 1', f'quantidade_{self.salada.pk}': '3'}, follow=True
+        )
+        self.assertContains(resposta, "Estoque insuficiente para Salada Caesar. Disponível: 1")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(
+                reverse('fazer_pedido'), {'nome_cliente': 'Mesa 1', f'quantidade_{self.file.pk}': '1'}, follow=True
+            )
+        pedido = Pedido.objects.get()
+        self.assertContains(resposta, f"Pedido #{pedido.pk} para Mesa 1 registrado")
+
+    def test_chave_repetida_devolve_o_pedido_original(self):
+        original = registrar_pedido('Mesa 4', [(self.file.pk, 1)], chave_idempotencia='toque-duplo')
+        repetido = registrar_pedido('Mesa 4', [(self.file.pk, 1)], chave_idempotencia='toque-duplo')
+
+        self.assertEqual(repetido.pk, original.pk)
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(ChaveIdempotencia.objects.get().pedido_id, original.pk)
+        self.assertEqual(estoque_atual(self.file), 4)
+
+    def test_chave_repetida_na_api(self):
+        def enviar():
+            return self.client.post(
+                reverse('api_pedidos'),
+                {'nome_cliente': 'Quiosque', 'itens': [{'prato_id': self.agua.pk, 'quantidade': 2}]},
+                content_type='application/json', HTTP_IDEMPOTENCY_KEY='quiosque-1',
+            )
+
+        primeira, segunda = enviar(), enviar()
+        self.assertEqual(primeira.status_code, 201)
+        self.assertEqual(segunda.json()['id'], primeira.json()['id'])
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_chave_fora_do_formato_na_api(self):
+        dados = {'nome_cliente': 'Quiosque', 'itens': [{'prato_id': self.agua.pk, 'quantidade': 1}]}
+        for chave in (123, ['quiosque-1'], 'x' * 65):
+            with self.subTest(chave=chave):
+                resposta = self.client.post(
+                    reverse('api_pedidos'), {**dados, 'chave_idempotencia': chave}, content_type='application/json'
+                )
+                self.assertEqual(resposta.status_code, 400)
+        resposta = self.client.post(
+            reverse('api_pedidos'), dados, content_type='application/json', HTTP_IDEMPOTENCY_KEY='x' * 65
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Pedido.objects.exists())
+
+    def test_itens_fora_do_formato_na_api(self):
+        resposta = self.client.post(
+            reverse('api_pedidos'), {'nome_cliente': 'Quiosque', 'itens': {'prato_id': 1}},
+            content_type='application/json',
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+
+class EstrategiaPedidoTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.file, self.salada, self.agua = criar_cardapio()
+
+    def test_mesmo_resultado_em_todas_as_estrategias(self):
+        for estrategia in ESTRATEGIAS:
+            with self.subTest(estrategia=estrategia), override_settings(CARDAPIO_ESTRATEGIA_PEDIDO=estrategia):
+                antes = estoque_atual(self.file)
+                with self.assertRaisesMessage(ValueError, "Estoque insuficiente para Filé à Parmegiana."):
+                    registrar_pedido('Mesa 1', [(self.file.pk, 1), (self.file.pk, antes)])
+                self.assertEqual(estoque_atual(self.file), antes)
+
+                pedido = registrar_pedido('Mesa 1', [(self.file.pk, 1), (self.agua.pk, 1)])
+                self.assertEqual(pedido.total, Decimal('39.50'))
+                self.assertEqual(estoque_atual(self.file), antes - 1)
+
+    @override_settings(CARDAPIO_ESTRATEGIA_PEDIDO='otimista')
+    def test_otimista_rejeita_so_o_pedido_sem_estoque(self):
+        resultados = registrar_pedidos([
+            ('Mesa 1', [(self.salada.pk, 1)], None),
+            ('Mesa 2', [(self.salada.pk, 1)], None),
+            ('Mesa 3', [(self.agua.pk, 2)], None),
+        ])
+        self.assertIsInstance(resultados[0], Pedido)
+        self.assertIsInstance(resultados[1], ValueError)
+        self.assertIsInstance(resultados[2], Pedido)
+        self.assertEqual((estoque_atual(self.salada), estoque_atual(self.agua)), (0, 8))
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    @override_settings(CARDAPIO_ESTRATEGIA_PEDIDO='sem-trava')
+    def test_estrategia_invalida(self):
+        with self.assertRaises(ImproperlyConfigured):
+            registrar_pedido('Mesa 1', [(self.agua.pk, 1)])
+
+
+class TotalPedidoTests(TestCase):
+    def setUp(self):
+        self.file, self.salada, self.agua = criar_cardapio()
+        self.pedido = registrar_pedido('Mesa 4', [(self.file.pk, 1)])
+
+    def total(self):
+        return Pedido.objects.get(pk=self.pedido.pk).total
+
+    def test_total_acompanha_os_itens(self):
+        item = ItemPedido.objects.create(pedido=self.pedido, prato=self.agua, quantidade=2, preco_unitario=Decimal('4.00'))
+        self.assertEqual(self.total(), Decimal('43.50'))
+        item.quantidade = 3
+        item.save()
+        self.assertEqual(self.total(), Decimal('47.50'))
+        item.delete()
+        self.assertEqual(self.total(), Decimal('35.50'))
+
+    def test_recalcular_totais(self):
+        Pedido.objects.update(total=0)
+        saida = io.StringIO()
+        call_command('recalcular_totais', '--verificar', stdout=saida)
+        self.assertIn(f"Pedido #{self.pedido.pk}: gravado R$ 0.00", saida.getvalue())
+        self.assertIn("1 pedido(s) com total divergente.", saida.getvalue())
+        self.assertEqual(self.total(), 0)
+
+        call_command('recalcular_totais', stdout=io.StringIO())
+        self.assertEqual(self.total(), Decimal('35.50'))
+
+
+def tarefa_com_erro(pedidos):
+    raise RuntimeError("impressora da cozinha desligada")
+
+
+TAREFA_COM_ERRO = override_settings(CARDAPIO_FILA_TAREFAS=['cardapio.tests.tarefa_com_erro'])
+
+
+class FilaPedidoTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.file, _, self.agua = criar_cardapio()
+
+    def test_modo_sincrono_envia_apos_o_commit(self):
+        with self.assertLogs('cardapio.recibos', 'INFO') as recibos, self.captureOnCommitCallbacks(execute=True):
+            pedido = registrar_pedido('Mesa 1', [(self.file.pk, 2)])
+        self.assertIsNotNone(Pedido.objects.get(pk=pedido.pk).enviado_cozinha_em)
+        self.assertIn("2x Filé à Parmegiana R$ 35.50", recibos.output[0])
+        self.assertFalse(FilaPedido.objects.exists())
+
+    def test_erro_no_modo_sincrono_vai_para_a_fila(self):
+        with TAREFA_COM_ERRO, self.assertLogs('cardapio.fila', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                pedido = registrar_pedido('Mesa 1', [(self.file.pk, 1)])
+
+        entrada = FilaPedido.objects.get()
+        self.assertEqual((entrada.pedido_id, entrada.status), (pedido.pk, FilaPedido.ERRO))
+        self.assertEqual(entrada.ultimo_erro, "impressora da cozinha desligada")
+
+        self.assertEqual(fila.reenfileirar(FilaPedido.objects.all()), 1)
+        self.assertEqual(fila.processar_lote(fila.reservar_lote('trabalhador-1')), 1)
+        self.assertEqual(FilaPedido.objects.get().status, FilaPedido.CONCLUIDO)
+
+    @override_settings(CARDAPIO_MODO_PEDIDO='fila')
+    def test_modo_fila(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            primeiro = registrar_pedido('Mesa 1', [(self.file.pk, 1)])
+            registrar_pedido('Mesa 2', [(self.agua.pk, 1)])
+        self.assertEqual(FilaPedido.objects.filter(status=FilaPedido.PENDENTE).count(), 2)
+        self.assertIsNone(Pedido.objects.get(pk=primeiro.pk).enviado_cozinha_em)
+
+        # Reserva: um trabalhador não pega o lote do outro
+        ids = fila.reservar_lote('trabalhador-1', tamanho=1)
+        self.assertEqual(len(ids), 1)
+        self.assertEqual(len(fila.reservar_lote('trabalhador-2')), 1)
+        self.assertEqual(fila.reservar_lote('trabalhador-3'), [])
+
+        # Erro: volta para pendente até esgotar as tentativas
+        with TAREFA_COM_ERRO, self.assertLogs('cardapio.fila', 'ERROR'):
+            self.assertEqual(fila.processar_lote(ids), 0)
+            self.assertEqual(FilaPedido.objects.get(pk=ids[0]).status, FilaPedido.PENDENTE)
+            self.assertEqual(fila.processar_lote(fila.reservar_lote('trabalhador-1', tamanho=1), max_tentativas=2), 0)
+        self.assertEqual(FilaPedido.objects.get(pk=ids[0]).status, FilaPedido.ERRO)
+
+        # Reserva vencida (o trabalhador 2 caiu): outro retoma e conclui
+        retomados = fila.reservar_lote('trabalhador-3', expiracao=-1)
+        self.assertEqual(len(retomados), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(fila.processar_lote(retomados), 1)
+        self.assertEqual(FilaPedido.objects.get(pk=retomados[0]).status, FilaPedido.CONCLUIDO)
+        self.assertIsNotNone(FilaPedido.objects.get(pk=retomados[0]).pedido.enviado_cozinha_em)
+
+
+class ConsultasPedidoTests(CacheLimpoMixin, TransactionTestCase):
+    # Sem a transação do TestCase: os savepoints não entram na conta e as
+    # tarefas após o commit rodam, como numa requisição de verdade
+    databases = {'default'}
+
+    def test_post_do_pedido_dentro_do_orcamento(self):
+        pratos = criar_cardapio()
+        dados = {'nome_cliente': 'Mesa 7', **{f'quantidade_{prato.pk}': '1' for prato in pratos}}
+
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.post(reverse('fazer_pedido'), dados)
+
+        self.assertEqual(resposta.status_code, 302)
+        self.assertLessEqual(len(consultas), ORCAMENTO_PADRAO['fazer_pedido_post'])
+
+
+class IndicesTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != 'sqlite':
+            self.skipTest("EXPLAIN QUERY PLAN só existe no SQLite.")
+
+    def test_consultas_sem_ler_a_tabela_inteira(self):
+        consultas = [
+            Pedido.objects.filter(pago=False).order_by('-data_pedido'),
+            Pedido.objects.filter(nome_cliente__iexact='mesa 4'),
+            Pedido.objects.filter(pago=True, pago_contabilizado=False),
+            FilaPedido.objects.filter(status=FilaPedido.PENDENTE).order_by('id'),
+            MovimentoEstoque.objects.filter(prato_id=1, id__gt=10),
+        ]
+        for consulta in consultas:
+            with self.subTest(sql=str(consulta.query)):
+                plano = [linha.split(' ', 3)[-1] for linha in consulta.explain().splitlines()]
+                self.assertEqual([detalhe for detalhe in plano if VARREDURA.match(detalhe)], [])
+
+    def test_explicar_consultas_sem_varreduras(self):
+        pratos = criar_cardapio()
+        registrar_pedido('Mesa 4', [(pratos[0].pk, 1)])
+        User.objects.create_superuser('gerente', password='senha')
+        saida = io.StringIO()
+        call_command('explicar_consultas', '--usuario', 'gerente', stdout=saida)
+        self.assertIn("Nenhuma varredura de tabela fora das permitidas.", saida.getvalue())
+        self.assertNotIn("Redirecionada", saida.getvalue())
+
+
+class PerfilBancoTests(TestCase):
+    def test_perfil_producao_no_sqlite(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        conexao = ConexaoSQLite({
+            **connection.settings_dict, **settings.CARDAPIO_PERFIS_BANCO['producao'],
+            'NAME': os.path.join(pasta.name, 'producao.sqlite3'),
+        })
+        self.addCleanup(conexao.close)
+        with conexao.cursor() as cursor:
+            valores = {}
+            for pragma in ('journal_mode', 'busy_timeout', 'synchronous'):
+                cursor.execute(f'PRAGMA {pragma}')
+                valores[pragma] = cursor.fetchone()[0]
+        # synchronous=NORMAL é o valor 1
+        self.assertEqual(valores, {'journal_mode': 'wal', 'busy_timeout': 5000, 'synchronous': 1})
+        self.assertEqual(conexao.transaction_mode, 'IMMEDIATE')
+
+    def test_banco_ocupado_responde_503(self):
+        prato = criar_cardapio()[0]
+        with mock.patch('cardapio.api.registrar_pedido', side_effect=OperationalError("database is locked")):
+            resposta = self.client.post(
+                reverse('api_pedidos'), {'nome_cliente': 'Mesa 1', 'itens': [{'prato_id': prato.pk, 'quantidade': 1}]},
+                content_type='application/json',
+            )
+        self.assertEqual(resposta.status_code, 503)
+
+
+# --- Livro de estoque ---
+
+class CompactarEstoqueTests(TestCase):
+    def test_totais_iguais_depois_de_compactar(self):
+        file, salada, agua = criar_cardapio()
+        MovimentoEstoque.objects.create(prato=file, quantidade=-3, tipo=MovimentoEstoque.PEDIDO)
+        MovimentoEstoque.objects.create(prato=file, quantidade=7, tipo=MovimentoEstoque.REPOSICAO)
+        ultimo = MovimentoEstoque.objects.create(prato=agua, quantidade=-4, tipo=MovimentoEstoque.AJUSTE)
+        antes = dict(Prato.objects.com_estoque_atual().values_list('pk', 'estoque_atual'))
+
+        fechados, ate = compactar_estoque()
+
+        self.assertEqual((fechados, ate), (2, ultimo.pk))
+        self.assertEqual(dict(Prato.objects.com_estoque_atual().values_list('pk', 'estoque_atual')), antes)
+        self.assertEqual(dict(Prato.objects.values_list('pk', 'estoque')), antes)
+        self.assertEqual(Prato.objects.get(pk=salada.pk).estoque_ate_movimento, 0)
+
+        # Movimentos depois do fechamento continuam somando
+        MovimentoEstoque.objects.create(prato=file, quantidade=-2, tipo=MovimentoEstoque.PEDIDO)
+        self.assertEqual(estoque_atual(file), antes[file.pk] - 2)
+        self.assertEqual(compactar_estoque(), (1, ultimo.pk + 1))
+
+
+# --- API ---
+
+class ApiCardapioTests(CacheLimpoMixin, TestCase):
+    def test_etag_e_304(self):
+        criar_cardapio()
+        url = reverse('api_cardapio')
+
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        etag = resposta['ETag']
+        self.assertTrue(resposta.has_header('Last-Modified'))
+        self.assertEqual(len(resposta.json()['categorias'][0]['pratos']), 3)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=resposta['Last-Modified']).status_code, 304
+        )
+
+        # Estoque alterado: nova versão, nova resposta
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_estoque()
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+
+class LeituraAssincronaTests(CacheLimpoMixin, TestCase):
+    # Sob ASGI (AsyncClient), as views do cardápio rodam como corrotinas
+    def setUp(self):
+        super().setUp()
+        criar_cardapio()
+
+    async def test_paginas_e_api_sob_asgi(self):
+        resposta = await self.async_client.get(reverse('cardapio'))
+        self.assertContains(resposta, 'Salada Caesar')
+        self.assertEqual((await self.async_client.get(reverse('home'))).status_code, 200)
+
+        resposta = await self.async_client.get(reverse('api_cardapio'))
+        pratos = resposta.json()['categorias'][0]['pratos']
+        self.assertEqual([prato['estoque'] for prato in pratos], [10, 5, 1])
+        resposta = await self.async_client.get(reverse('api_cardapio'), headers={'if-none-match': resposta['ETag']})
+        self.assertEqual(resposta.status_code, 304)
+
+    async def test_post_na_api_de_leitura(self):
+        resposta = await self.async_client.post(reverse('api_cardapio'))
+        self.assertEqual(resposta.status_code, 405)
+
+
+class SincronizacaoTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.file, self.salada, self.agua = criar_cardapio()
+
+    def sincronizar(self, pedidos, token=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(
+                reverse('api_sincronizar'), {'token': token, 'pedidos': pedidos}, content_type='application/json'
+            )
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_aceita_e_rejeita_cada_pedido(self):
+        lote = [
+            {'chave': 'tablet-1', 'nome_cliente': 'Mesa 1', 'itens': [{'prato_id': self.salada.pk, 'quantidade': 1}]},
+            {'chave': 'tablet-2', 'nome_cliente': 'Mesa 2', 'itens': [{'prato_id': self.salada.pk, 'quantidade': 1}]},
+            {'chave': 'tablet-3', 'nome_cliente': 'Mesa 3', 'itens': [{'prato_id': self.agua.pk, 'quantidade': 2}]},
+            {'nome_cliente': 'Mesa 4', 'itens': [{'prato_id': self.agua.pk, 'quantidade': 1}]},
+        ]
+        resposta = self.sincronizar(lote)
+
+        status = [resultado['status'] for resultado in resposta['resultados']]
+        self.assertEqual(status, ['aceito', 'rejeitado', 'aceito', 'rejeitado'])
+        self.assertEqual(
+            resposta['resultados'][1]['erro'], "Estoque insuficiente para Salada Caesar. Disponível: 0"
+        )
+        self.assertTrue(resposta['completo'])
+        self.assertEqual(resposta['estoque'][str(self.salada.pk)], 0)
+        self.assertEqual(resposta['estoque'][str(self.agua.pk)], 8)
+        self.assertEqual(Pedido.objects.count(), 2)
+
+        # Reenvio do mesmo lote: os aceitos voltam com o id original, nada novo é gravado
+        reenvio = self.sincronizar(lote[:1] + lote[2:3], token=resposta['token'])
+        self.assertEqual(
+            [resultado['id'] for resultado in reenvio['resultados']],
+            [resposta['resultados'][0]['id'], resposta['resultados'][2]['id']],
+        )
+        self.assertEqual(Pedido.objects.count(), 2)
+        self.assertFalse(reenvio['completo'])
+        self.assertEqual(reenvio['estoque'], {})
+
+    def test_chave_fora_do_formato_rejeita_so_o_pedido(self):
+        itens = [{'prato_id': self.agua.pk, 'quantidade': 1}]
+        resposta = self.sincronizar([
+            {'chave': 123, 'nome_cliente': 'Mesa 1', 'itens': itens},
+            {'chave': 'x' * 65, 'nome_cliente': 'Mesa 2', 'itens': itens},
+            {'chave': 'tablet-1', 'nome_cliente': 'Mesa 3', 'itens': itens},
+        ])
+
+        status = [resultado['status'] for resultado in resposta['resultados']]
+        self.assertEqual(status, ['rejeitado', 'rejeitado', 'aceito'])
+        self.assertEqual(resposta['resultados'][0]['chave'], 123)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+
+# --- Exportação para a contabilidade ---
+
+class ExportarPedidosTests(TestCase):
+    def setUp(self):
+        self.file, _, self.agua = criar_cardapio()
+        self.antigo = registrar_pedido('Mesa 1', [(self.file.pk, 1), (self.agua.pk, 2)])
+        self.novo = registrar_pedido('Mesa 2', [(self.agua.pk, 1)])
+        Pedido.objects.filter(pk=self.antigo.pk).update(data_pedido=timezone.now() - timedelta(days=10), pago=True)
+        entrar_como_equipe(self.client)
+
+    def exportar(self, **parametros):
+        resposta = self.client.get(reverse('exportar_pedidos'), parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, b''.join(resposta.streaming_content)
+
+    def test_csv_uma_linha_por_item(self):
+        resposta, conteudo = self.exportar()
+        self.assertEqual(resposta['Content-Disposition'], 'attachment; filename="pedidos.csv"')
+        linhas = list(csv.DictReader(io.StringIO(conteudo.decode('utf-8'))))
+        self.assertEqual(
+            [(int(linha['pedido_id']), linha['codigo_cardapio'], linha['subtotal']) for linha in linhas],
+            [(self.antigo.pk, 'P1', '35.50'), (self.antigo.pk, 'B1', '8.00'), (self.novo.pk, 'B1', '4.00')],
+        )
+
+    def test_filtros_e_gzip(self):
+        ontem = (timezone.localdate() - timedelta(days=1)).isoformat()
+        _, conteudo = self.exportar(formato='jsonl', inicio=ontem)
+        self.assertEqual([json.loads(linha)['id'] for linha in conteudo.decode().splitlines()], [self.novo.pk])
+
+        resposta, conteudo = self.exportar(formato='jsonl', pago='sim', gzip='1')
+        self.assertEqual(resposta['Content-Type'], 'application/gzip')
+        [pedido] = [json.loads(linha) for linha in gzip.decompress(conteudo).decode().splitlines()]
+        self.assertEqual((pedido['id'], pedido['total'], len(pedido['itens'])), (self.antigo.pk, '43.50', 2))
+
+    def test_parametros_invalidos(self):
+        for parametros in ({'formato': 'xlsx'}, {'inicio': '31/12/2024'}, {'fim': '2024-02-30'}):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(reverse('exportar_pedidos'), parametros).status_code, 400)
+
+
+# --- Vendas consolidadas ---
+
+# Sem o banco do arquivo migrado (migrate --database=arquivo ainda não rodou)
+@mock.patch('cardapio.arquivo.arquivo_pronto', return_value=False)
+class ConsolidarVendasTests(TestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.file, self.salada, self.agua = criar_cardapio()
+
+    def vendas_por_prato(self):
+        return {
+            prato_id: (quantidade, receita, receita_paga)
+            for prato_id, quantidade, receita, receita_paga in VendaPrato.objects.values_list(
+                'prato_id', 'quantidade', 'receita', 'receita_paga'
+            )
+        }
+
+    def test_soma_so_os_pedidos_depois_do_marco(self, _):
+        primeiro = registrar_pedido('Mesa 1', [(self.file.pk, 2)])
+        self.assertEqual(consolidar_vendas(), (1, 0, 0))
+        self.assertEqual(MarcoConsolidacao.objects.get().ultimo_pedido_id, primeiro.pk)
+
+        segundo = registrar_pedido('Mesa 2', [(self.file.pk, 1), (self.agua.pk, 3)])
+        Pedido.objects.filter(pk=primeiro.pk).update(pago=True)
+        self.assertEqual(consolidar_vendas(lote=1), (1, 1, 0))
+
+        self.assertEqual(MarcoConsolidacao.objects.get().ultimo_pedido_id, segundo.pk)
+        self.assertEqual(self.vendas_por_prato(), {
+            self.file.pk: (3, Decimal('106.50'), Decimal('71.00')),
+            self.agua.pk: (3, Decimal('12.00'), Decimal('0.00')),
+        })
+        self.assertEqual(VendaCategoria.objects.get().receita, Decimal('118.50'))
+        self.assertEqual(consolidar_vendas(), (0, 0, 0))
+
+    def test_item_alterado_depois_da_consolidacao_refaz_a_hora(self, _):
+        pedido = registrar_pedido('Mesa 1', [(self.file.pk, 2)])
+        consolidar_vendas()
+
+        item = ItemPedido.objects.get(pedido=pedido)
+        item.quantidade = 1
+        item.save()
+        ItemPedido.objects.create(pedido=pedido, prato=self.agua, quantidade=1, preco_unitario=self.agua.preco)
+        self.assertEqual(HoraVendaPendente.objects.count(), 1)
+
+        self.assertEqual(consolidar_vendas(), (0, 0, 1))
+        self.assertFalse(HoraVendaPendente.objects.exists())
+        self.assertEqual(self.vendas_por_prato(), {
+            self.file.pk: (1, Decimal('35.50'), Decimal('0.00')),
+            self.agua.pk: (1, Decimal('4.00'), Decimal('0.00')),
+        })
+
+    def test_recalcular_sem_o_arquivo(self, _):
+        registrar_pedido('Mesa 1', [(self.file.pk, 1)])
+        consolidar_vendas()
+        VendaPrato.objects.update(quantidade=99)
+
+        self.assertEqual(recalcular_vendas(), (1, 0, 0))
+        self.assertEqual(self.vendas_por_prato(), {self.file.pk: (1, Decimal('35.50'), Decimal('0.00'))})
+
+    def test_prato_com_vendas_nao_pode_ser_apagado(self, _):
+        registrar_pedido('Mesa 1', [(self.agua.pk, 1)])
+        consolidar_vendas()
+        # Sem o item (que também protege o prato), as vendas continuam protegendo
+        ItemPedido.objects.all().delete()
+        with self.assertRaises(ProtectedError):
+            self.agua.delete()
+
+
+# --- Réplica de leitura ---
+
+class RequisicaoComSessao:
+    def __init__(self):
+        self.session = {}
+
+
+class ReplicaTests(SimpleTestCase):
+    def setUp(self):
+        # Réplica configurada, com uma cópia que começou há 5 s
+        self.agora_ms = int(time.time() * 1000)
+        configurada = mock.patch('cardapio.replica.configurada', return_value=True)
+        copiado_em = mock.patch('cardapio.replica.copiado_em', return_value=self.agora_ms - 5000)
+        configurada.start()
+        self.copia = copiado_em.start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_leituras_marcadas_vao_para_a_replica_em_dia(self):
+        self.assertIsNone(replica.banco_de_leitura())  # sem marca: principal
+        with replica.usar_replica():
+            self.assertEqual(replica.banco_de_leitura(), replica.BANCO_REPLICA)
+            with replica.fixar_principal():
+                self.assertIsNone(replica.banco_de_leitura())
+        with override_settings(CARDAPIO_REPLICA_ATRASO_MAXIMO=1), replica.usar_replica():
+            self.assertIsNone(replica.banco_de_leitura())  # atrasada demais
+
+    def test_versao_do_cache_posterior_a_copia(self):
+        with replica.usar_replica(desde=self.agora_ms - 6000):
+            self.assertEqual(replica.banco_de_leitura(), replica.BANCO_REPLICA)
+        with replica.usar_replica(desde=self.agora_ms):
+            self.assertIsNone(replica.banco_de_leitura())
+
+    def test_usuario_le_o_que_gravou(self):
+        request = RequisicaoComSessao()
+        self.assertIsNone(replica.gravou_em(request))
+        replica.marcar_gravacao(request)
+        with replica.usar_replica(desde=replica.gravou_em(request)):
+            # A cópia começou antes da gravação: lê do principal
+            self.assertIsNone(replica.banco_de_leitura())
+
+        self.copia.return_value = int(time.time() * 1000) + 1
+        with replica.usar_replica(desde=replica.gravou_em(request)):
+            self.assertEqual(replica.banco_de_leitura(), replica.BANCO_REPLICA)
+
+        # Passado o atraso máximo, a gravação antiga não conta mais
+        request.session[replica.SESSAO_GRAVACAO] -= (replica.atraso_maximo() + 1) * 1000
+        self.assertIsNone(replica.gravou_em(request))
+
+
+# --- Painel de pedidos ao vivo ---
+
+class TransmissorTests(SimpleTestCase):
+    def test_formatar_evento(self):
+        self.assertEqual(
+            formatar_evento('1-2', NOVO, {'nome_cliente': 'Mesa 1', 'total': Decimal('4.00')}),
+            'id: 1-2\nevent: novo\ndata: {"nome_cliente": "Mesa 1", "total": "4.00"}\n\n',
+        )
+
+    def test_retoma_depois_do_ultimo_evento_recebido(self):
+        transmissor = Transmissor(tamanho=3)
+        inicio = transmissor.id_atual()
+        transmissor.publicar(NOVO, {'id': 1})
+        transmissor.publicar(NOVO, {'id': 2})
+
+        ouvinte = transmissor.ouvir(inicio, intervalo_keepalive=0)
+        primeiro, segundo = next(ouvinte), next(ouvinte)
+        self.assertEqual([primeiro[2], segundo[2]], [{'id': 1}, {'id': 2}])
+        self.assertIsNone(next(ouvinte))  # nada novo: keepalive
+        transmissor.publicar(NOVO, {'id': 3})
+        self.assertEqual(next(ouvinte)[2], {'id': 3})
+        ouvinte.close()
+
+        # Reconexão com o Last-Event-ID do primeiro: só o que veio depois
+        ouvinte = transmissor.ouvir(primeiro[0], intervalo_keepalive=0)
+        self.assertEqual([next(ouvinte)[2], next(ouvinte)[2]], [{'id': 2}, {'id': 3}])
+        ouvinte.close()
+
+    def test_id_perdido_pede_para_recomecar(self):
+        transmissor = Transmissor(tamanho=2)
+        inicio = transmissor.id_atual()
+        for pedido_id in range(4):
+            transmissor.publicar(NOVO, {'id': pedido_id})
+
+        for ultimo_id in (inicio, '123-1', 'lixo', ''):
+            with self.subTest(ultimo_id=ultimo_id):
+                ouvinte = transmissor.ouvir(ultimo_id, intervalo_keepalive=0)
+                self.assertEqual(next(ouvinte), (transmissor.id_atual(), RECOMECAR, {}))
+                self.assertIsNone(next(ouvinte))
+                ouvinte.close()
+
+
+class PainelEventosTests(TestCase):
+    def test_pedido_novo_chega_pelo_fluxo(self):
+        file, _, _ = criar_cardapio()
+        entrar_como_equipe(self.client)
+        ultimo_id = transmissor_atual().id_atual()
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = registrar_pedido('Mesa 9', [(file.pk, 1)])
+
+        resposta = self.client.get(reverse('painel_eventos'), HTTP_LAST_EVENT_ID=ultimo_id)
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream; charset=utf-8')
+        fluxo = iter(resposta.streaming_content)
+        self.assertEqual(next(fluxo), b'retry: 3000\n\n')
+        evento = next(fluxo).decode()
+        resposta.close()
+
+        self.assertTrue(evento.startswith(f"id: {transmissor_atual().epoca}-"))
+        self.assertIn('event: novo\n', evento)
+        dados = json.loads(evento.split('data: ', 1)[1])
+        self.assertEqual((dados['id'], dados['nome_cliente'], dados['total']), (pedido.pk, 'Mesa 9', '35.50'))
+        self.assertEqual([item['codigo'] for item in dados['itens']], ['P1'])
+
+
+# --- Arquivo de pedidos ---
+
+class ArquivoTests(TestCase):
+    databases = {'default', BANCO_ARQUIVO}
+
+    def test_roteador(self):
+        roteador = RoteadorArquivo()
+        self.assertEqual(roteador.db_for_read(PedidoArquivado), BANCO_ARQUIVO)
+        self.assertEqual(roteador.db_for_write(ItemPedidoArquivado), BANCO_ARQUIVO)
+        self.assertIsNone(roteador.db_for_read(Pedido))
+        self.assertFalse(roteador.allow_migrate(BANCO_ARQUIVO, 'cardapio', 'pedido'))
+        self.assertTrue(roteador.allow_migrate(BANCO_ARQUIVO, 'cardapio', 'pedidoarquivado'))
+        self.assertFalse(roteador.allow_migrate('default', 'cardapio', 'pedidoarquivado'))
+
+    def test_arquiva_pedidos_pagos_antigos(self):
+        file, _, agua = criar_cardapio()
+        antigo = registrar_pedido('Mesa 1', [(file.pk, 2), (agua.pk, 1)])
+        em_aberto = registrar_pedido('Mesa 2', [(file.pk, 1)])
+        Pedido.objects.filter(pk=antigo.pk).update(pago=True)
+        Pedido.objects.update(data_pedido=timezone.now() - timedelta(days=400))
+        consolidar_vendas()
+        receita = sorted(VendaPrato.objects.values_list('prato_id', 'receita'))
+
+        corte = timezone.now() - timedelta(days=180)
+        self.assertEqual(arquivar_pedidos(corte), 1)
+
+        self.assertEqual(list(Pedido.objects.values_list('pk', flat=True)), [em_aberto.pk])
+        arquivado = PedidoArquivado.objects.using(BANCO_ARQUIVO).get()
+        self.assertEqual((arquivado.pk, arquivado.total), (antigo.pk, antigo.total))
+        self.assertEqual(
+            sorted(arquivado.itens.values_list('codigo_cardapio', 'quantidade')), [('B1', 1), ('P1', 2)]
+        )
+        # Os totais de vendas não mudam quando o pedido sai
+        self.assertEqual(sorted(VendaPrato.objects.values_list('prato_id', 'receita')), receita)
+
+
+# --- Busca ---
+
+class BuscaPratosTests(TestCase):
+    def setUp(self):
+        self.file, self.salada, self.agua = criar_cardapio()
+
+    def test_com_e_sem_acentos(self):
+        for consulta in ('file', 'Filé', 'FILE parm'):
+            with self.subTest(consulta=consulta):
+                self.assertEqual(buscar_pratos(consulta), [self.file.pk])
+        self.assertEqual(buscar_pratos('agua'), [self.agua.pk])
+        self.assertEqual(buscar_pratos('Água min'), [self.agua.pk])
+        self.assertEqual(buscar_pratos('p2'), [self.salada.pk])
+        self.assertEqual(buscar_pratos('pizza'), [])
+
+    def test_indice_acompanha_alteracoes(self):
+        self.agua.nome = 'Água com Gás'
+        self.agua.save()
+        self.assertEqual(buscar_pratos('gas'), [self.agua.pk])
+        self.assertEqual(buscar_pratos('mineral'), [])
+
+    def test_usa_fts_no_sqlite(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Tabela FTS5 só existe no SQLite.")
+        self.assertTrue(fts_disponivel())
+
+
+# --- Arquivos estáticos ---
+
+class EstaticosTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.raiz = pasta.name
+        armazenamento = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'cardapio.estaticos.ArmazenamentoComprimido'}}
+        with override_settings(STATIC_ROOT=self.raiz, STORAGES=armazenamento):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        self.servidor = ServidorEstaticosWSGI(self.fail, raiz=self.raiz, prefixo='/static/')
+
+    def servir(self, caminho, **cabecalhos):
+        respostas = []
+        corpo = self.servidor(
+            {'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, **cabecalhos},
+            lambda status, lista: respostas.append((status, dict(lista))),
+        )
+        conteudo = b''.join(corpo)
+        if hasattr(corpo, 'close'):
+            corpo.close()  # como o servidor WSGI: fecha o arquivo
+        return (*respostas[0], conteudo)
+
+    def test_codificacoes_aceitas(self):
+        self.assertEqual(_codificacoes_aceitas('gzip;q=0.5, br'), {'gzip': 0.5, 'br': 1.0})
+        self.assertEqual(_codificacoes_aceitas('GZIP; q=0, *;q=abc'), {'gzip': 0.0, '*': 0.0})
+        self.assertEqual(_codificacoes_aceitas(''), {})
+
+    def test_nome_com_hash_e_versao_gz(self):
+        with open(os.path.join(self.raiz, 'staticfiles.json')) as manifesto:
+            nome = json.load(manifesto)['paths']['css/style.css']
+        self.assertRegex(nome, NOME_COM_HASH)
+        self.assertTrue(os.path.exists(os.path.join(self.raiz, nome + '.gz')))
+
+        status, cabecalhos, conteudo = self.servir('/static/' + nome, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(cabecalhos['Content-Encoding'], 'gzip')
+        self.assertEqual(cabecalhos['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(int(cabecalhos['Content-Length']), len(conteudo))
+
+        status, cabecalhos, _ = self.servir('/static/' + nome, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', cabecalhos)
+
+        status, _, conteudo = self.servir('/static/' + nome, HTTP_IF_MODIFIED_SINCE=cabecalhos['Last-Modified'])
+        self.assertEqual((status, conteudo), ('304 Not Modified', b''))
+
+    def test_url_desconhecida_segue_para_a_aplicacao(self):
+        servidor = ServidorEstaticosWSGI(lambda environ, start_response: ['django'], raiz=self.raiz, prefixo='/static/')
+        self.assertEqual(servidor({'PATH_INFO': '/static/nao-existe.css'}, None), ['django'])
+        self.assertEqual(servidor({'PATH_INFO': '/cardapio/'}, None), ['django'])
+
+
+# --- Perfis sob demanda ---
+
+class PerfilTests(CacheLimpoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        configuracao = override_settings(CARDAPIO_PERFIS_PASTA=self.pasta, CARDAPIO_PERFIS_INTERVALO=0.01)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        criar_cardapio()
+
+    def test_perfil_gravado_listado_e_baixado(self):
+        self.assertNotIn('X-Cardapio-Perfil', self.client.get(reverse('fazer_pedido'), {'_perfil': '1'}))
+
+        entrar_como_equipe(self.client)
+        perfil_id = self.client.get(reverse('fazer_pedido'), {'_perfil': '1'})['X-Cardapio-Perfil']
+        self.assertEqual(sorted(os.listdir(self.pasta)), [perfil_id + extensao for extensao in ('.json', '.prof', '.txt')])
+
+        [perfil] = self.client.get(reverse('perfis')).json()['perfis']
+        self.assertEqual((perfil['id'], sorted(perfil['arquivos'])), (perfil_id, ['json', 'prof', 'txt']))
+
+        resposta = self.client.get(perfil['arquivos']['json'])
+        resumo = json.loads(b''.join(resposta.streaming_content))
+        resposta.close()
+        self.assertEqual((resumo['rota'], resumo['usuario']), ('fazer_pedido', 'gerente'))
+        self.assertTrue(any('cardapio_categoria' in consulta['sql'] for consulta in resumo['consultas']))
+        self.assertTrue(any('views.py' in ' '.join(consulta['origem']) for consulta in resumo['consultas']))
+
+        for nome in ('../settings.py', f'{perfil_id}.py', 'apagado.prof'):
+            with self.subTest(nome=nome):
+                self.assertEqual(self.client.get(reverse('perfis') + nome).status_code, 404)
+
+    def test_um_perfil_por_vez(self):
+        entrar_como_equipe(self.client)
+        self.assertTrue(perfilador._em_uso.acquire(blocking=False))
+        try:
+            resposta = self.client.get(reverse('fazer_pedido'), HTTP_X_CARDAPIO_PERFIL='1')
+        finally:
+            perfilador._em_uso.release()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta['X-Cardapio-Perfil'], perfilador.OCUPADO)
+        self.assertEqual(os.listdir(self.pasta), [])
+
+    @override_settings(CARDAPIO_PERFIS_MAXIMO=2, CARDAPIO_PERFIS_TAMANHO_MAXIMO=10)
+    def test_retencao_apaga_os_mais_antigos(self):
+        agora = time.time()
+        for idade, perfil_id in enumerate(['novo', 'medio', 'velho']):
+            for extensao in perfilador.EXTENSOES:
+                caminho = os.path.join(self.pasta, perfil_id + extensao)
+                with open(caminho, 'w') as arquivo:
+                    arquivo.write('x' * 2)
+                os.utime(caminho, (agora - idade * 60, agora - idade * 60))
+
+        perfilador.aplicar_retencao()
+        # Máximo de 2 perfis e de 10 bytes: o mais novo fica sempre, o segundo (12 bytes no total) sai
+        self.assertEqual([perfil[0] for perfil in perfilador.listar()], ['novo'])
+
+
+# --- Rede de unidades ---
+
+UNIDADES_TESTE = {
+    'centro': {'hosts': ['centro.restaurante.com.br'], 'banco': 'unidade_centro.sqlite3'},
+    'praia': {'hosts': [], 'banco': 'unidade_praia.sqlite3'},
+}
+
+
+@override_settings(CARDAPIO_UNIDADES=UNIDADES_TESTE, ALLOWED_HOSTS=['*'])
+class ResolverUnidadeTests(SimpleTestCase):
+    def resolver(self, caminho, host='restaurante.com.br'):
+        return unidades.resolver(RequestFactory().get(caminho, HTTP_HOST=host))
+
+    def test_pelo_host_ou_pelo_prefixo(self):
+        self.assertEqual(self.resolver('/cardapio/', 'CENTRO.restaurante.com.br:8000'), ('centro', ''))
+        self.assertEqual(self.resolver('/u/praia/cardapio/'), ('praia', '/u/praia'))
+        self.assertEqual(self.resolver('/u/nenhuma/cardapio/'), (None, ''))
+        self.assertEqual(self.resolver('/cardapio/'), (None, ''))
+
+    def test_unidade_desconhecida(self):
+        with self.assertRaisesMessage(ValueError, "Unidade desconhecida: 'nenhuma'."):
+            with unidades.usar_unidade('nenhuma'):
+                pass
+
+
+class RelatorioUnidadesTests(TestCase):
+    def test_soma_a_rede_e_mostra_a_unidade_com_erro(self):
+        file, _, agua = criar_cardapio()
+        registrar_pedido('Mesa 1', [(file.pk, 2), (agua.pk, 1)])
+        with mock.patch('cardapio.arquivo.arquivo_pronto', return_value=False):
+            consolidar_vendas()
+
+        def em_paralelo(funcao, unidades=None, incluir_matriz=True):
+            # Na mesma thread (a transação do teste não é vista por outras conexões)
+            return {None: funcao(None), 'centro': OSError("banco fora do ar")}
+
+        entrar_como_equipe(self.client)
+        with mock.patch('cardapio.unidades.em_paralelo', em_paralelo):
+            resposta = self.client.get(reverse('relatorio_unidades'), {'inicio': '2000-01-01'})
+
+        relatorio = resposta.json()
+        self.assertEqual(relatorio['unidades']['matriz']['quantidade'], 3)
+        self.assertEqual(Decimal(relatorio['rede']['receita']), Decimal('75.00'))
+        self.assertEqual([prato['prato'] for prato in relatorio['mais_vendidos']], ['Filé à Parmegiana', 'Água Mineral'])
+        self.assertEqual(relatorio['erros'], {'centro': 'banco fora do ar'})
+
+    def test_data_invalida(self):
+        entrar_como_equipe(self.client)
+        for parametros in ({'inicio': '2024-13-01'}, {'fim': 'ontem'}):
+            with self.subTest(parametros=parametros):
+                resposta = self.client.get(reverse('relatorio_unidades'), parametros)
+                self.assertEqual(resposta.status_code, 400)
+
+
+@override_settings(CARDAPIO_UNIDADES=UNIDADES_TESTE)
+class ReplicarCardapioTests(TestCase):
+    def test_unidade_fora_do_ar_fica_no_log(self):
+        # Os bancos das unidades não existem neste teste: a cópia falha em todas
+        with self.assertLogs('cardapio.rede', 'ERROR') as log:
+            with self.captureOnCommitCallbacks(execute=True):
+                Categoria.objects.create(nome='Sobremesas')
+        self.assertEqual(len(log.records), 2)
+        self.assertIn("unidade centro falhou", log.output[0])
+
+    @override_settings(CARDAPIO_REPLICACAO_IMEDIATA=False)
+    def test_copia_deixada_para_o_comando(self):
+        with self.captureOnCommitCallbacks() as tarefas:
+            Categoria.objects.create(nome='Sobremesas')
+        with mock.patch('cardapio.rede.replicar_alteracoes') as replicar:
+            for tarefa in tarefas:
+                tarefa()
+        replicar.assert_not_called()
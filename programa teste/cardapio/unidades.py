@@ -0,0 +1,170 @@
+# cardapio/unidades.py
+
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connections
+
+# Alias do banco de cada unidade: 'unidade_<nome>' (criados no settings a
+# partir de CARDAPIO_UNIDADES)
+PREFIXO_BANCO = 'unidade_'
+
+# Prefixo de caminho que escolhe a unidade quando o host não escolhe: /u/<nome>/...
+PREFIXO_URL = 'u'
+
+# Unidade da requisição (ou do comando) em andamento; None = matriz ('default')
+_unidade = contextvars.ContextVar('cardapio_unidade', default=None)
+
+_hosts = {'configuracao': None, 'mapa': {}}
+
+
+def configuradas():
+    """{nome: {'hosts': [...], 'banco': caminho}} das unidades (CARDAPIO_UNIDADES)."""
+    return getattr(settings, 'CARDAPIO_UNIDADES', {})
+
+
+def nomes():
+    return list(configuradas())
+
+
+def banco(nome):
+    """Alias do banco da unidade 'nome' (None = matriz, o banco 'default')."""
+    return 'default' if nome is None else f'{PREFIXO_BANCO}{nome}'
+
+
+def atual():
+    return _unidade.get()
+
+
+def banco_atual():
+    """Alias do banco da unidade em andamento, ou None fora de uma unidade. Usado pelo RoteadorUnidades."""
+    nome = _unidade.get()
+    return None if nome is None else banco(nome)
+
+
+@contextmanager
+def usar_unidade(nome):
+    """Pedidos, estoque e cardápio deste bloco ficam no banco da unidade (None = matriz)."""
+    if nome is not None and nome not in configuradas():
+        raise ValueError(f"Unidade desconhecida: {nome!r}.")
+    token = _unidade.set(nome)
+    try:
+        yield
+    finally:
+        _unidade.reset(token)
+
+
+def prefixo_cache():
+    """Prefixo das chaves de cache: cada unidade tem as suas versões e o seu conteúdo."""
+    nome = _unidade.get()
+    return '' if nome is None else f'unidade:{nome}:'
+
+
+# --- Unidade da requisição ---
+
+def _mapa_hosts():
+    # Montado uma vez por configuração: achar a unidade é uma busca num dict,
+    # não importa quantas unidades existam
+    unidades = configuradas()
+    if _hosts['configuracao'] is not unidades:
+        _hosts['mapa'] = {
+            host.lower(): nome for nome, unidade in unidades.items() for host in unidade.get('hosts', [])
+        }
+        _hosts['configuracao'] = unidades
+    return _hosts['mapa']
+
+
+def resolver(request):
+    """
+    Retorna (unidade, prefixo) da requisição: pelo host (sem a porta) ou pelo
+    começo do caminho (/u/<nome>/, e então o prefixo é '/u/<nome>'). Sem
+    nenhum dos dois, (None, '') = matriz.
+    """
+    unidades = configuradas()
+    if not unidades:
+        return None, ''
+    host = request.get_host().rsplit(':', 1)[0].lower()
+    nome = _mapa_hosts().get(host)
+    if nome is not None:
+        return nome, ''
+    partes = request.path_info.split('/', 3)
+    if len(partes) >= 4 and partes[1] == PREFIXO_URL and partes[2] in unidades:
+        return partes[2], f'/{PREFIXO_URL}/{partes[2]}'
+    return None, ''
+
+
+def na_unidade(conteudo, nome):
+    """
+    Itera o conteúdo de uma resposta em streaming dentro da unidade: ele é
+    gerado depois que a view (e o middleware) já retornaram. A unidade vale
+    só durante cada passo, então o iterador pode ser consumido em outra thread.
+    """
+    if hasattr(conteudo, '__aiter__'):
+        async def aiterar():
+            iterador = aiter(conteudo)
+            while True:
+                with usar_unidade(nome):
+                    try:
+                        parte = await anext(iterador)
+                    except StopAsyncIteration:
+                        return
+                yield parte
+        return aiterar()
+
+    def iterar():
+        iterador = iter(conteudo)
+        while True:
+            with usar_unidade(nome):
+                try:
+                    parte = next(iterador)
+                except StopIteration:
+                    return
+            yield parte
+    return iterar()
+
+
+# --- Execução em todas as unidades ---
+
+def em_paralelo(funcao, unidades=None, incluir_matriz=True):
+    """
+    Executa funcao(nome) em cada unidade (e na matriz, nome=None), cada uma
+    numa thread com o seu banco, e retorna {nome: resultado}. Uma unidade com
+    erro não impede as outras: o resultado dela é a exceção.
+    """
+    alvos = ([None] if incluir_matriz else []) + list(unidades if unidades is not None else nomes())
+
+    def executar(nome):
+        try:
+            with usar_unidade(nome):
+                return funcao(nome)
+        except Exception as e:
+            return e
+        finally:
+            # Cada thread abre as suas conexões; fecha ao terminar
+            connections.close_all()
+
+    maximo = getattr(settings, 'CARDAPIO_UNIDADES_THREADS', 8)
+    with ThreadPoolExecutor(max_workers=max(1, min(maximo, len(alvos)))) as executor:
+        return dict(zip(alvos, executor.map(executar, alvos)))
+
+
+class OpcaoUnidadeMixin:
+    """
+    Acrescenta --unidade NOME a um comando (antes de BaseCommand nas classes
+    base): o comando inteiro roda no banco da unidade. Sem a opção, na matriz.
+    Ex.: manage.py processar_fila --unidade centro
+    """
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument('--unidade', help='Unidade da rede (padrão: a matriz, banco default).')
+        return parser
+
+    def execute(self, *args, **options):
+        nome = options.get('unidade')
+        if nome is not None and nome not in configuradas():
+            raise CommandError(f"Unidade '{nome}' não configurada (CARDAPIO_UNIDADES).")
+        with usar_unidade(nome):
+            return super().execute(*args, **options)
@@ -1,7 +1,7 @@
 # cardapio/urls.py
 
 from django.urls import path
-from . import views
+from . import views, api
 
 # Define as rotas (URLs) do aplicativo 'cardapio'
 urlpatterns = [
@@ -10,7 +10,32 @@ urlpatterns = [
     
     # Rota do cardápio para o cliente
     path('menu/', views.cardapio_view, name='cardapio'),
+
+    # Contadores do cache do cardápio (somente equipe)
+    path('menu/cache/', views.estatisticas_cache_view, name='cardapio_cache'),
+
+    # Métricas de consultas e tempos por rota (somente equipe)
+    path('metricas/', views.metricas_view, name='metricas'),
+
+    # Perfis gravados com ?_perfil=1 (somente equipe)
+    path('perfis/', views.perfis_view, name='perfis'),
+    path('perfis/<str:arquivo>', views.baixar_perfil_view, name='baixar_perfil'),
+
+    # Vendas de todas as unidades da rede, lidas em paralelo (somente equipe)
+    path('unidades/relatorio/', views.relatorio_unidades_view, name='relatorio_unidades'),
+
+    # Exportação de pedidos para a contabilidade (somente equipe)
+    path('pedidos/exportar/', views.exportar_pedidos_view, name='exportar_pedidos'),
+    
+    # Painel de pedidos ao vivo para cozinha e caixa (somente equipe)
+    path('painel/', views.painel_view, name='painel'),
+    path('painel/eventos/', views.painel_eventos_view, name='painel_eventos'),
     
     # ROTA CORRIGIDA PARA O GARÇOM (resolve o NoReverseMatch)
     path('fazer_pedido/', views.fazer_pedido_view, name='fazer_pedido'), 
+
+    # API JSON para quiosques e tablets
+    path('api/cardapio/', api.api_cardapio, name='api_cardapio'),
+    path('api/pedidos/', api.api_pedidos, name='api_pedidos'),
+    path('api/sincronizar/', api.api_sincronizar, name='api_sincronizar'),
 ]
\ No newline at end of file
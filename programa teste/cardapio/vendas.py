@@ -0,0 +1,254 @@
+# cardapio/vendas.py
+
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import router, transaction
+from django.db.models import F, Q, Max, Sum, DecimalField
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from . import unidades
+from .models import (
+    Prato, Pedido, ItemPedido, VendaPrato, VendaCategoria, MarcoConsolidacao, HoraVendaPendente,
+    ItemPedidoArquivado,
+)
+
+MARCO = 'vendas'
+
+logger = logging.getLogger('cardapio.vendas')
+
+
+def _somar_itens(filtro_pedidos):
+    """
+    Soma os itens dos pedidos filtrados por hora (local), prato e situação de
+    pagamento. Uma consulta agregada; o banco devolve só as linhas somadas.
+    """
+    return (
+        ItemPedido.objects.filter(**{f'pedido__{campo}': valor for campo, valor in filtro_pedidos.items()})
+        .annotate(inicio_hora=TruncHour('pedido__data_pedido'))
+        .values('inicio_hora', 'prato_id', 'prato__categoria_id', 'pedido__pago')
+        .annotate(
+            qtd=Sum('quantidade'),
+            valor=Sum(F('preco_unitario') * F('quantidade'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        )
+        .order_by()
+    )
+
+
+def _somar_itens_arquivados(filtro_pedidos=None):
+    """
+    As mesmas linhas de _somar_itens para os pedidos arquivados (banco do
+    arquivo). A categoria vem do prato atual: o arquivo não a guarda.
+    """
+    linhas = list(
+        ItemPedidoArquivado.objects
+        .filter(**{f'pedido__{campo}': valor for campo, valor in (filtro_pedidos or {}).items()})
+        .annotate(inicio_hora=TruncHour('pedido__data_pedido'))
+        .values('inicio_hora', 'prato_id', 'codigo_cardapio', 'pedido__pago')
+        .annotate(
+            qtd=Sum('quantidade'),
+            valor=Sum(F('preco_unitario') * F('quantidade'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        )
+        .order_by()
+    )
+    pratos = {
+        pk: (pk, categoria_id)
+        for pk, categoria_id in Prato.objects.filter(
+            pk__in={linha['prato_id'] for linha in linhas}
+        ).values_list('pk', 'categoria_id')
+    }
+    # Prato apagado depois do arquivamento (antes de VendaPrato protegê-lo):
+    # soma no prato que tem hoje o mesmo código, se houver
+    sem_prato = {linha['codigo_cardapio'] for linha in linhas if linha['prato_id'] not in pratos}
+    por_codigo = {
+        codigo: (pk, categoria_id)
+        for codigo, pk, categoria_id in Prato.objects.filter(
+            codigo_cardapio__in=sem_prato
+        ).values_list('codigo_cardapio', 'pk', 'categoria_id')
+    } if sem_prato else {}
+
+    perdidas = 0
+    for linha in linhas:
+        prato = pratos.get(linha['prato_id']) or por_codigo.get(linha['codigo_cardapio'])
+        if prato is None:
+            perdidas += 1
+            continue
+        yield {**linha, 'prato_id': prato[0], 'prato__categoria_id': prato[1]}
+    if perdidas:
+        logger.warning("%d linha(s) do arquivo sem prato correspondente ficaram fora das vendas.", perdidas)
+
+
+def _ler_arquivo():
+    """
+    True se os pedidos arquivados entram na soma: só na matriz (o banco do
+    arquivo guarda só os pedidos dela) e só depois de migrate --database=arquivo.
+    """
+    # Importado aqui: o módulo do arquivo importa MARCO deste módulo
+    from .arquivo import arquivo_pronto
+    return unidades.atual() is None and arquivo_pronto()
+
+
+def _acumular(linhas, contar_vendas=True):
+    """
+    Converte as linhas somadas em variações por (dia, hora, prato) e por
+    (dia, hora, categoria): [quantidade, receita, receita_paga].
+    """
+    por_prato, por_categoria = {}, {}
+    for linha in linhas:
+        local = timezone.localtime(linha['inicio_hora'])
+        dia, hora = local.date(), local.hour
+
+        if contar_vendas:
+            variacao = [linha['qtd'], linha['valor'], linha['valor'] if linha['pedido__pago'] else Decimal('0')]
+        else:
+            # Só mudou o pagamento: move o valor entre pago e em aberto
+            variacao = [0, Decimal('0'), linha['valor'] if linha['pedido__pago'] else -linha['valor']]
+
+        for destino, chave in ((por_prato, (dia, hora, linha['prato_id'])),
+                               (por_categoria, (dia, hora, linha['prato__categoria_id']))):
+            atual = destino.setdefault(chave, [0, Decimal('0'), Decimal('0')])
+            for i, valor in enumerate(variacao):
+                atual[i] += valor
+    return por_prato, por_categoria
+
+
+def _aplicar(modelo, campo, variacoes):
+    """Soma as variações nas linhas existentes (bulk_update) e cria as que faltam (bulk_create)."""
+    if not variacoes:
+        return
+    existentes = {
+        (linha.dia, linha.hora, getattr(linha, f'{campo}_id')): linha
+        for linha in modelo.objects.filter(
+            dia__in={dia for dia, _, _ in variacoes},
+            **{f'{campo}_id__in': {chave_id for _, _, chave_id in variacoes}}
+        )
+    }
+    atualizar, criar = [], []
+    for (dia, hora, chave_id), (quantidade, receita, receita_paga) in variacoes.items():
+        linha = existentes.get((dia, hora, chave_id))
+        if linha is None:
+            criar.append(modelo(dia=dia, hora=hora, quantidade=quantidade, receita=receita,
+                                receita_paga=receita_paga, **{f'{campo}_id': chave_id}))
+        else:
+            linha.quantidade += quantidade
+            linha.receita += receita
+            linha.receita_paga += receita_paga
+            atualizar.append(linha)
+
+    modelo.objects.bulk_update(atualizar, ['quantidade', 'receita', 'receita_paga'], batch_size=500)
+    modelo.objects.bulk_create(criar, batch_size=500)
+
+
+def _gravar(por_prato, por_categoria):
+    _aplicar(VendaPrato, 'prato', por_prato)
+    _aplicar(VendaCategoria, 'categoria', por_categoria)
+
+
+def marcar_hora_alterada(pedido_id, using=None):
+    """
+    Chamado pelo sinal de ItemPedido: se o pedido já foi consolidado (id até
+    o marco), a hora dele fica pendente e o próximo consolidar_vendas soma
+    essa hora de novo. Pedidos depois do marco entram pelo caminho normal.
+    """
+    marco = (
+        MarcoConsolidacao.objects.using(using).filter(nome=MARCO)
+        .values_list('ultimo_pedido_id', flat=True).first()
+    )
+    if not marco or pedido_id > marco:
+        return
+    data_pedido = Pedido.objects.using(using).filter(pk=pedido_id).values_list('data_pedido', flat=True).first()
+    if data_pedido is None:
+        return
+    local = timezone.localtime(data_pedido)
+    HoraVendaPendente.objects.using(using).bulk_create(
+        [HoraVendaPendente(dia=local.date(), hora=local.hour)], ignore_conflicts=True
+    )
+
+
+def _refazer_horas(marco):
+    """
+    Soma de novo as horas pendentes: apaga os totais de cada hora e soma os
+    pedidos dela até o marco (e os arquivados da mesma hora, na matriz).
+    Retorna quantas horas foram refeitas.
+    """
+    pendentes = list(HoraVendaPendente.objects.all())
+    if not pendentes:
+        return 0
+    HoraVendaPendente.objects.filter(pk__in=[pendente.pk for pendente in pendentes]).delete()
+    ler_arquivo = _ler_arquivo()
+
+    for pendente in pendentes:
+        inicio = timezone.make_aware(datetime.combine(pendente.dia, time(pendente.hora)))
+        filtro = {'data_pedido__gte': inicio, 'data_pedido__lt': inicio + timedelta(hours=1)}
+
+        VendaPrato.objects.filter(dia=pendente.dia, hora=pendente.hora).delete()
+        VendaCategoria.objects.filter(dia=pendente.dia, hora=pendente.hora).delete()
+        linhas = list(_somar_itens({**filtro, 'id__lte': marco}))
+        if ler_arquivo:
+            linhas += _somar_itens_arquivados(filtro)
+        _gravar(*_acumular(linhas))
+        # A receita paga foi somada com o 'pago' atual
+        Pedido.objects.filter(**filtro, id__lte=marco).update(pago_contabilizado=F('pago'))
+    return len(pendentes)
+
+
+def consolidar_vendas(lote=5000):
+    """
+    Atualiza os totais de vendas de forma incremental:
+    1. soma os pedidos criados depois do marco, em lotes de 'lote' ids (cada
+       lote numa transação, junto com o avanço do marco);
+    2. soma de novo as horas marcadas como pendentes (itens de pedidos já
+       consolidados que mudaram depois, veja marcar_hora_alterada);
+    3. move entre 'pago' e 'em aberto' o valor dos pedidos antigos cujo
+       pagamento mudou desde a última execução.
+    Retorna (pedidos_novos, pagamentos_alterados, horas_refeitas).
+    """
+    MarcoConsolidacao.objects.get_or_create(nome=MARCO)
+    limite = Pedido.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+    novos = 0
+
+    while True:
+        with transaction.atomic(using=router.db_for_write(VendaPrato)):
+            marco = MarcoConsolidacao.objects.select_for_update().get(nome=MARCO)
+            inicio = marco.ultimo_pedido_id
+            if inicio >= limite:
+                break
+            fim = min(inicio + lote, limite)
+
+            _gravar(*_acumular(_somar_itens({'id__gt': inicio, 'id__lte': fim})))
+            novos += Pedido.objects.filter(id__gt=inicio, id__lte=fim).update(pago_contabilizado=F('pago'))
+
+            marco.ultimo_pedido_id = fim
+            marco.save(update_fields=['ultimo_pedido_id', 'atualizado_em'])
+
+    with transaction.atomic(using=router.db_for_write(VendaPrato)):
+        marco = MarcoConsolidacao.objects.select_for_update().get(nome=MARCO)
+        refeitas = _refazer_horas(marco.ultimo_pedido_id)
+
+        mudaram = list(
+            Pedido.objects.filter(id__lte=marco.ultimo_pedido_id)
+            .filter(Q(pago=True, pago_contabilizado=False) | Q(pago=False, pago_contabilizado=True))
+            .values_list('id', flat=True)
+        )
+        for i in range(0, len(mudaram), lote):
+            ids = mudaram[i:i + lote]
+            _gravar(*_acumular(_somar_itens({'id__in': ids}), contar_vendas=False))
+            Pedido.objects.filter(id__in=ids).update(pago_contabilizado=F('pago'))
+
+    return novos, len(mudaram), refeitas
+
+
+def recalcular_vendas(lote=5000):
+    """
+    Apaga os totais e consolida tudo de novo a partir dos pedidos atuais,
+    incluindo os já arquivados (que não voltam a ser lidos depois).
+    """
+    with transaction.atomic(using=router.db_for_write(VendaPrato)):
+        VendaPrato.objects.all().delete()
+        VendaCategoria.objects.all().delete()
+        HoraVendaPendente.objects.all().delete()
+        MarcoConsolidacao.objects.filter(nome=MARCO).delete()
+        Pedido.objects.update(pago_contabilizado=False)
+        if _ler_arquivo():
+            _gravar(*_acumular(_somar_itens_arquivados()))
+    return consolidar_vendas(lote)
@@ -1,48 +1,211 @@
 # cardapio/views.py (CÓDIGO COMPLETO PARA SUBSTITUIÇÃO)
 
+import uuid
 from django.shortcuts import render, redirect 
-from django.db import transaction, IntegrityError 
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import IntegrityError, OperationalError 
 from django.contrib import messages 
-from .models import Prato, Categoria, Pedido, ItemPedido 
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.dateparse import parse_date
+from .models import Prato, Categoria 
+from . import cache as menu_cache
+from . import metricas
+from .pedidos import registrar_pedido
+from .busca import buscar_pratos
+from . import exportacao
+from . import painel
+from .replica import leitura_principal
+from . import replica
+from . import perfilador
+from . import unidades
+from . import rede
 
 
-def home_view(request):
+async def home_view(request):
     """
     Renderiza a página inicial.
+    Assíncrona: sob ASGI não ocupa uma thread enquanto o cliente recebe a página.
     """
-    return render(request, 'home.html')
+    return render(request, 'home.html', {'unidade': unidades.atual()})
 
-def cardapio_view(request):
+async def cardapio_view(request):
     """
     Renderiza a página do cardápio completo.
+    O HTML fica em cache por versão do cardápio: um acerto não consulta o banco.
+    Assíncrona (cache e ORM assíncronos), como a home.
     """
-    # 1. Busca todas as categorias
-    categorias = Categoria.objects.all()
-    
-    # 2. Cria uma lista de categorias, incluindo os pratos de cada uma
-    categorias_com_pratos = []
-    
-    for categoria in categorias:
-        # 3. Busca os pratos de cada categoria
-        pratos = Prato.objects.filter(categoria=categoria).order_by('codigo_cardapio')
-        
-        # 4. Adiciona ao contexto
-        categorias_com_pratos.append({
-            'nome': categoria.nome,
-            'pratos': pratos
-        })
+    async def gerar_html():
+        context = {
+            'categorias_com_pratos': await menu_cache.aobter_estrutura()
+        }
+        # Renderiza sem o request: a página é igual para todos os clientes
+        return render_to_string('cardapio.html', context)
+
+    return HttpResponse(await menu_cache.aobter_html('cardapio', gerar_html))
+
+
+@staff_member_required
+def estatisticas_cache_view(request):
+    """
+    Retorna (JSON) os contadores de acerto/falha do cache do cardápio.
+    """
+    return JsonResponse(menu_cache.estatisticas_cache())
+
+
+@staff_member_required
+def metricas_view(request):
+    """
+    Retorna (JSON) p50/p95/p99 de consultas e tempos por nome de URL,
+    e o atraso da réplica de leitura.
+    """
+    return JsonResponse({**metricas.resumo(), 'replica': replica.situacao()})
+
+
+@staff_member_required
+def perfis_view(request):
+    """
+    Retorna (JSON) os perfis gravados pelo PerfilMiddleware, do mais novo para
+    o mais antigo, com os links para baixar cada arquivo.
+    """
+    return JsonResponse({'perfis': [
+        {
+            'id': perfil_id,
+            'tamanho': tamanho,
+            'arquivos': {
+                nome.rsplit('.', 1)[1]: reverse('baixar_perfil', args=[nome]) for nome in sorted(arquivos)
+            },
+        }
+        for perfil_id, arquivos, tamanho, _ in perfilador.listar()
+    ]})
+
+
+@staff_member_required
+def baixar_perfil_view(request, arquivo):
+    """Baixa um arquivo de perfil (.prof, .txt collapsed ou .json das consultas)."""
+    caminho = perfilador.caminho_arquivo(arquivo)
+    if caminho is None:
+        raise Http404("Perfil não encontrado (nome inválido ou já apagado pela retenção).")
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=arquivo)
+
+
+@staff_member_required
+def relatorio_unidades_view(request):
+    """
+    Retorna (JSON) as vendas consolidadas de cada unidade da rede e da matriz,
+    lidas em paralelo, com o total da rede: ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD
+    """
+    datas = {}
+    for campo in ('inicio', 'fim'):
+        valor = request.GET.get(campo)
+        try:
+            datas[campo] = parse_date(valor) if valor else None
+        except ValueError:
+            datas[campo] = None
+        if valor and datas[campo] is None:
+            return HttpResponseBadRequest(f"Data inválida em '{campo}'. Use AAAA-MM-DD.")
+    return JsonResponse(rede.relatorio_vendas(datas['inicio'], datas['fim']))
 
+
+@staff_member_required
+def exportar_pedidos_view(request):
+    """
+    Exporta pedidos e itens para a contabilidade (somente equipe), em streaming:
+    ?formato=csv|jsonl&inicio=AAAA-MM-DD&fim=AAAA-MM-DD&pago=sim|nao&gzip=1
+    O arquivo é gerado enquanto é enviado, sem carregar os pedidos na memória.
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportacao.FORMATOS:
+        return HttpResponseBadRequest(f"Formato inválido. Use {', '.join(exportacao.FORMATOS)}.")
+
+    datas = {}
+    for campo in ('inicio', 'fim'):
+        valor = request.GET.get(campo)
+        try:
+            datas[campo] = parse_date(valor) if valor else None
+        except ValueError:
+            datas[campo] = None
+        if valor and datas[campo] is None:
+            return HttpResponseBadRequest(f"Data inválida em '{campo}'. Use AAAA-MM-DD.")
+
+    pago = {'sim': True, 'nao': False}.get(request.GET.get('pago'))
+    comprimir = request.GET.get('gzip') == '1'
+
+    pedidos = exportacao.filtrar_pedidos(datas['inicio'], datas['fim'], pago)
+    # Relatório: lido da réplica (o conteúdo é gerado depois que a view retorna)
+    conteudo = exportacao.codificar(
+        exportacao.na_replica(exportacao.gerar_exportacao(formato, pedidos)), comprimir=comprimir
+    )
+
+    nome_arquivo = f"pedidos.{formato}" + ('.gz' if comprimir else '')
+    tipo = 'application/gzip' if comprimir else (
+        'text/csv; charset=utf-8' if formato == 'csv' else 'application/x-ndjson; charset=utf-8'
+    )
+    resposta = StreamingHttpResponse(conteudo, content_type=tipo)
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return resposta
+
+
+@staff_member_required
+def painel_view(request):
+    """
+    Painel de pedidos em aberto para a cozinha e o caixa (somente equipe).
+    A página traz a lista atual; as mudanças chegam depois por /painel/eventos/.
+    """
+    # 1. Guarda o id do último evento ANTES de ler os pedidos: o que mudar
+    # entre a leitura e a conexão do navegador chega pelo fluxo (nada se perde)
+    ultimo_evento = painel.transmissor_atual().id_atual()
     context = {
-        'categorias_com_pratos': categorias_com_pratos
+        'pedidos': painel.pedidos_em_aberto(),
+        'ultimo_evento': ultimo_evento,
     }
-    
-    return render(request, 'cardapio.html', context)
+    return render(request, 'painel.html', context)
 
 
+@staff_member_required
+async def painel_eventos_view(request):
+    """
+    Fluxo de eventos (text/event-stream) do painel de pedidos: só as mudanças
+    (pedido novo, itens, pagamento, envio à cozinha), depois do id recebido no
+    cabeçalho Last-Event-ID (reconexão automática do navegador) ou em ?desde=.
+    Sob ASGI a espera não ocupa thread; sob WSGI cada painel aberto ocupa uma.
+    """
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('desde', '')
+
+    def formatar(evento):
+        # None = nada aconteceu no intervalo: um comentário mantém a conexão viva
+        return ': keepalive\n\n' if evento is None else painel.formatar_evento(*evento)
+
+    transmissor = painel.transmissor_atual()
+
+    if isinstance(request, ASGIRequest):
+        async def conteudo():
+            yield 'retry: 3000\n\n'
+            async for evento in transmissor.aouvir(ultimo_id):
+                yield formatar(evento)
+    else:
+        def conteudo():
+            yield 'retry: 3000\n\n'
+            for evento in transmissor.ouvir(ultimo_id):
+                yield formatar(evento)
+
+    resposta = StreamingHttpResponse(conteudo(), content_type='text/event-stream; charset=utf-8')
+    resposta['Cache-Control'] = 'no-cache'
+    # Proxies (nginx) não devem segurar os eventos num buffer
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
+
+
+@leitura_principal
 def fazer_pedido_view(request):
     """
     Renderiza a página para o garçom selecionar os pratos e criar um pedido,
     e processa o envio (POST) do formulário de pedido.
+    Sempre no banco principal: o estoque mostrado ao garçom precisa estar em dia.
     """
     categorias = Categoria.objects.all()
     categorias_com_pratos = []
@@ -67,34 +230,12 @@ def fazer_pedido_view(request):
 
         else:
             try:
-                # 2. Inicia a Transação (garante que todos os passos sejam executados ou abortados)
-                with transaction.atomic():
-                    # A. Cria o Pedido (cabeçalho)
-                    novo_pedido = Pedido.objects.create(
-                        nome_cliente=nome_cliente,
-                        pago=False 
-                    )
-                    
-                    # B. Processa cada item do pedido
-                    for prato_id, quantidade in itens_do_pedido:
-                        # select_for_update bloqueia o prato para evitar erros de estoque simultâneo
-                        prato = Prato.objects.select_for_update().get(id=prato_id) 
-                        
-                        # C. Verifica Estoque 
-                        if prato.estoque < quantidade:
-                            raise ValueError(f"Estoque insuficiente para {prato.nome}. Disponível: {prato.estoque}")
-                        
-                        # D. Cria o ItemPedido (detalhe)
-                        ItemPedido.objects.create(
-                            pedido=novo_pedido,
-                            prato=prato,
-                            quantidade=quantidade,
-                            preco_unitario=prato.preco
-                        )
-                        
-                        # E. Atualiza o Estoque
-                        prato.estoque -= quantidade
-                        prato.save()
+                # 2. Registra o pedido (cabeçalho, itens e baixa de estoque) em uma transação
+                # (a chave do formulário evita um pedido duplicado se o botão for tocado duas vezes)
+                novo_pedido = registrar_pedido(
+                    nome_cliente, itens_do_pedido,
+                    chave_idempotencia=request.POST.get('chave_idempotencia')
+                )
 
                 # Se a transação for bem-sucedida, envia a mensagem de sucesso
                 messages.success(request, f"Pedido #{novo_pedido.id} para {nome_cliente} registrado e enviado ao caixa!")
@@ -109,20 +250,66 @@ def fazer_pedido_view(request):
             except IntegrityError:
                 # Erros genéricos de banco de dados
                 messages.error(request, "ERRO ao salvar o pedido. Tente novamente.")
+
+            except OperationalError:
+                # Banco ocupado por outros pedidos além do tempo de espera (busy_timeout)
+                messages.error(request, "O sistema está ocupado com outros pedidos. Tente novamente em instantes.")
             
     # --------------------------------------------------
     # Lógica de Carregamento de Dados (GET)
     # --------------------------------------------------
-    for categoria in categorias:
-        # Filtra apenas pratos que têm estoque maior que zero para mostrar ao garçom
-        pratos = Prato.objects.filter(categoria=categoria, estoque__gt=0).order_by('codigo_cardapio')
-        categorias_com_pratos.append({
-            'nome': categoria.nome,
-            'pratos': pratos
-        })
+    # Com ?q= mostra só os pratos encontrados pela busca (índice FTS5), sem
+    # o cache de fragmentos; com &parcial=1 devolve só a lista (busca enquanto digita)
+    consulta = request.GET.get('q', '').strip()
+    if consulta:
+        encontrados = buscar_pratos(consulta)
+        ordem = {prato_id: posicao for posicao, prato_id in enumerate(encontrados)}
+        pratos = (
+            Prato.objects.com_estoque_atual()
+            .filter(pk__in=encontrados, estoque_atual__gt=0)
+            .select_related('categoria')
+        )
+        por_categoria = {}
+        for prato in sorted(pratos, key=lambda prato: ordem[prato.pk]):
+            por_categoria.setdefault(prato.categoria, []).append(prato)
+        categorias_com_pratos = [
+            {'id': categoria.pk, 'nome': categoria.nome, 'pratos': lista}
+            for categoria, lista in por_categoria.items()
+        ]
+    else:
+        # Cada categoria é um fragmento em cache ({% cache %} no template), com a
+        # versão do cardápio e a do estoque da categoria na chave: um pedido só
+        # refaz as categorias dos seus pratos
+        versao_cardapio = menu_cache.versao_cardapio()
+        versoes_estoque = menu_cache.versoes_estoque_categorias([categoria.pk for categoria in categorias])
+
+        for categoria in categorias:
+            # Filtra apenas pratos que têm estoque maior que zero para mostrar ao garçom
+            # (consulta preguiçosa: só roda se o fragmento da categoria não estiver em cache)
+            pratos = (
+                Prato.objects.com_estoque_atual()
+                .filter(categoria=categoria, estoque_atual__gt=0)
+                .order_by('codigo_cardapio')
+            )
+            categorias_com_pratos.append({
+                'id': categoria.pk,
+                'nome': categoria.nome,
+                'pratos': pratos,
+                'versao': f"{versao_cardapio}-{versoes_estoque[categoria.pk]}",
+            })
 
     context = {
-        'categorias_com_pratos': categorias_com_pratos
+        'categorias_com_pratos': categorias_com_pratos,
+        'busca': consulta,
+        # Nova chave a cada exibição do formulário (um envio = uma chave)
+        'chave_idempotencia': uuid.uuid4().hex,
+        'cache_alias': menu_cache.alias_cache(),
+        'cache_timeout': menu_cache.timeout_cache(),
+        # O estoque de cada unidade é diferente: a unidade entra na chave dos fragmentos
+        'unidade': unidades.atual() or '',
     }
+
+    if request.GET.get('parcial') == '1':
+        return render(request, 'fazer_pedido_itens.html', context)
     
     return render(request, 'fazer_pedido.html', context)
\ No newline at end of file